@@ -2,6 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from app.startup_tasks import run_startup_tasks
+from app.utils.sqlite_utils import configure_sqlite_engine
 import os
 
 db = SQLAlchemy()
@@ -46,6 +47,10 @@ def create_app(config_name=None):
     db.init_app(app)
     migrate = Migrate(app, db)
     
+    # Apply SQLite PRAGMAs (WAL, busy timeout, cache) on every connection
+    with app.app_context():
+        configure_sqlite_engine(db.engine, app.config)
+    
     # Register blueprints
     from app.blueprints.main import main_bp
     from app.blueprints.jobs import jobs_bp
@@ -74,6 +79,7 @@ def create_folders(app_base_folder, file_storage_folder):
         "Resumes",
         "Cover_Letters",
         "Job_Descriptions",
+        "Store",
     ]
     
     # Ensure the database folder exists
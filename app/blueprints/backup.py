@@ -1,12 +1,33 @@
-from flask import Blueprint, render_template, jsonify, request, send_file, flash, redirect, url_for, current_app, Response
+from flask import Blueprint, render_template, jsonify, request, send_file, flash, redirect, url_for, current_app, Response, stream_with_context
 from app import db
 from app.services.cloud_backup_service import CloudBackupService
-import os, io, zipfile, tempfile, sqlite3, shutil, subprocess, configparser
+from app.services.rclone_backend import RcloneError
+from app.services.cloud_catalog_service import CloudCatalogService, start_catalog_reconciler
+from app.services.task_queue_service import TaskError, TaskQueueService, TaskWorker, start_task_worker, task_handler
+from app.services.backup_schedule_service import BackupScheduleService, start_backup_scheduler
+from app.services.db_replication_service import (DatabaseReplicaService, ReplicationError, get_db_replicator,
+                                                 parse_restore_time, start_db_replicator)
+from app.services.incremental_backup_service import IncrementalBackupService
+from app.services.backup_manifest_service import BackupManifestService, entry_role
+from app.utils.zip_stream import stream_zip, write_zip, CompressionPolicy
+from app.utils.zip_extract import ExtractionLimits, InvalidArchiveError, check_archive, extract_member
+from app.utils.dir_swap import link_or_copy_tree, prune_retired, swap_in_directory
+from app.utils.sqlite_utils import snapshot_database, table_row_counts
+import os, zipfile, tempfile, sqlite3, shutil, configparser, itertools, hashlib, json, time
+import click
 from datetime import datetime
 from werkzeug.utils import secure_filename
 
 backup_bp = Blueprint('backup', __name__)
 
+@backup_bp.before_app_request
+def start_background_workers():
+    """Start this process's background task worker, backup scheduler and database replicator on its first request"""
+    app = current_app._get_current_object()
+    start_task_worker(app)
+    start_backup_scheduler(app)
+    start_db_replicator(app)
+
 @backup_bp.route('/', methods=['GET'])
 def index():
     """Index route for backup blueprint"""
@@ -19,63 +40,19 @@ def export_data_stream():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         zip_filename = f'job_tracker_backup_{timestamp}.zip'
         
-        def generate_zip():
-            # Create an in-memory ZIP file
-            zip_buffer = io.BytesIO()
-            
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Add database backup
-                db_path = current_app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
-                print(f"Backing up database from {db_path} to in-memory ZIP")
-
-                # Create temporary database backup - FIX: Use delete=False and manual cleanup
-                temp_db_fd, temp_db_path = tempfile.mkstemp(suffix='.db')
-                try:
-                    # Close the file descriptor so SQLite can open it
-                    os.close(temp_db_fd)
-                    
-                    print(f"Temporary database backup created at {temp_db_path}")
-                    backup_database_sqlite(db_path, temp_db_path)
-                    print("After backup_database_sqlite")
-                    zipf.write(temp_db_path, 'app.db')
-                    
-                finally:
-                    # Clean up the temporary file
-                    try:
-                        os.unlink(temp_db_path)
-                    except:
-                        pass
-                
-                print("Start of adding files to ZIP")
-                # Add files
-                file_storage_path = current_app.config['FILE_STORAGE_PATH']
-                if os.path.exists(file_storage_path):
-                    for root, dirs, files in os.walk(file_storage_path):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            print(f"Adding file {file_path} to ZIP")
-                            # Create the archive path relative to JobTrackerFiles
-                            arcname = os.path.join('JobTrackerFiles', os.path.relpath(file_path, file_storage_path))
-                            zipf.write(file_path, arcname)
-                
-                print("After adding files to ZIP")
-                # Add manifest
-                manifest = create_manifest_data()
-                zipf.writestr('manifest.json', manifest)
-            
-            zip_buffer.seek(0)
-            return zip_buffer.getvalue()
+        # ZIP chunks are produced as entries are written, so memory stays bounded
+        # and the first bytes reach the client before the archive is finished
+        zip_stream = stream_backup_archive()
         
-        # Generate the ZIP content
-        zip_content = generate_zip()
+        # Pull the first chunk now (database snapshot) so a failure can still be
+        # reported to the user instead of producing a truncated download
+        first_chunk = next(zip_stream)
         
-        # Return as a streaming response
         return Response(
-            io.BytesIO(zip_content),
+            stream_with_context(itertools.chain([first_chunk], zip_stream)),
             mimetype='application/zip',
             headers={
-                'Content-Disposition': f'attachment; filename={zip_filename}',
-                'Content-Length': str(len(zip_content))
+                'Content-Disposition': f'attachment; filename={zip_filename}'
             }
         )
         
@@ -96,33 +73,30 @@ def cloud_backup_page():
     remotes = cloud_service.list_configured_remotes() if rclone_available else []
     print(f"Found {len(remotes)} remotes: {[r['name'] for r in remotes]}")
     
-    # Get cloud backups for each remote
+    # Cloud backups come from the local catalog; remotes are only listed here the
+    # first time they are seen. The background reconciler keeps the catalog current.
     cloud_backups = {}
+    cloud_backup_errors = {}
+    catalog_synced = {}
     if rclone_available:
-        for remote in remotes:
-            print(f"\n--- Checking backups for remote: {remote['name']} ---")
-            try:
-                backups = cloud_service.list_cloud_backups(remote['name'])
-                cloud_backups[remote['name']] = backups
-                print(f"Found {len(backups)} backups for {remote['name']}")
-                
-                # Debug: show backup details
-                for backup in backups:
-                    print(f"  - {backup['name']} ({backup['size_mb']} MB)")
-                    
-            except Exception as e:
-                print(f"Error listing backups for {remote['name']}: {str(e)}")
-                current_app.logger.error(f"Error listing backups for {remote['name']}: {str(e)}")
-                cloud_backups[remote['name']] = []
+        start_catalog_reconciler(current_app._get_current_object())
+        catalog = CloudCatalogService(cloud_service)
+        remote_names = [r['name'] for r in remotes]
+        cloud_backups, cloud_backup_errors = catalog.get_backups(remote_names)
+        catalog_synced = {name: state.synced_at for name, state in catalog.get_states(remote_names).items()}
     
     print(f"\nFinal cloud_backups dict: {list(cloud_backups.keys())}")
     for remote_name, backups in cloud_backups.items():
         print(f"  {remote_name}: {len(backups)} backups")
+        for backup in backups:
+            print(f"  - {backup['name']} ({backup['size_mb']} MB)")
     
     return render_template('backup/cloud_backup.html',
                          rclone_available=rclone_available,
                          remotes=remotes,
                          cloud_backups=cloud_backups,
+                         cloud_backup_errors=cloud_backup_errors,
+                         catalog_synced=catalog_synced,
                          cloud_backup_path=cloud_service.backup_path)
 
 @backup_bp.route('/cloud/config-info', methods=['GET'])
@@ -265,106 +239,632 @@ def test_cloud_connection():
 
 @backup_bp.route('/cloud/upload', methods=['POST'])
 def upload_to_cloud():
-    """Upload backup to cloud storage"""
+    """Queue a backup upload to cloud storage and return its task id"""
     data = request.get_json()
     remote_name = data.get('remote_name')
     custom_path = data.get('custom_path')
     create_new_backup = data.get('create_new_backup', True)
+    backup_type = data.get('backup_type', 'full')  # 'full' or 'incremental'
     
     if not remote_name:
         return jsonify({'error': 'Remote name is required'}), 400
+    if backup_type not in ('full', 'incremental'):
+        return jsonify({'error': 'Invalid backup_type. Allowed values are: full, incremental'}), 400
+    if not create_new_backup:
+        return jsonify({'error': 'Existing backup upload not implemented yet'}), 400
     
     try:
-        cloud_service = CloudBackupService()
+        # Building and uploading the archive can take minutes; the task worker does it
+        # outside the request so gunicorn workers stay free
+        task = TaskQueueService().enqueue('cloud_upload', {
+            'remote_name': remote_name,
+            'custom_path': custom_path,
+            'backup_type': backup_type,
+        })
         
-        # Test connection first
-        connection_ok, conn_message = cloud_service.test_remote_connection(remote_name)
-        if not connection_ok:
-            return jsonify({'error': f'Connection failed: {conn_message}'}), 400
+        return jsonify({
+            'success': True,
+            'message': 'Backup upload queued',
+            'task_id': task.id,
+            'status_url': url_for('backup.get_task_status', task_id=task.id)
+        }), 202
         
-        # Create backup file
-        if create_new_backup:
-            # Create a proper backup filename (not temporary)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f'job_tracker_backup_{timestamp}.zip'
-            
-            # Create backup in a temporary location but with proper name
-            temp_dir = tempfile.mkdtemp()
-            temp_backup_path = os.path.join(temp_dir, backup_filename)
-            
+    except Exception as e:
+        current_app.logger.error(f"Cloud upload error: {str(e)}")
+        print(f"Exception in upload_to_cloud: {str(e)}")
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+
+@task_handler('cloud_upload')
+def run_cloud_upload(params, report):
+    """Background task: create a backup archive and upload it to a remote"""
+    remote_name = params['remote_name']
+    custom_path = params.get('custom_path')
+    backup_type = params.get('backup_type', 'full')
+    
+    cloud_service = CloudBackupService()
+    
+    # Test connection first
+    report(stage='connecting', message=f'Connecting to {remote_name}')
+    connection_ok, conn_message = cloud_service.test_remote_connection(remote_name)
+    if not connection_ok:
+        raise TaskError(f'Connection failed: {conn_message}')
+    
+    # Work out which files changed since the last backup to this remote.
+    # Without an existing chain (or with incremental off) this is a full backup.
+    incremental_service = IncrementalBackupService()
+    plan = incremental_service.plan_backup(remote_name, incremental=(backup_type == 'incremental'))
+    
+    # Create a proper backup filename (not temporary)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if plan['backup_type'] == 'incremental':
+        backup_filename = f'job_tracker_incremental_{timestamp}.zip'
+    else:
+        backup_filename = f'job_tracker_backup_{timestamp}.zip'
+    
+    transfer_timeout = current_app.config.get('RCLONE_TRANSFER_TIMEOUT', 3600)
+    manifest_fields = incremental_service.manifest_fields(plan)
+    print(f"Backing up to {backup_filename} "
+          f"({plan['backup_type']}, {len(plan['changed'])} files, {len(plan['deleted'])} deleted)")
+    
+    if current_app.config.get('RCLONE_UPLOAD_MODE', 'stream') == 'stream':
+        success, message, file_info, archive = upload_archive_streaming(
+            cloud_service, remote_name, custom_path, backup_filename,
+            plan['entries'], manifest_fields, transfer_timeout, report
+        )
+    else:
+        success, message, file_info, archive = upload_archive_file(
+            cloud_service, remote_name, custom_path, backup_filename,
+            plan['entries'], manifest_fields, transfer_timeout, report
+        )
+    
+    if not success:
+        print(f"Upload failed: {message}")
+        raise TaskError(message)
+    
+    print(f"Upload successful: {message} ({archive['size']} bytes)")
+    # Only a confirmed upload becomes the base for the next increment
+    remote_file_path = file_info['path'].split(':', 1)[1]
+    incremental_service.record_backup(remote_name, plan, remote_file_path)
+    CloudCatalogService(cloud_service).record_upload(
+        remote_name, file_info, archive['sha256'], archive['size'], archive['manifest']
+    )
+    
+    return {
+        'message': message,
+        'file_info': file_info,
+        'backup_filename': backup_filename,
+        'backup_type': plan['backup_type'],
+        'changed_files': len(plan['changed']),
+        'deleted_files': len(plan['deleted'])
+    }
+
+def upload_archive_streaming(cloud_service, remote_name, custom_path, backup_filename,
+                             file_entries, manifest_fields, timeout, report):
+    """
+    Build a backup archive while uploading it (RCLONE_UPLOAD_MODE=stream): ZIP chunks
+    go straight to rclone, so compression overlaps the transfer and no temporary
+    archive is written. Returns (success, message, file_info, archive) where archive
+    has the size, SHA-256 and manifest of what was sent.
+    """
+    archive = {'size': 0, 'manifest': None}
+    hasher = hashlib.sha256()
+    entry_stats = []
+    started = time.monotonic()
+    
+    def entries():
+        for arcname, source in iter_backup_entries(entry_stats, file_entries, manifest_fields):
+            if arcname == 'manifest.json':
+                archive['manifest'] = json.loads(source)
+            yield arcname, source
+    
+    def chunks():
+        for chunk in stream_zip(entries(), policy=CompressionPolicy.from_config(current_app.config),
+                                entry_stats=entry_stats):
+            hasher.update(chunk)
+            archive['size'] += len(chunk)
+            elapsed = time.monotonic() - started
+            report(bytes=archive['size'], speed=round(archive['size'] / elapsed) if elapsed else 0)
+            yield chunk
+    
+    # The total size isn't known until the archive is finished
+    report(stage='uploading', message=f'Creating and uploading {backup_filename}',
+           bytes=0, total_bytes=None, percent=None)
+    success, message, file_info = cloud_service.upload_backup_stream(
+        chunks(), backup_filename, remote_name, custom_path, timeout=timeout
+    )
+    archive['sha256'] = hasher.hexdigest()
+    return success, message, file_info, archive
+
+def upload_archive_file(cloud_service, remote_name, custom_path, backup_filename,
+                        file_entries, manifest_fields, timeout, report):
+    """
+    Write the backup archive to a temporary file, then upload it (RCLONE_UPLOAD_MODE=file).
+    Returns the same (success, message, file_info, archive) as upload_archive_streaming.
+    """
+    # Create backup in a temporary location but with proper name
+    temp_dir = tempfile.mkdtemp()
+    temp_backup_path = os.path.join(temp_dir, backup_filename)
+    
+    try:
+        print(f"Creating backup at: {temp_backup_path}")
+        report(stage='archiving', message=f'Creating {backup_filename}')
+        
+        # Create backup using the same archive builder as the download export
+        write_backup_archive(temp_backup_path, file_entries=file_entries, manifest_fields=manifest_fields)
+        archive = {
+            'size': os.path.getsize(temp_backup_path),
+            'sha256': CloudCatalogService.hash_file(temp_backup_path),
+            'manifest': IncrementalBackupService.read_manifest(temp_backup_path),
+        }
+        
+        # Upload to cloud with the proper filename, reporting rclone's transfer stats
+        report(stage='uploading', message=f'Uploading {backup_filename}',
+               bytes=0, total_bytes=archive['size'], percent=0)
+        success, message, file_info = cloud_service.upload_backup(
+            temp_backup_path, remote_name, custom_path,
+            timeout=timeout,
+            progress=lambda stats: report(**stats)
+        )
+        return success, message, file_info, archive
+        
+    finally:
+        # Clean up temporary directory and all files in it
+        try:
+            shutil.rmtree(temp_dir)
+            print(f"Cleaned up temporary directory: {temp_dir}")
+        except Exception as e:
+            print(f"Error cleaning up temp directory: {e}")
+
+@task_handler('scheduled_backup')
+def run_scheduled_backup(params, report):
+    """
+    Background task: the backup for one schedule slot. Writes a local archive to
+    BACKUP_LOCAL_PATH (if set) and uploads to each scheduled remote, pruning each
+    destination under the retention policy once its new backup is safely there.
+    A failing remote doesn't stop the others; the task fails only if nothing was backed up.
+    """
+    schedule = BackupScheduleService()
+    results = {}
+    errors = {}
+    
+    if params.get('local') and schedule.local_path:
+        try:
+            report(stage='archiving', message=f'Writing local backup to {schedule.local_path}')
+            os.makedirs(schedule.local_path, exist_ok=True)
+            backup_filename = f"job_tracker_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            backup_path = os.path.join(schedule.local_path, backup_filename)
+            # Written under another name first so retention never sees a partial archive
+            partial_path = f'{backup_path}.part'
             try:
-                print(f"Creating backup at: {temp_backup_path}")
-                
-                # Create backup using existing backup logic
-                with zipfile.ZipFile(temp_backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    # Add database backup
-                    db_path = current_app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
-                    
-                    # Create temporary database backup
-                    temp_db_fd, temp_db_path = tempfile.mkstemp(suffix='.db')
-                    try:
-                        os.close(temp_db_fd)
-                        backup_database_sqlite(db_path, temp_db_path)
-                        zipf.write(temp_db_path, 'app.db')
-                    finally:
-                        try:
-                            os.unlink(temp_db_path)
-                        except:
-                            pass
-                    
-                    # Add files
-                    file_storage_path = current_app.config['FILE_STORAGE_PATH']
-                    if os.path.exists(file_storage_path):
-                        for root, dirs, files in os.walk(file_storage_path):
-                            for file in files:
-                                file_path = os.path.join(root, file)
-                                arcname = os.path.join('JobTrackerFiles', os.path.relpath(file_path, file_storage_path))
-                                zipf.write(file_path, arcname)
-                    
-                    # Add manifest
-                    manifest = create_manifest_data()
-                    zipf.writestr('manifest.json', manifest)
-                
-                print(f"Backup created successfully: {backup_filename}")
-                print(f"File size: {os.path.getsize(temp_backup_path)} bytes")
-                
-                # Upload to cloud with the proper filename
-                success, message, file_info = cloud_service.upload_backup(
-                    temp_backup_path, remote_name, custom_path
-                )
-                
-                if success:
-                    print(f"Upload successful: {message}")
-                else:
-                    print(f"Upload failed: {message}")
-                
-                return jsonify({
-                    'success': success,
-                    'message': message,
-                    'file_info': file_info,
-                    'backup_filename': backup_filename  # Include the filename in response
-                }), 200 if success else 500
-                
+                size = write_backup_archive(partial_path)
+                os.replace(partial_path, backup_path)
             finally:
-                # Clean up temporary directory and all files in it
-                try:
-                    import shutil
-                    shutil.rmtree(temp_dir)
-                    print(f"Cleaned up temporary directory: {temp_dir}")
-                except Exception as e:
-                    print(f"Error cleaning up temp directory: {e}")
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            results['local'] = {'backup_filename': backup_filename, 'size': size,
+                                'retention': schedule.prune_local()}
+        except Exception as e:
+            print(f"Scheduled local backup failed: {e}")
+            errors['local'] = str(e)
+    
+    for remote_name in params.get('remotes', []):
+        try:
+            upload = run_cloud_upload({'remote_name': remote_name,
+                                       'backup_type': params.get('backup_type', 'incremental')}, report)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Scheduled backup to {remote_name} failed: {e}")
+            errors[remote_name] = str(e)
+            continue
+        # The backup is done; a failed prune is only reported and retried next time
+        try:
+            report(stage='pruning', message=f'Applying retention policy on {remote_name}')
+            upload['retention'] = schedule.prune_remote(remote_name)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Retention on {remote_name} failed: {e}")
+            upload['retention'] = {'error': str(e)}
+        results[remote_name] = upload
+    
+    if errors and not results:
+        raise TaskError('; '.join(f'{name}: {error}' for name, error in errors.items()))
+    return {'results': results, 'errors': errors}
+
+@backup_bp.cli.command('run')
+def run_backup_command():
+    """Run the scheduled backup now (for cron). Exits 1 if it fails."""
+    schedule = BackupScheduleService()
+    if not (schedule.remotes or schedule.local_path):
+        raise click.ClickException('Set BACKUP_SCHEDULE_REMOTES or BACKUP_LOCAL_PATH first')
+    
+    # Without an in-process schedule, slots are a minute long: cron entries on several
+    # hosts (or a retried job) firing for the same minute still back up once
+    task_id = schedule.enqueue_due(interval=schedule.interval or 60)
+    if task_id is None:
+        click.echo('A scheduled backup for this slot is already queued, running or done')
+        return
+    
+    task = run_task_here(task_id)
+    if task.status == 'failed':
+        raise click.ClickException(f'Scheduled backup failed: {task.error}')
+    for name, error in (task.result or {}).get('errors', {}).items():
+        click.echo(f'{name}: failed: {error}', err=True)
+    for name, outcome in (task.result or {}).get('results', {}).items():
+        retention = outcome.get('retention') or {}
+        click.echo(f"{name}: {outcome['backup_filename']} "
+                   f"({len(retention.get('deleted', []))} old backup(s) deleted)")
+
+@backup_bp.cli.command('prune')
+@click.option('--remote', 'remote_names', multiple=True,
+              help='Remote to prune (repeatable). Defaults to BACKUP_SCHEDULE_REMOTES.')
+@click.option('--local/--no-local', default=True, help='Also prune BACKUP_LOCAL_PATH.')
+@click.option('--dry-run', is_flag=True, help='List what would be deleted without deleting it.')
+def prune_backups_command(remote_names, local, dry_run):
+    """Apply the retention policy to existing backups"""
+    schedule = BackupScheduleService()
+    if not schedule.policy.enabled:
+        raise click.ClickException('Retention is disabled (all BACKUP_RETENTION_* are 0)')
+    
+    outcomes = {}
+    if local and schedule.local_path:
+        outcomes[schedule.local_path] = schedule.prune_local(dry_run=dry_run)
+    for remote_name in remote_names or schedule.remotes:
+        try:
+            outcomes[remote_name] = schedule.prune_remote(remote_name, dry_run=dry_run)
+        except RcloneError as e:
+            raise click.ClickException(str(e))
+    
+    for name, outcome in outcomes.items():
+        click.echo(f"{name}: keeping {outcome['kept']}, {'would delete' if dry_run else 'deleted'} "
+                   f"{len(outcome['deleted'])}")
+        for path in outcome['deleted']:
+            click.echo(f'  {path}')
+        for path, error in outcome['failed'].items():
+            click.echo(f'  {path}: {error}', err=True)
+
+def run_task_here(task_id):
+    """Run queued tasks in this process, unless a web worker's task worker claimed task_id first, and wait for task_id"""
+    TaskWorker(current_app._get_current_object()).run_pending()
+    queue = TaskQueueService()
+    while True:
+        db.session.expire_all()
+        task = queue.get(task_id)
+        if task.status in ('succeeded', 'failed'):
+            return task
+        time.sleep(2)
+
+@backup_bp.route('/replica', methods=['GET'])
+def database_replica_status():
+    """Generations in the continuous database replica, i.e. the times the database can be restored to"""
+    if not current_app.config.get('SQLITE_REPLICA_TARGET'):
+        return jsonify({'success': True, 'enabled': False, 'generations': []}), 200
+    
+    try:
+        replica = DatabaseReplicaService()
+        generations = replica.list_generations()
+        replicator = get_db_replicator()
+        
+        return jsonify({
+            'success': True,
+            'enabled': True,
+            'target': str(replica.target),
+            'replicator': replicator.status() if replicator else None,
+            'generations': [{
+                'id': generation['id'],
+                'started_at': generation['started_at'].astimezone().isoformat(),
+                'latest_at': generation['latest_at'].astimezone().isoformat(),
+                'segments': len(generation['segments']),
+            } for generation in generations]
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Replica status error: {str(e)}")
+        return jsonify({'error': f'Could not read the database replica: {str(e)}'}), 500
+
+@backup_bp.route('/replica/restore', methods=['POST'])
+def restore_from_replica():
+    """Queue a point-in-time restore of the database from the continuous replica - REPLACES the database"""
+    data = request.get_json(silent=True) or {}
+    target_time = data.get('target_time')
+    
+    if not current_app.config.get('SQLITE_REPLICA_TARGET'):
+        return jsonify({'error': 'Database replication is not configured'}), 400
+    try:
+        parse_restore_time(target_time)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'target_time must be an ISO 8601 date and time'}), 400
+    
+    try:
+        task = TaskQueueService().enqueue('replica_restore', {'target_time': target_time})
+        
+        return jsonify({
+            'success': True,
+            'message': 'Restore queued',
+            'task_id': task.id,
+            'status_url': url_for('backup.get_task_status', task_id=task.id)
+        }), 202
+        
+    except Exception as e:
+        current_app.logger.error(f"Replica restore error: {str(e)}")
+        return jsonify({'error': f'Restore failed: {str(e)}'}), 500
+
+@task_handler('replica_restore')
+def run_replica_restore(params, report):
+    """
+    Background task: rebuild the database as of params['target_time'] (latest if
+    empty) from the continuous replica and restore it. Attachments aren't part of
+    the replica and are left as they are.
+    """
+    target_time = parse_restore_time(params.get('target_time'))
+    
+    with tempfile.TemporaryDirectory(prefix='.replica_restore_', dir=current_app.config['APP_FOLDER']) as extract_dir:
+        try:
+            recovery = DatabaseReplicaService().restore(os.path.join(extract_dir, 'app.db'), target_time, report)
+        except ReplicationError as e:
+            raise TaskError(str(e))
+        with open(os.path.join(extract_dir, 'manifest.json'), 'w') as manifest_file:
+            json.dump(dict(recovery, backup_type='point_in_time', created_at=datetime.now().isoformat()),
+                      manifest_file, indent=2)
+        if not validate_backup(extract_dir):
+            raise TaskError('The rebuilt database is not a valid Job Tracker database')
+        
+        report(stage='restoring', message=f"Restoring the database as of {recovery['recovered_to']}")
+        queue = TaskQueueService()
+        task_row = queue.snapshot(report.task_id)
+        
+        db.session.close()
+        db.engine.dispose()
+        
+        # Written through SQLite, so the replicator ships the restore like any other change
+        restore_database_sqlite(extract_dir)
+        
+        CloudCatalogService().reset()
+        queue.reset_after_restore(keep=task_row)
+    
+    return dict(recovery, message=f"Database restored to {recovery['recovered_to']}")
+
+@backup_bp.cli.command('restore-db')
+@click.option('--at', 'target_time', help='Local time to restore to (ISO 8601, e.g. "2025-08-09 14:30"). Defaults to the latest.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the rebuilt database here instead of restoring it.')
+def restore_db_command(target_time, output):
+    """Point-in-time restore of the database from the continuous replica"""
+    try:
+        parsed_time = parse_restore_time(target_time)
+    except ValueError:
+        raise click.BadParameter('expected an ISO 8601 date and time', param_hint='--at')
+    
+    if output:
+        try:
+            recovery = DatabaseReplicaService().restore(os.path.abspath(output), parsed_time)
+        except ReplicationError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Wrote the database as of {recovery['recovered_to']} to {output} "
+                   f"({recovery['segments']} WAL segment(s), {recovery['transactions']} transaction(s))")
+        return
+    
+    task = run_task_here(TaskQueueService().enqueue('replica_restore', {'target_time': target_time}).id)
+    if task.status == 'failed':
+        raise click.ClickException(f'Restore failed: {task.error}')
+    click.echo(task.result['message'])
+
+@backup_bp.route('/verify', methods=['POST'])
+def verify_backup():
+    """Queue a check of a cloud backup, or one in BACKUP_LOCAL_PATH, against its manifest"""
+    data = request.get_json(silent=True) or {}
+    remote_name = data.get('remote_name')
+    remote_file_path = data.get('remote_file_path')
+    local_name = data.get('local_name')
+    
+    if remote_name and remote_file_path:
+        params = {'remote_name': remote_name, 'remote_file_path': remote_file_path}
+    elif local_name:
+        local_folder = current_app.config.get('BACKUP_LOCAL_PATH')
+        if not local_folder or os.path.basename(local_name) != local_name \
+                or not os.path.isfile(os.path.join(local_folder, local_name)):
+            return jsonify({'error': 'Backup not found in BACKUP_LOCAL_PATH'}), 404
+        params = {'local_path': os.path.join(local_folder, local_name)}
+    else:
+        return jsonify({'error': 'Remote name and file path, or a local backup name, are required'}), 400
+    
+    try:
+        task = TaskQueueService().enqueue('backup_verify', params)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Verification queued',
+            'task_id': task.id,
+            'status_url': url_for('backup.get_task_status', task_id=task.id)
+        }), 202
+        
+    except Exception as e:
+        current_app.logger.error(f"Verify error: {str(e)}")
+        return jsonify({'error': f'Verification failed: {str(e)}'}), 500
+
+@task_handler('backup_verify')
+def run_backup_verify(params, report):
+    """
+    Background task: check every entry of a backup archive against the sizes and
+    SHA-256 hashes in its manifest, and its database snapshot against the recorded
+    row counts. A cloud backup is downloaded once, checked against the hash recorded
+    when it was uploaded as it arrives, and its entries are hashed from the copy.
+    """
+    with tempfile.TemporaryDirectory(prefix='.verify_', dir=current_app.config['APP_FOLDER']) as work_dir:
+        if params.get('remote_name'):
+            remote_name = params['remote_name']
+            remote_file_path = params['remote_file_path']
+            cloud_service = CloudBackupService()
+            archive_path = os.path.join(work_dir, os.path.basename(remote_file_path))
+            download_archive(cloud_service, CloudCatalogService(cloud_service), remote_name,
+                             remote_file_path, archive_path, report)
+            label = f'{remote_name}:{remote_file_path}'
         else:
-            return jsonify({'error': 'Existing backup upload not implemented yet'}), 400
+            archive_path = label = params['local_path']
+        
+        report(stage='verifying', message=f'Checking {os.path.basename(label)}')
+        result = BackupManifestService().verify_archive(archive_path)
+    
+    result['archive'] = label
+    if result['ok'] and result['checksums']:
+        result['message'] = f"{result['entries']} entries match the manifest"
+    elif result['ok']:
+        result['message'] = f"{result['entries']} entries passed their CRC checks"
+    else:
+        result['message'] = f"{len(result['errors'])} problem(s) found"
+    print(f"Verified {label}: {result['message']}")
+    return result
+
+@backup_bp.cli.command('verify')
+@click.argument('archive')
+def verify_backup_command(archive):
+    """Check a backup ARCHIVE (a local path or remote:path) against its manifest. Exits 1 if it fails."""
+    if os.path.exists(archive):
+        params = {'local_path': os.path.abspath(archive)}
+    elif ':' in archive:
+        remote_name, remote_file_path = archive.split(':', 1)
+        params = {'remote_name': remote_name, 'remote_file_path': remote_file_path}
+    else:
+        raise click.BadParameter('expected an existing file or remote:path', param_hint='ARCHIVE')
+    
+    try:
+        result = run_backup_verify(params, lambda **fields: None)
+    except TaskError as e:
+        raise click.ClickException(str(e))
+    
+    for warning in result['warnings']:
+        click.echo(f'Warning: {warning}')
+    for error in result['errors']:
+        click.echo(f'  {error}', err=True)
+    summary = f"{result['archive']}: {result['message']} ({result['bytes']} bytes checked in {result['seconds']}s)"
+    if not result['ok']:
+        raise click.ClickException(summary)
+    click.echo(summary)
+
+@backup_bp.route('/diff', methods=['POST'])
+def diff_backup():
+    """
+    Show what restoring a backup would change: files added, removed and changed, and
+    row count differences per table. The backup is compared with the live data, or
+    with a second backup (base). Backups are uploaded as backup_file/base_file, or
+    named in BACKUP_LOCAL_PATH with a JSON body {"backup": ..., "base": ...}.
+    """
+    uploads = request.files
+    try:
+        with tempfile.TemporaryDirectory(prefix='.diff_', dir=current_app.config['APP_FOLDER']) as temp_dir:
+            paths = {}
+            if uploads:
+                for field, key in (('backup_file', 'backup'), ('base_file', 'base')):
+                    file = uploads.get(field)
+                    if file and file.filename:
+                        os.makedirs(os.path.join(temp_dir, key))
+                        paths[key] = os.path.join(temp_dir, key, secure_filename(file.filename))
+                        file.save(paths[key])
+            else:
+                data = request.get_json(silent=True) or {}
+                local_folder = current_app.config.get('BACKUP_LOCAL_PATH')
+                for key in ('backup', 'base'):
+                    name = data.get(key)
+                    if not name:
+                        continue
+                    if not local_folder or os.path.basename(name) != name \
+                            or not os.path.isfile(os.path.join(local_folder, name)):
+                        return jsonify({'error': f'Backup {name} not found in BACKUP_LOCAL_PATH'}), 404
+                    paths[key] = os.path.join(local_folder, name)
             
+            if 'backup' not in paths:
+                return jsonify({'error': 'No backup to compare'}), 400
+            
+            try:
+                result = BackupManifestService().compare(
+                    paths['backup'], paths.get('base'), known_hashes=IncrementalBackupService().known_hashes()
+                )
+            except (InvalidArchiveError, zipfile.BadZipFile) as e:
+                return jsonify({'error': f'Invalid backup file: {e}'}), 400
+        
+        return jsonify({'success': True, 'diff': result}), 200
+        
     except Exception as e:
-        current_app.logger.error(f"Cloud upload error: {str(e)}")
-        print(f"Exception in upload_to_cloud: {str(e)}")
-        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+        current_app.logger.error(f"Backup diff error: {str(e)}")
+        return jsonify({'error': f'Diff failed: {str(e)}'}), 500
+
+@backup_bp.cli.command('diff')
+@click.argument('archives', nargs=-1, required=True)
+@click.option('--names/--no-names', default=True, help='List the files that differ, not just how many.')
+def diff_backup_command(archives, names):
+    """
+    Show what restoring a backup would change. With one ARCHIVE it is compared with
+    the live data; with two (BASE ARCHIVE) with the first. Each is a local path or remote:path.
+    """
+    if len(archives) > 2:
+        raise click.UsageError('Give one archive, or a base archive and another')
+    
+    with tempfile.TemporaryDirectory(prefix='.diff_', dir=current_app.config['APP_FOLDER']) as work_dir:
+        try:
+            paths = [local_archive_path(archive, work_dir) for archive in archives]
+            result = BackupManifestService().compare(
+                paths[-1], paths[0] if len(paths) == 2 else None,
+                known_hashes=IncrementalBackupService().known_hashes()
+            )
+        except (TaskError, InvalidArchiveError, zipfile.BadZipFile) as e:
+            raise click.ClickException(str(e))
+    
+    files = result['files']
+    click.echo(f"{result['base']['label']} -> {result['target']['label']}: "
+               f"{len(files['added'])} added, {len(files['removed'])} removed, "
+               f"{len(files['changed'])} changed, {files['unchanged']} unchanged files")
+    if names:
+        for marker, key in (('A', 'added'), ('D', 'removed'), ('M', 'changed')):
+            for path in files[key]:
+                click.echo(f'  {marker} {path}')
+    for table, rows in result['tables'].items():
+        click.echo(f"  table {table}: {rows['base']} -> {rows['target']} ({rows['delta']:+d} rows)")
+    if not result['tables']:
+        click.echo('  no table row counts differ')
+
+def local_archive_path(archive, work_dir):
+    """A local path for an archive given as a path or remote:path, downloading it into work_dir if needed"""
+    if os.path.exists(archive):
+        return os.path.abspath(archive)
+    if ':' not in archive:
+        raise click.BadParameter(f'{archive} is not an existing file or remote:path')
+    remote_name, remote_file_path = archive.split(':', 1)
+    cloud_service = CloudBackupService()
+    local_path = os.path.join(tempfile.mkdtemp(dir=work_dir), os.path.basename(remote_file_path))
+    download_archive(cloud_service, CloudCatalogService(cloud_service), remote_name,
+                     remote_file_path, local_path, lambda **fields: None)
+    return local_path
+
+@backup_bp.route('/tasks', methods=['GET'])
+def list_tasks():
+    """Recent background tasks, newest first"""
+    kind = request.args.get('kind')
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    tasks = TaskQueueService().recent(kind=kind, limit=limit)
+    
+    return jsonify({
+        'success': True,
+        'tasks': [task.to_dict() for task in tasks]
+    }), 200
+
+@backup_bp.route('/tasks/<task_id>', methods=['GET'])
+def get_task_status(task_id):
+    """Status and progress of a background task"""
+    task = TaskQueueService().get(task_id)
+    if task is None:
+        return jsonify({'error': 'Task not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'task': task.to_dict()
+    }), 200
 
-@backup_bp.route('/cloud/download', methods=['POST'])
+@backup_bp.route('/cloud/download', methods=['GET', 'POST'])
 def download_from_cloud():
-    """Download backup from cloud storage"""
-    data = request.get_json()
+    """Stream a backup from cloud storage to the browser"""
+    # GET (a plain link) lets the browser save the stream straight to disk
+    if request.method == 'GET':
+        data = request.args
+    else:
+        data = request.get_json(silent=True) or {}
     remote_name = data.get('remote_name')
     remote_file_path = data.get('remote_file_path')
     
@@ -373,77 +873,193 @@ def download_from_cloud():
     
     try:
         cloud_service = CloudBackupService()
-        
-        # Create temporary download location with proper filename
         filename = os.path.basename(remote_file_path)
-        print(f"Expected filename: {filename}")
         
-        # Create a temporary directory
-        temp_dir = tempfile.mkdtemp()
-        local_path = os.path.join(temp_dir, filename)
+        # rclone cat writes the file to stdout as it is read from the remote, so
+        # the first bytes reach the client at once and nothing is stored locally
+        success, message, chunks = cloud_service.stream_backup(
+            remote_name, remote_file_path,
+            timeout=current_app.config.get('RCLONE_TRANSFER_TIMEOUT', 3600)
+        )
+        print(f"Download result: success={success}, message={message}")
+        if not success:
+            status = 404 if 'not found' in message.lower() else 500
+            return jsonify({'error': message or 'Download failed - file not found'}), status
         
-        print(f"Temporary download path: {local_path}")
-        print(f"Temporary directory: {temp_dir}")
+        headers = {'Content-Disposition': f'attachment; filename={filename}'}
+        # The catalog knows the size, so the browser can show download progress
+        catalogued = CloudCatalogService(cloud_service).get_backup(remote_name, remote_file_path)
+        if catalogued and catalogued.size:
+            headers['Content-Length'] = str(catalogued.size)
+            chunks = check_stream_length(chunks, catalogued.size, remote_file_path)
+        
+        return Response(stream_with_context(chunks), mimetype='application/zip', headers=headers)
         
-        try:
-            # Download file
-            success, message = cloud_service.download_backup(
-                remote_name, remote_file_path, local_path
-            )
-            
-            print(f"Download result: success={success}, message={message}")
-            
-            if success and os.path.exists(local_path):
-                # Verify file size before sending
-                file_size = os.path.getsize(local_path)
-                print(f"File exists at {local_path}, size: {file_size} bytes")
-                
-                if file_size == 0:
-                    return jsonify({'error': 'Downloaded file is empty (0 bytes)'}), 500
-                
-                # Use a callback to clean up the temp file after sending
-                def remove_file(response):
-                    try:
-                        import shutil
-                        shutil.rmtree(temp_dir)
-                        print(f"Cleaned up temporary directory: {temp_dir}")
-                    except Exception as e:
-                        print(f"Error cleaning up temp directory: {e}")
-                    return response
-                
-                # Return file as download
-                response = send_file(
-                    local_path,
-                    as_attachment=True,
-                    download_name=filename,
-                    mimetype='application/zip'
-                )
-                
-                # Register cleanup callback
-                response.call_on_close(lambda: remove_file(response))
-                
-                return response
-            else:
-                return jsonify({'error': message or 'Download failed - file not found'}), 500
-                
-        except Exception as download_error:
-            print(f"Download exception: {download_error}")
-            return jsonify({'error': f'Download failed: {str(download_error)}'}), 500
-        finally:
-            # Fallback cleanup - only if response wasn't sent successfully
-            if not success:
-                try:
-                    import shutil
-                    shutil.rmtree(temp_dir)
-                    print(f"Fallback cleanup of temporary directory: {temp_dir}")
-                except Exception as e:
-                    print(f"Error in fallback cleanup: {e}")
-                
     except Exception as e:
         current_app.logger.error(f"Cloud download error: {str(e)}")
         print(f"Route exception: {str(e)}")
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
 
+@backup_bp.route('/cloud/restore', methods=['POST'])
+def restore_from_cloud():
+    """Queue a restore from a cloud backup and return its task id - REPLACES all existing data"""
+    data = request.get_json()
+    remote_name = data.get('remote_name')
+    remote_file_path = data.get('remote_file_path')
+    
+    if not remote_name or not remote_file_path:
+        return jsonify({'error': 'Remote name and file path are required'}), 400
+    
+    try:
+        # The server fetches the archives itself, so a large backup doesn't travel
+        # through the browser twice or run into MAX_CONTENT_LENGTH
+        task = TaskQueueService().enqueue('cloud_restore', {
+            'remote_name': remote_name,
+            'remote_file_path': remote_file_path,
+        })
+        
+        return jsonify({
+            'success': True,
+            'message': 'Restore queued',
+            'task_id': task.id,
+            'status_url': url_for('backup.get_task_status', task_id=task.id)
+        }), 202
+        
+    except Exception as e:
+        current_app.logger.error(f"Cloud restore error: {str(e)}")
+        return jsonify({'error': f'Restore failed: {str(e)}'}), 500
+
+@task_handler('cloud_restore')
+def run_cloud_restore(params, report):
+    """Background task: restore a cloud backup, applying the full backup and any increments it builds on"""
+    remote_name = params['remote_name']
+    remote_file_path = params['remote_file_path']
+    
+    cloud_service = CloudBackupService()
+    catalog = CloudCatalogService(cloud_service)
+    
+    # Work beside FILE_STORAGE_PATH so restored files can be hardlinked into place
+    work_parent = os.path.dirname(os.path.abspath(current_app.config['FILE_STORAGE_PATH']))
+    os.makedirs(work_parent, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix='.cloud_restore_', dir=work_parent) as temp_dir:
+        download_dir = os.path.join(temp_dir, 'archives')
+        extract_dir = os.path.join(temp_dir, 'extracted')
+        
+        # Fetch the selected backup first: its manifest names the archives it builds on,
+        # and its database snapshot is the one restored, so both are checked before
+        # anything else is downloaded
+        target_path = os.path.join(download_dir, 'target', os.path.basename(remote_file_path))
+        download_archive(cloud_service, catalog, remote_name, remote_file_path, target_path, report)
+        
+        report(stage='validating', message=f'Checking {os.path.basename(remote_file_path)}')
+        limits = ExtractionLimits.from_config(current_app.config)
+        try:
+            manifest = extract_backup_database(target_path, extract_dir, limits)
+        except (ValueError, zipfile.BadZipFile) as e:
+            raise TaskError(f'Not a valid backup archive: {e}')
+        if not validate_backup(extract_dir):
+            raise TaskError('Invalid backup file format')
+        
+        archive_paths = []
+        chain = manifest.get('chain', [])
+        for position, chain_path in enumerate(chain):
+            local_path = os.path.join(download_dir, str(position), os.path.basename(chain_path))
+            download_archive(cloud_service, catalog, remote_name, chain_path, local_path, report,
+                             label=f'Downloading {os.path.basename(chain_path)} ({position + 1} of {len(chain) + 1})')
+            archive_paths.append(local_path)
+        archive_paths.append(target_path)
+        
+        report(stage='validating', message=f'Rebuilding backup from {len(archive_paths)} archive(s)')
+        success, message = IncrementalBackupService.rebuild_from_chain(archive_paths, extract_dir, limits)
+        if not success:
+            raise TaskError(message)
+        if not validate_backup(extract_dir):
+            raise TaskError('Invalid backup file format')
+        
+        report(stage='restoring', message='Replacing the database and files')
+        queue = TaskQueueService()
+        task_row = queue.snapshot(report.task_id)
+        staged_dir = stage_files_from_backup(extract_dir)
+        
+        # Close all database connections before replacing database
+        db.session.close()
+        db.engine.dispose()
+        
+        restore_database_and_files(extract_dir, staged_dir)
+        
+        # The restored database carries the catalog and task queue as they were when
+        # the backup was taken
+        catalog.reset()
+        queue.reset_after_restore(keep=task_row)
+    
+    return {
+        'message': f'Restore completed successfully from {len(archive_paths)} archive(s). All previous data has been replaced.',
+        'archives': len(archive_paths),
+    }
+
+def download_archive(cloud_service, catalog, remote_name, remote_file_path, local_path, report, label=None):
+    """
+    Stream one backup archive from a remote to local_path, checking it as it arrives:
+    it must start like a ZIP file, and when the catalog knows its size and SHA-256 the
+    download stops as soon as it runs past that size and fails if the hash differs.
+    """
+    filename = os.path.basename(remote_file_path)
+    catalogued = catalog.get_backup(remote_name, remote_file_path)
+    expected_size = catalogued.size if catalogued and catalogued.size else None
+    expected_sha256 = catalogued.sha256 if catalogued else None
+    
+    report(stage='downloading', message=label or f'Downloading {filename}',
+           bytes=0, total_bytes=expected_size, percent=0 if expected_size else None)
+    success, message, chunks = cloud_service.stream_backup(
+        remote_name, remote_file_path,
+        timeout=current_app.config.get('RCLONE_TRANSFER_TIMEOUT', 3600)
+    )
+    if not success:
+        raise TaskError(f'Could not download {remote_file_path}: {message}')
+    
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    hasher = hashlib.sha256()
+    received = 0
+    try:
+        with open(local_path, 'wb') as f:
+            for chunk in chunks:
+                if received == 0 and not chunk.startswith(b'PK\x03\x04'):
+                    raise TaskError(f'{filename} is not a ZIP archive')
+                received += len(chunk)
+                if expected_size and received > expected_size:
+                    raise TaskError(f'{filename} is larger than its catalogued size ({expected_size} bytes)')
+                hasher.update(chunk)
+                f.write(chunk)
+                report(bytes=received,
+                       percent=round(received * 100 / expected_size, 1) if expected_size else None)
+    except RcloneError as e:
+        raise TaskError(f'Download of {filename} failed: {e}')
+    finally:
+        chunks.close()
+    
+    if expected_size and received != expected_size:
+        raise TaskError(f'{filename} is {received} bytes but the catalog recorded {expected_size}')
+    if expected_sha256 and hasher.hexdigest() != expected_sha256:
+        raise TaskError(f'{filename} does not match the checksum recorded when it was uploaded')
+    print(f"Downloaded {remote_name}:{remote_file_path} ({received} bytes)")
+
+def check_stream_length(chunks, expected_size, remote_file_path):
+    """
+    Pass chunks through, failing if they don't add up to the Content-Length that was
+    sent. The server would otherwise cut a longer file short, and the client would
+    get a corrupt archive instead of a failed download.
+    """
+    sent = 0
+    for chunk in chunks:
+        sent += len(chunk)
+        if sent > expected_size:
+            break
+        yield chunk
+    if sent != expected_size:
+        chunks.close()
+        raise IOError(f"{remote_file_path} is {'larger' if sent > expected_size else 'smaller'} "
+                      f"than its catalogued size ({expected_size} bytes); it may have changed on the remote")
+
 @backup_bp.route('/cloud/delete', methods=['POST'])
 def delete_cloud_backup():
     """Delete backup from cloud storage"""
@@ -458,6 +1074,14 @@ def delete_cloud_backup():
         cloud_service = CloudBackupService()
         success, message = cloud_service.delete_cloud_backup(remote_name, remote_file_path)
         
+        if success:
+            CloudCatalogService(cloud_service).record_delete(remote_name, remote_file_path)
+            
+            # Later increments can't build on a chain with a missing archive; start a new full backup
+            incremental_service = IncrementalBackupService()
+            if remote_file_path in incremental_service.load_state(remote_name).get('chain', []):
+                incremental_service.reset_state(remote_name)
+        
         return jsonify({
             'success': success,
             'message': message
@@ -467,6 +1091,30 @@ def delete_cloud_backup():
         current_app.logger.error(f"Cloud delete error: {str(e)}")
         return jsonify({'error': f'Delete failed: {str(e)}'}), 500
 
+@backup_bp.route('/cloud/catalog/refresh', methods=['POST'])
+def refresh_cloud_catalog():
+    """Re-list one remote (or all of them) and update the cloud backup catalog"""
+    data = request.get_json(silent=True) or {}
+    remote_name = data.get('remote_name')
+    
+    try:
+        cloud_service = CloudBackupService()
+        if not cloud_service.check_rclone_available():
+            return jsonify({'error': 'rclone is not available'}), 400
+        
+        remote_names = [remote_name] if remote_name else [r['name'] for r in cloud_service.list_configured_remotes()]
+        errors = CloudCatalogService(cloud_service).sync(remote_names, full=True, force=True)
+        
+        return jsonify({
+            'success': not errors,
+            'message': 'Catalog refreshed' if not errors else f'Could not list {", ".join(errors)}',
+            'errors': errors
+        }), 200 if not errors else 502
+        
+    except Exception as e:
+        current_app.logger.error(f"Catalog refresh error: {str(e)}")
+        return jsonify({'error': f'Catalog refresh failed: {str(e)}'}), 500
+
 @backup_bp.route('/cloud/list-remotes', methods=['GET'])
 def list_cloud_remotes():
     """List configured rclone remotes"""
@@ -519,22 +1167,40 @@ def import_data():
             zip_path = os.path.join(temp_dir, secure_filename(file.filename))
             file.save(zip_path)
             
-            # Extract ZIP
+            # Check the archive from its central directory and manifest, and extract
+            # only the database for validation; nothing else is unpacked until it passes
             extract_dir = os.path.join(temp_dir, 'extracted')
-            with zipfile.ZipFile(zip_path, 'r') as zipf:
-                zipf.extractall(extract_dir)
+            limits = ExtractionLimits.from_config(current_app.config)
+            try:
+                manifest = extract_backup_database(zip_path, extract_dir, limits)
+            except (ValueError, zipfile.BadZipFile) as e:
+                return jsonify({'error': f'Invalid backup file: {e}'}), 400
             
             # Validate backup
             if not validate_backup(extract_dir):
                 return jsonify({'error': 'Invalid backup file format'}), 400
             
+            # An incremental archive only holds changed files; restoring it alone would lose the rest
+            if manifest.get('backup_type') == 'incremental':
+                return jsonify({'error': 'This is an incremental backup. Restore it from the cloud backup page so its full backup chain is applied.'}), 400
+            
+            # Files are staged beside FILE_STORAGE_PATH first, so a bad member rejects the
+            # import before anything is replaced
+            try:
+                staged_dir = stage_files_from_archive(zip_path, limits)
+            except InvalidArchiveError as e:
+                return jsonify({'error': f'Invalid backup file: {e}'}), 400
+            
             # Close all database connections before replacing database
             db.session.close()
             db.engine.dispose()
             
-            # Replace database and files completely
-            restore_database_sqlite(extract_dir)
-            restore_files_from_backup(extract_dir)
+            restore_database_and_files(extract_dir, staged_dir)
+            
+            # The imported database carries the catalog and task queue as they were when
+            # the backup was taken
+            CloudCatalogService().reset()
+            TaskQueueService().reset_after_restore()
             
         return jsonify({
             'success': True, 
@@ -603,99 +1269,145 @@ def export_csv():
         }
     )
 
-def create_manifest_data():
-    """Create manifest data as a JSON string"""
+def stream_backup_archive():
+    """Generate a full backup archive as ZIP chunks"""
+    entry_stats = []
+    return stream_zip(
+        iter_backup_entries(entry_stats),
+        policy=CompressionPolicy.from_config(current_app.config),
+        entry_stats=entry_stats
+    )
+
+def write_backup_archive(zip_path, file_entries=None, manifest_fields=None):
+    """
+    Write a backup archive to zip_path and return its size in bytes.
+    file_entries limits the archived files (e.g. to those changed since the last
+    incremental backup); manifest_fields are merged into the manifest.
+    """
+    entry_stats = []
+    return write_zip(
+        iter_backup_entries(entry_stats, file_entries, manifest_fields),
+        zip_path,
+        policy=CompressionPolicy.from_config(current_app.config),
+        entry_stats=entry_stats
+    )
+
+def iter_backup_entries(entry_stats=None, file_entries=None, manifest_fields=None):
+    """
+    Yield (arcname, source) pairs for a backup archive: a snapshot of the
+    database, every file under FILE_STORAGE_PATH (or only file_entries), then the manifest.
+    The database snapshot is a temporary file removed once it has been archived; its
+    row counts are taken before then for the manifest.
+    entry_stats is the list the archive writer fills in as entries are written;
+    by the time the manifest is produced it covers every other entry.
+    """
+    db_path = current_app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+    
+    temp_db_fd, temp_db_path = tempfile.mkstemp(suffix='.db')
+    try:
+        # Close the file descriptor so SQLite can open it
+        os.close(temp_db_fd)
+        backup_database_sqlite(db_path, temp_db_path)
+        table_counts = table_row_counts(temp_db_path)
+        yield 'app.db', temp_db_path
+    finally:
+        try:
+            os.unlink(temp_db_path)
+        except OSError:
+            pass
+    
+    if file_entries is not None:
+        yield from file_entries
+    else:
+        file_storage_path = current_app.config['FILE_STORAGE_PATH']
+        if os.path.exists(file_storage_path):
+            for root, dirs, files in os.walk(file_storage_path):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    # Create the archive path relative to JobTrackerFiles
+                    arcname = os.path.join('JobTrackerFiles', os.path.relpath(file_path, file_storage_path))
+                    yield arcname, file_path
+    
+    yield 'manifest.json', create_manifest_data(entry_stats, manifest_fields, table_counts).encode('utf-8')
+
+def create_manifest_data(entry_stats=None, extra_fields=None, table_counts=None):
+    """
+    Create manifest data as a JSON string. table_counts are the row counts of the
+    database snapshot in the archive; without them the live database is counted.
+    """
     import json
     from app.models import Job, JobNotes, JobActivities
     
+    compression_policy = CompressionPolicy.from_config(current_app.config)
+    
+    if table_counts is not None:
+        statistics = {
+            'total_jobs': table_counts.get('jobs', 0),
+            'total_notes': table_counts.get('job_notes', 0),
+            'total_activities': table_counts.get('job_activities', 0),
+        }
+    else:
+        statistics = {
+            'total_jobs': Job.query.count(),
+            'total_notes': JobNotes.query.count(),
+            'total_activities': JobActivities.query.count(),
+        }
+    
     manifest = {
-        'backup_version': '1.0',
+        'backup_version': '1.1',
+        'backup_type': 'full',
         'created_at': datetime.now().isoformat(),
         'database_file': 'app.db',
         'files_directory': 'JobTrackerFiles',
-        'statistics': {
-            'total_jobs': Job.query.count(),
-            'total_notes': JobNotes.query.count(),
-            'total_activities': JobActivities.query.count(),
-        },
-        'application_version': '1.0'
+        'statistics': statistics,
+        'application_version': '1.0',
+        'compression': {
+            'method': compression_policy.method,
+            'level': compression_policy.level,
+        }
     }
+    if table_counts is not None:
+        manifest['tables'] = table_counts
+    
+    if entry_stats is not None:
+        # Per-entry size, SHA-256 and compression results (every entry except the manifest itself)
+        manifest['entries'] = [dict(entry, role=entry_role(entry['name'])) for entry in entry_stats]
+        total_size = sum(entry['size'] for entry in entry_stats)
+        total_compressed = sum(entry['compressed_size'] for entry in entry_stats)
+        manifest['statistics']['total_size'] = total_size
+        manifest['statistics']['total_compressed_size'] = total_compressed
+        manifest['statistics']['compression_ratio'] = round(total_compressed / total_size, 4) if total_size else 1.0
+        manifest['statistics']['archive_seconds'] = round(sum(entry['seconds'] for entry in entry_stats), 3)
+    
+    if extra_fields:
+        manifest.update(extra_fields)
     
     return json.dumps(manifest, indent=2)
 
 def backup_database_sqlite(source_db_path, backup_db_path):
-    """Use SQLite's native backup API with Windows compatibility"""
-    import time
-    
-    # Method 1: Using sqlite3 Python module (Preferred)
-    try:
-        # Close any existing Flask-SQLAlchemy connections
-        db.session.close()
-        db.engine.dispose()
-        
-        # Small delay to ensure connections are closed on Windows
-        time.sleep(0.1)
-        
-        # Connect to source database with a timeout
-        source_conn = sqlite3.connect(source_db_path, timeout=30.0)
-        print(f"Connected to source database at {source_db_path}")
-        
-        # Connect to backup database
-        backup_conn = sqlite3.connect(backup_db_path)
-        print(f"Connected to backup database at {backup_db_path}")
-        
-        # Perform backup using SQLite's backup API
-        with source_conn:
-            source_conn.backup(backup_conn)
-        
-        print("Database backup completed successfully using SQLite backup API")
-        
-        # Explicitly close connections
-        backup_conn.close()
-        source_conn.close()
-        
-        return True
-        
-    except Exception as e:
-        # Method 2: Fallback to sqlite3 command line tool
-        print(f"SQLite backup API failed: {str(e)}. Trying command line tool...")
-        try:
-            # Ensure any Python connections are closed
-            db.session.close()
-            db.engine.dispose()
-            time.sleep(0.1)
-            
-            # Use sqlite3 command line tool with .backup command
-            cmd = [
-                'sqlite3', 
-                source_db_path, 
-                f'.backup "{backup_db_path}"'
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=60)
-            return True
-            
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as cmd_error:
-            # Method 3: Simple file copy as last resort (with retry for Windows)
-            print(f"Command line backup failed: {str(cmd_error)}. Falling back to file copy...")
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    # Ensure connections are closed
-                    db.session.close()
-                    db.engine.dispose()
-                    time.sleep(0.5)  # Longer delay for Windows
-                    
-                    shutil.copy2(source_db_path, backup_db_path)
-                    return True
-                except PermissionError as pe:
-                    if attempt < max_retries - 1:
-                        time.sleep(1)  # Wait before retry
-                        continue
-                    raise pe
+    """
+    Take an online, integrity-checked snapshot of the database. The app's connections
+    stay open and writers in other workers keep running while it is taken.
+    """
+    config = current_app.config
+    snapshot_database(
+        source_db_path, backup_db_path,
+        method=config.get('SQLITE_SNAPSHOT_METHOD', 'vacuum'),
+        pages_per_step=config.get('SQLITE_SNAPSHOT_PAGES', 256),
+        step_pause=config.get('SQLITE_SNAPSHOT_PAUSE_MS', 5) / 1000,
+        busy_timeout_ms=config.get('SQLITE_BUSY_TIMEOUT_MS', 15000),
+    )
+    print(f"Database snapshot of {source_db_path} written to {backup_db_path} and verified")
+    return True
 
 def restore_database_sqlite(extract_dir):
-    """Restore database using SQLite backup"""
+    """
+    Restore database using SQLite backup. The current database is first snapshotted
+    (with its committed -wal contents) to app.db.backup_<timestamp>, then the backup
+    is written into it through SQLite's backup API, which goes through the WAL like
+    any other write. If that fails the live database is left as it was; it is never
+    replaced with a raw file copy while -wal/-shm files may exist.
+    """
     backup_db_path = os.path.join(extract_dir, 'app.db')
     current_db_path = current_app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
     
@@ -705,40 +1417,125 @@ def restore_database_sqlite(extract_dir):
     # Create backup of current database
     if os.path.exists(current_db_path):
         backup_current = f"{current_db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        shutil.copy2(current_db_path, backup_current)
+        backup_database_sqlite(current_db_path, backup_current)
     
     # Restore database
+    busy_timeout = current_app.config.get('SQLITE_BUSY_TIMEOUT_MS', 15000) / 1000
+    backup_conn = sqlite3.connect(backup_db_path)
     try:
-        # Method 1: Using sqlite3 backup API
-        backup_conn = sqlite3.connect(backup_db_path)
-        current_conn = sqlite3.connect(current_db_path)
-        
-        backup_conn.backup(current_conn)
-        
+        current_conn = sqlite3.connect(current_db_path, timeout=busy_timeout)
+        try:
+            backup_conn.backup(current_conn)
+        finally:
+            current_conn.close()
+    except sqlite3.Error as e:
+        raise RuntimeError(f"Could not restore the database, the current database was left unchanged: {e}")
+    finally:
         backup_conn.close()
-        current_conn.close()
-        
-    except Exception as e:
-        # Fallback: Simple file copy
-        shutil.copy2(backup_db_path, current_db_path)
 
-def restore_files_from_backup(extract_dir):
-    """Restore files from backup - REPLACES all existing files"""
+def stage_files_from_backup(extract_dir):
+    """
+    Build the restored file tree next to FILE_STORAGE_PATH (hardlinked from extract_dir
+    when it is on the same filesystem) and return its path, or None if the backup has
+    no files. The live files are untouched until restore_database_and_files swaps it in.
+    """
     source_files_dir = os.path.join(extract_dir, 'JobTrackerFiles')
-    if os.path.exists(source_files_dir):
-        dest_files_dir = current_app.config['FILE_STORAGE_PATH']
-        
-        # Create backup of current files before replacing
-        if os.path.exists(dest_files_dir):
-            backup_files_dir = f"{dest_files_dir}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            print(f"Creating backup of existing files at: {backup_files_dir}")
-            shutil.move(dest_files_dir, backup_files_dir)
-        
-        # Replace with backup files
-        shutil.copytree(source_files_dir, dest_files_dir)
-        print(f"Files restored from backup to: {dest_files_dir}")
-    else:
+    if not os.path.exists(source_files_dir):
         print("No files directory found in backup - skipping file restoration")
+        return None
+    
+    staged_dir = new_files_staging_dir()
+    try:
+        linked, copied = link_or_copy_tree(source_files_dir, staged_dir)
+    except BaseException:
+        shutil.rmtree(staged_dir, ignore_errors=True)
+        raise
+    
+    print(f"Files staged from backup ({linked} linked, {copied} copied)")
+    return staged_dir
+
+def stage_files_from_archive(zip_path, limits=None):
+    """
+    Stream the files of a full backup archive into a staging tree next to
+    FILE_STORAGE_PATH and return its path, or None if the archive has no files.
+    Every member has passed its CRC check by the time this returns; the live
+    files are untouched until restore_database_and_files swaps the tree in.
+    """
+    prefix = 'JobTrackerFiles/'
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        members = check_archive(zipf, limits)
+        file_members = [(name[len(prefix):], info) for name, info in members.items() if name.startswith(prefix)]
+        if not file_members:
+            print("No files directory found in backup - skipping file restoration")
+            return None
+        
+        staged_dir = new_files_staging_dir()
+        try:
+            for relative_path, info in file_members:
+                extract_member(zipf, info, os.path.join(staged_dir, *relative_path.split('/')))
+        except BaseException:
+            shutil.rmtree(staged_dir, ignore_errors=True)
+            raise
+    
+    print(f"Files staged from backup ({len(file_members)} files)")
+    return staged_dir
+
+def restore_database_and_files(extract_dir, staged_dir):
+    """
+    Restore the database from extract_dir, then swap in the staged file tree (if any).
+    The files are only swapped once the database restore has succeeded, so a failed
+    restore leaves both the database and the files as they were.
+    """
+    try:
+        restore_database_sqlite(extract_dir)
+    except BaseException:
+        if staged_dir:
+            shutil.rmtree(staged_dir, ignore_errors=True)
+        raise
+    
+    if staged_dir:
+        replace_files_dir(staged_dir)
+
+def new_files_staging_dir():
+    """An empty directory beside FILE_STORAGE_PATH (same filesystem) to build a restored tree in"""
+    dest_files_dir = current_app.config['FILE_STORAGE_PATH']
+    # Drop staging trees left by a restore that was interrupted
+    prune_retired(dest_files_dir, keep=0, marker='.restoring_')
+    staged_dir = f"{dest_files_dir}.restoring_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    os.makedirs(staged_dir)
+    return staged_dir
+
+def replace_files_dir(staged_dir):
+    """Swap a staged tree in for FILE_STORAGE_PATH, keeping FILE_RESTORE_KEEP_BACKUPS previous trees"""
+    dest_files_dir = current_app.config['FILE_STORAGE_PATH']
+    backup_files_dir = f"{dest_files_dir}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    had_files = os.path.exists(dest_files_dir)
+    
+    swap_in_directory(staged_dir, dest_files_dir, backup_files_dir)
+    if had_files:
+        print(f"Previous files moved to: {backup_files_dir}")
+    print(f"Files restored to: {dest_files_dir}")
+    
+    for removed in prune_retired(dest_files_dir, keep=current_app.config.get('FILE_RESTORE_KEEP_BACKUPS', 3)):
+        print(f"Removed old file backup: {removed}")
+
+def extract_backup_database(zip_path, extract_dir, limits=None):
+    """
+    Check a backup archive from its central directory and manifest, then extract only
+    app.db and manifest.json into extract_dir. Returns the manifest. Raises
+    InvalidArchiveError (a ValueError) or zipfile.BadZipFile if the archive is unusable.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        members = check_archive(zipf, limits, required=('app.db', 'manifest.json'))
+        # The manifest is parsed in memory, so it gets a much tighter cap than other members
+        if members['manifest.json'].file_size > 64 * 1024 * 1024:
+            raise InvalidArchiveError('manifest.json is too large')
+        manifest = json.loads(zipf.read(members['manifest.json']))
+        if not isinstance(manifest, dict):
+            raise InvalidArchiveError('manifest.json is not a backup manifest')
+        extract_member(zipf, members['manifest.json'], os.path.join(extract_dir, 'manifest.json'))
+        extract_member(zipf, members['app.db'], os.path.join(extract_dir, 'app.db'))
+    return manifest
 
 def validate_backup(extract_dir):
     """Validate backup file structure"""
@@ -764,6 +1561,12 @@ def validate_backup(extract_dir):
                 conn.close()
                 return False
         
+        # Catch a snapshot that was corrupted in storage or transit
+        cursor.execute("PRAGMA quick_check")
+        if cursor.fetchone()[0] != 'ok':
+            conn.close()
+            return False
+        
         conn.close()
         return True
         
@@ -1,8 +1,9 @@
-from flask import Blueprint, send_from_directory, abort, request, redirect, url_for, flash, jsonify, current_app
+from flask import Blueprint, send_from_directory, abort, request, redirect, url_for, flash, jsonify
 from app import db
 from werkzeug.utils import secure_filename
 from app.models import Job
-import os, json, uuid
+from app.services.file_store_service import FileStoreService
+import os, json
 
 files_bp = Blueprint('files', __name__)
 
@@ -46,8 +47,7 @@ def download_file(job_id, file_type):
         flash(f'{file_config["prefix"]} file not found.', 'danger')
         return redirect(request.referrer or url_for('main.index'))
 
-    file_folder = os.path.join(current_app.config['FILE_STORAGE_PATH'], file_config['folder'])
-    file_path = os.path.join(file_folder, filename)
+    file_path = FileStoreService().resolve_path(filename, file_config['folder'])
 
     print(f"Attempting to download {file_config['prefix']} file: {file_path}")
 
@@ -61,8 +61,8 @@ def download_file(job_id, file_type):
     new_filename = f"{job.company}_{job.title}_{file_config['prefix']}_{job_id}{file_extension}"
 
     return send_from_directory(
-        file_folder, 
-        filename,
+        os.path.dirname(file_path),
+        os.path.basename(file_path),
         as_attachment=True,
         download_name=new_filename
     )
@@ -96,15 +96,15 @@ def delete_file():
             else:
                 return jsonify({'error': 'File not found in job.'}), 400
 
-            db.session.commit()
-            file_folder = os.path.join(current_app.config['FILE_STORAGE_PATH'], file_config['folder'])
-            file_path = os.path.join(file_folder, file_name)
+            file_store = FileStoreService()
+            try:
+                file_store.release(file_name, file_config['folder'])
+            except Exception as e:
+                db.session.rollback()
+                return jsonify({'error': f'Error deleting file from drive: {str(e)}'}), 400
 
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    return jsonify({'error': f'Error deleting file from drive: {str(e)}'}), 400
+            db.session.commit()
+            file_store.purge_unreferenced()
             
             response = {
                 'success': True,
@@ -171,6 +171,7 @@ def upload_file():
         }
         folder_name = folder_mapping.get(file_type)
 
+        file_store = FileStoreService()
         replace_existing = request.form.get('replace_existing', 'false').lower() == 'true'
         existing_file = getattr(job, file_type, None)
         if not replace_existing:
@@ -182,16 +183,12 @@ def upload_file():
             if existing_file:
                 file_replaced = True
                 print(f"Replacing existing {file_type} for job ID {job_id}")
-                # If replacing, delete the existing file from the filesystem
-                file_folder = os.path.join(current_app.config['FILE_STORAGE_PATH'], folder_name)
-                file_path = os.path.join(file_folder, existing_file)
-
-                print(f"File path to delete: {file_path}")
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                    except Exception as e:
-                        return jsonify({'error': f'Error deleting file from drive: {str(e)}'}), 400
+                # If replacing, drop this job's reference to the existing file
+                try:
+                    file_store.release(existing_file, folder_name)
+                except Exception as e:
+                    db.session.rollback()
+                    return jsonify({'error': f'Error deleting file from drive: {str(e)}'}), 400
 
 
         # Validate file size
@@ -201,20 +198,16 @@ def upload_file():
         
         # Generate secure filename
         original_filename = secure_filename(file.filename)
-        unique_filename = generate_unique_filename(original_filename)
 
         if not folder_name:
             return jsonify({'error': 'Invalid file type specified'}), 400
 
-        upload_folder = os.path.join(current_app.config['FILE_STORAGE_PATH'], folder_name)
-        # Create full file path
-        file_path = os.path.join(upload_folder, unique_filename)
-
         try:
-            # Save the file
-            file.save(file_path)
+            # Save the file into the content-addressed store
+            unique_filename = file_store.save(file.stream, original_filename)
+            file_path = file_store.resolve_path(unique_filename)
             
-            # Update the job record with the new filename
+            # Update the job record with the new file key
             setattr(job, file_type, unique_filename)
             db.session.commit()
             
@@ -222,6 +215,8 @@ def upload_file():
             db.session.rollback()
             return jsonify({'error': f'Error uploading file: {str(e)}'}), 500
 
+        file_store.purge_unreferenced()
+
 
         # # Generate secure filename
         # original_filename = secure_filename(file.filename)
@@ -277,13 +272,3 @@ def get_file_size(file):
     size = file.tell()
     file.seek(0)
     return size
-
-def generate_unique_filename(original_filename):
-    """Generate a unique filename while preserving the extension"""
-    # Get file extension
-    _, ext = os.path.splitext(original_filename)
-    # Generate unique name using UUID
-    unique_name = str(uuid.uuid4()) + ext
-    return unique_name
-
-
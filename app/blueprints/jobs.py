@@ -9,8 +9,10 @@ from werkzeug.utils import secure_filename
 from app.models import Job, Settings
 from ..services.api_service import APIService
 from ..services.github_service import GitHubService
+from ..services.search_service import SearchService
+from ..services.file_store_service import FileStoreService
 from app.utils.html_utils import sanitize_html
-import os, uuid, json
+import os, json
 import requests
 
 jobs_bp = Blueprint('jobs', __name__)
@@ -127,6 +129,37 @@ def create_github_branch():
         current_app.logger.error(f"Error creating GitHub branch: {str(e)}")
         return jsonify({'error': f'Error creating GitHub branch: {str(e)}'}), 500
 
+@jobs_bp.route('/search', methods=['GET'])
+def search():
+    """Full-text search across jobs, notes and activity briefs"""
+    query_text = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 20, type=int)
+    limit = max(1, min(limit, 100))
+    wants_json = request.args.get('format') == 'json' or \
+        request.accept_mimetypes.best == 'application/json'
+
+    try:
+        search_results = SearchService().search(query_text, limit=limit)
+    except Exception as e:
+        current_app.logger.error(f"Search failed: {str(e)}")
+        if wants_json:
+            return jsonify({'error': f'Search failed: {str(e)}'}), 500
+        flash('Search failed. Has the database been upgraded (flask db upgrade)?', 'error')
+        search_results = {'results': [], 'took_ms': 0.0}
+
+    if wants_json:
+        return jsonify({
+            'query': query_text,
+            'count': len(search_results['results']),
+            'took_ms': search_results['took_ms'],
+            'results': search_results['results']
+        }), 200
+
+    return render_template('jobs/search.html',
+                         query=query_text,
+                         results=search_results['results'],
+                         took_ms=search_results['took_ms'])
+
 @jobs_bp.route('/create', methods=['GET', 'POST'])
 def create():
     settings = Settings.query.all()
@@ -245,9 +278,9 @@ def create():
                     job.referrer = referrer
                     job.referrer_posting_id = referrer_posting_id
                     job.posting_url = posting_url
-                    job.resume_file = unique_resume_filename or job.resume_file
-                    job.job_description_file = unique_job_description_filename or job.job_description_file
-                    job.cover_letter_file = unique_cover_letter_filename or job.cover_letter_file
+                    set_job_file(job, 'resume_file', unique_resume_filename, 'Resumes')
+                    set_job_file(job, 'job_description_file', unique_job_description_filename, 'Job_Descriptions')
+                    set_job_file(job, 'cover_letter_file', unique_cover_letter_filename, 'Cover_Letters')
                     job.is_draft = False  # Mark as complete
                 else:
                     # Create new job
@@ -291,6 +324,8 @@ def create():
                 
                 # Commit the job
                 db.session.commit()
+                if draft_job_id:
+                    FileStoreService().purge_unreferenced()
                 
                 response_data = {
                     'message': 'Job created successfully' if not draft_job_id else 'Job updated successfully',
@@ -361,21 +396,20 @@ def create():
                     default_resume_setting = Settings.query.filter_by(key='default_resume').first()
                     if default_resume_setting:
                         default_resume_file = default_resume_setting.value
-                        file_path = os.path.join(current_app.config['FILE_STORAGE_PATH'], 'Resumes', default_resume_file)
+                        file_store = FileStoreService()
+                        file_path = file_store.resolve_path(default_resume_file, 'Resumes')
 
                         if not os.path.exists(file_path):
                             flash('Default resume file not found!', 'error')
                             return render_template('jobs/create.html', form=form, settings=settings, 
                                                  github_configured=github_configured, draft_job=draft_job)
 
-                        unique_resume_filename = generate_unique_filename(default_resume_file)
-                        new_file_path = os.path.join(current_app.config['FILE_STORAGE_PATH'], 'Resumes', unique_resume_filename)
                         try:
-                            # Copy the default resume file to a new unique filename
-                            os.makedirs(os.path.dirname(new_file_path), exist_ok=True)
-                            with open(file_path, 'rb') as src_file:
-                                with open(new_file_path, 'wb') as dest_file:
-                                    dest_file.write(src_file.read())
+                            # Reference the stored default resume instead of copying it per job
+                            if file_store.add_reference(default_resume_file):
+                                unique_resume_filename = default_resume_file
+                            else:
+                                unique_resume_filename = file_store.save_file(file_path)
                         except Exception as e:
                             flash(f'Error using default resume file: {str(e)}', 'error')
                             return render_template('jobs/create.html', form=form, settings=settings, 
@@ -384,14 +418,10 @@ def create():
                 # Handle uploaded resume file
                 if resume_file and not use_default_resume:
                     original_resume_filename = secure_filename(resume_file.filename)
-                    unique_resume_filename = generate_unique_filename(original_resume_filename)
-
-                    # Create full file path
-                    file_path = os.path.join(current_app.config['FILE_STORAGE_PATH'], 'Resumes', unique_resume_filename)
 
                     try:
-                        # Save the file
-                        resume_file.save(file_path)
+                        # Save the file into the content-addressed store
+                        unique_resume_filename = FileStoreService().save(resume_file.stream, original_resume_filename)
                         
                     except Exception as e:
                         flash(f'Error uploading file: {str(e)}', 'error')
@@ -400,28 +430,20 @@ def create():
                 unique_job_description_filename = None
                 if job_description_file:
                     original_job_description_filename = secure_filename(job_description_file.filename)
-                    unique_job_description_filename = generate_unique_filename(original_job_description_filename)
-
-                    # Create full file path
-                    file_path = os.path.join(current_app.config['FILE_STORAGE_PATH'], 'Job_Descriptions', unique_job_description_filename)
 
                     try:
-                        # Save the file
-                        job_description_file.save(file_path)
+                        # Save the file into the content-addressed store
+                        unique_job_description_filename = FileStoreService().save(job_description_file.stream, original_job_description_filename)
                     except Exception as e:
                         flash(f'Error uploading file: {str(e)}', 'error')
 
                 unique_cover_letter_filename = None
                 if cover_letter_file:
                     original_cover_letter_filename = secure_filename(cover_letter_file.filename)
-                    unique_cover_letter_filename = generate_unique_filename(original_cover_letter_filename)
-
-                    # Create full file path
-                    file_path = os.path.join(current_app.config['FILE_STORAGE_PATH'], 'Cover_Letters', unique_cover_letter_filename)
 
                     try:
-                        # Save the file
-                        cover_letter_file.save(file_path)
+                        # Save the file into the content-addressed store
+                        unique_cover_letter_filename = FileStoreService().save(cover_letter_file.stream, original_cover_letter_filename)
                     except Exception as e:
                         flash(f'Error uploading file: {str(e)}', 'error')
 
@@ -449,9 +471,9 @@ def create():
                     job.referrer = referrer
                     job.referrer_posting_id = referrer_posting_id
                     job.posting_url = posting_url
-                    job.resume_file = unique_resume_filename or job.resume_file
-                    job.job_description_file = unique_job_description_filename or job.job_description_file
-                    job.cover_letter_file = unique_cover_letter_filename or job.cover_letter_file
+                    set_job_file(job, 'resume_file', unique_resume_filename, 'Resumes')
+                    set_job_file(job, 'job_description_file', unique_job_description_filename, 'Job_Descriptions')
+                    set_job_file(job, 'cover_letter_file', unique_cover_letter_filename, 'Cover_Letters')
                     job.is_draft = False  # Mark as complete
                 else:
                     # Create new job
@@ -496,6 +518,8 @@ def create():
                             flash(f'GitHub integration error: {str(e)}', 'warning')
                     
                     db.session.commit()
+                    if draft_job:
+                        FileStoreService().purge_unreferenced()
                     flash('Job created successfully!' if not draft_job else 'Job updated successfully!', 'success')
                     return redirect('/')
                 except Exception as e:
@@ -605,6 +629,7 @@ def delete(job_id):
 
             db.session.delete(job)
             db.session.commit()
+            FileStoreService().purge_unreferenced()
             flash('Job deleted successfully!', 'success')
         else:
             print("Form validation failed. Errors:", form.errors)
@@ -614,15 +639,20 @@ def delete(job_id):
     return render_template('jobs/delete.html', job=job, form=form)
 
 def delete_file(file_name, folder):
-    file_folder = os.path.join(current_app.config['FILE_STORAGE_PATH'], folder)
-    file_path = os.path.join(file_folder, file_name)
+    """Drop a job's reference to a stored file (legacy files are removed from folder)"""
+    try:
+        FileStoreService().release(file_name, folder)
+        print(f"File {file_name} released from {folder}.")
+    except Exception as e:
+        print(f"Error deleting file {file_name} from {folder} folder: {str(e)}")
 
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-            print(f"File {file_name} deleted successfully from {folder} folder.")
-        except Exception as e:
-            print(f"Error deleting file {file_name} from {folder} folder: {str(e)}")
+def set_job_file(job, field, file_key, folder):
+    """Point a job file field at a new file key, releasing the file it referenced before"""
+    if not file_key:
+        return
+    if getattr(job, field):
+        delete_file(getattr(job, field), folder)
+    setattr(job, field, file_key)
 
 @jobs_bp.route('/<int:job_id>/file-cards', methods=['GET', 'POST'])
 def file_cards(job_id):
@@ -638,26 +668,10 @@ def process_file_upload(file, folder_name):
     if file_ext not in allowed_extensions:
         return jsonify({'error': f'Invalid file type for {file.filename}. Only PDF and document files allowed!'}), 400
     
-    # Generate unique filename and save file
+    # Save the file into the content-addressed store and return its file key
     original_filename = secure_filename(file.filename)
-    unique_filename = generate_unique_filename(original_filename)
-    
-    # Create full file path
-    file_path = os.path.join(current_app.config['FILE_STORAGE_PATH'], folder_name, unique_filename)
     
     try:
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        # Save the file
-        file.save(file_path)
-        return unique_filename
+        return FileStoreService().save(file.stream, original_filename)
     except Exception as e:
         return jsonify({'error': f'Error uploading {file.filename}: {str(e)}'}), 500
-
-def generate_unique_filename(original_filename):
-    """Generate a unique filename while preserving the extension"""
-    # Get file extension
-    _, ext = os.path.splitext(original_filename)
-    # Generate unique name using UUID
-    unique_name = str(uuid.uuid4()) + ext
-    return unique_name
\ No newline at end of file
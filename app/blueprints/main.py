@@ -1,59 +1,127 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, jsonify
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
 from app.models import Job
+from app.utils.cache import TTLCache
+from app.utils.pagination import KeysetPagination
 
 main_bp = Blueprint('main', __name__)
 
+# Status filter -> (posting_status value, page title)
+STATUS_FILTERS = {
+    'open': ('Open', "Open Job Applications"),
+    'closed': ('Closed', "Closed Job Applications"),
+    'all': (None, "All Job Applications"),
+}
+
+# Sort option -> column used as the leading keyset pagination key. Pages are
+# ordered by (column, id); each status filter needs a jobs index on its filter
+# columns followed by the column (see Job.__table_args__).
+SORT_COLUMNS = {
+    'created': Job.created_dt,
+    'activity': Job.last_activity_at,
+}
+
+# Total job counts per status filter. Avoids a COUNT(*) on every page view;
+# cleared locally on job writes and expires for other workers after the TTL.
+job_count_cache = TTLCache(ttl=60)
+
 @main_bp.route('/')
 def index():
     # Get filter parameters
     status_filter = request.args.get('status', 'open')  # Default to 'open'
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    
-    # Build query based on status filter - exclude draft jobs
-    query = Job.query.filter(Job.is_draft == False)
-    
-    if status_filter == 'open':
-        query = query.filter_by(posting_status="Open")
-        title = "Open Job Applications"
-    elif status_filter == 'closed':
-        query = query.filter_by(posting_status="Closed")
-        title = "Closed Job Applications"
-    elif status_filter == 'all':
-        title = "All Job Applications"
-    else:
-        # Default to open if invalid status provided
-        query = query.filter_by(posting_status="Open")
-        title = "Open Job Applications"
+    sort = request.args.get('sort', 'created')  # 'created' or 'activity'
+
+    # Default to open if invalid status provided
+    if status_filter not in STATUS_FILTERS:
         status_filter = 'open'
-    
-    # Apply pagination
-    jobs_pagination = query.paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
-    )
-    
-    return render_template('index.html', 
+    if sort not in SORT_COLUMNS:
+        sort = 'created'
+    title = STATUS_FILTERS[status_filter][1]
+
+    jobs_pagination = paginate_jobs(status_filter, sort)
+
+    return render_template('index.html',
                          jobs=jobs_pagination.items,
                          pagination=jobs_pagination,
                          title=title,
-                         current_status=status_filter)
+                         current_status=status_filter,
+                         current_sort=sort)
 
 @main_bp.route('/all')
 def all_jobs():
     title = "All Job Applications"
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    
+
     # Paginate the query - exclude draft jobs
-    jobs_pagination = Job.query.filter(Job.is_draft == False).paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
-    )
-    
-    return render_template('index.html', 
+    jobs_pagination = paginate_jobs('all', 'created')
+
+    return render_template('index.html',
                          jobs=jobs_pagination.items,
                          pagination=jobs_pagination,
-                         title=title)
\ No newline at end of file
+                         title=title)
+
+@main_bp.route('/api/jobs', methods=['GET'])
+def api_list_jobs():
+    """JSON job list using the same cursor pagination as the index page"""
+    status_filter = request.args.get('status', 'open')
+    sort = request.args.get('sort', 'created')
+
+    if status_filter not in STATUS_FILTERS:
+        return jsonify({'error': f'Invalid status. Allowed values are: {", ".join(STATUS_FILTERS)}'}), 400
+    if sort not in SORT_COLUMNS:
+        return jsonify({'error': f'Invalid sort. Allowed values are: {", ".join(SORT_COLUMNS)}'}), 400
+
+    jobs_pagination = paginate_jobs(status_filter, sort, eager_load_children=False)
+
+    return jsonify({
+        'jobs': [job.to_summary_dict() for job in jobs_pagination.items],
+        'per_page': jobs_pagination.per_page,
+        'total': jobs_pagination.total,
+        'next_cursor': jobs_pagination.next_cursor,
+        'prev_cursor': jobs_pagination.prev_cursor,
+    }), 200
+
+def paginate_jobs(status_filter, sort, eager_load_children=True):
+    """
+    Build a KeysetPagination for the job list from the current request's
+    per_page/after/before parameters.
+    """
+    per_page = request.args.get('per_page', 10, type=int)
+    per_page = max(1, min(per_page, 100))
+
+    query = job_list_query(eager_load_children)
+    posting_status = STATUS_FILTERS[status_filter][0]
+    if posting_status:
+        query = query.filter(Job.posting_status == posting_status)
+
+    total = job_count_cache.get_or_set(status_filter, lambda: query.order_by(None).count())
+
+    return KeysetPagination(
+        query,
+        SORT_COLUMNS[sort],
+        Job.id,
+        per_page=per_page,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        total=total
+    )
+
+def job_list_query(eager_load_children=True):
+    """
+    Base query for the job list views (non-draft jobs).
+    Notes and activities are loaded with one extra SELECT ... IN query each
+    for the whole page instead of two lazy loads per row in the templates.
+    """
+    query = Job.query.filter(Job.is_draft == False)
+    if eager_load_children:
+        query = query.options(
+            selectinload(Job.notes),
+            selectinload(Job.activities)
+        )
+    return query
+
+@event.listens_for(Job, 'after_insert')
+@event.listens_for(Job, 'after_update')
+@event.listens_for(Job, 'after_delete')
+def clear_job_count_cache(mapper, connection, target):
+    job_count_cache.clear()
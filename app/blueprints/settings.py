@@ -5,6 +5,7 @@ from wtforms import StringField, SelectField, BooleanField, SubmitField, TextAre
 from wtforms.validators import DataRequired
 from flask_wtf.file import FileField, FileRequired, FileAllowed
 from app.models import Job, Settings, JobActivityTypes
+from app.services.file_store_service import FileStoreService
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import os
@@ -65,18 +66,21 @@ def upload_default_resume():
     if file and allowed_file(file.filename):
         _, ext = os.path.splitext(file.filename)
 
-        filename = f"default_resume{ext}"
-        file.save(os.path.join(current_app.config['FILE_STORAGE_PATH'], 'Resumes', filename))
-        flash('Default resume uploaded successfully!', 'success')
+        # Stored once in the file store; jobs using the default resume reference the same file
+        file_store = FileStoreService()
+        filename = file_store.save(file.stream, f"default_resume{ext}")
         
-        # Optionally, you can update the Settings table with the new resume file path
+        # Point the default_resume setting at the stored file, releasing the previous one
         setting = Settings.query.filter_by(key='default_resume').first()
         if setting:
+            file_store.release(setting.value, 'Resumes')
             setting.value = filename
         else:
             setting = Settings(key='default_resume', value=filename)
             db.session.add(setting)
         db.session.commit()
+        file_store.purge_unreferenced()
+        flash('Default resume uploaded successfully!', 'success')
 
         return jsonify({'success': True}), 200
 
@@ -84,24 +88,26 @@ def upload_default_resume():
 
 @settings_bp.route('/api/download_default_resume', methods=['GET'])
 def download_default_resume():
-    resume_path = os.path.join(current_app.config['FILE_STORAGE_PATH'], 'Resumes', 'default_resume.pdf')
-    if os.path.exists(resume_path):
-        return send_file(resume_path, as_attachment=True)
+    setting = Settings.query.filter_by(key='default_resume').first()
+    if setting:
+        resume_path = FileStoreService().resolve_path(setting.value, 'Resumes')
+        if os.path.exists(resume_path):
+            _, ext = os.path.splitext(setting.value)
+            return send_file(resume_path, as_attachment=True, download_name=f"default_resume{ext}")
     return jsonify({'error': 'Default resume not found'}), 404
 
 
 @settings_bp.route('/api/delete_default_resume', methods=['DELETE'])
 def delete_default_resume():
-    resume_path = os.path.join(current_app.config['FILE_STORAGE_PATH'], 'Resumes', 'default_resume.pdf')
-    if os.path.exists(resume_path):
-        os.remove(resume_path)
+    setting = Settings.query.filter_by(key='default_resume').first()
+    if setting:
+        # Jobs created with the default resume keep their own reference to the file
+        file_store = FileStoreService()
+        file_store.release(setting.value, 'Resumes')
+        db.session.delete(setting)
+        db.session.commit()
+        file_store.purge_unreferenced()
         flash('Default resume deleted successfully!', 'success')
         
-        # Optionally, remove the setting from the database
-        setting = Settings.query.filter_by(key='default_resume').first()
-        if setting:
-            db.session.delete(setting)
-            db.session.commit()
-        
         return jsonify({'success': True}), 200
-    return jsonify({'error': 'Default resume not found'}), 404
\ No newline at end of file
+    return jsonify({'error': 'Default resume not found'}), 404
@@ -1,19 +1,33 @@
 from app import db
-from sqlalchemy import Index
+from sqlalchemy import Index, DDL, event, inspect
 from sqlalchemy.types import JSON
 from datetime import datetime
 from flask import current_app
+from app.utils.html_utils import html_to_text
 import pytz
 
 
 class Job(db.Model):
     __tablename__ = 'jobs'
+    __table_args__ = (
+        # Job list: non-draft jobs filtered by status, newest first or by recent activity.
+        # Keyset pages walk (sort column, id); SQLite appends the rowid (id) to every index.
+        Index('ix_jobs_draft_status_created', 'is_draft', 'posting_status', 'created_dt'),
+        Index('ix_jobs_draft_status_last_activity', 'is_draft', 'posting_status', 'last_activity_at'),
+        # Unfiltered ("all") job list: without posting_status in between, pages come
+        # straight off the index in sort order instead of sorting every job
+        Index('ix_jobs_draft_created', 'is_draft', 'created_dt', 'id'),
+        Index('ix_jobs_draft_last_activity', 'is_draft', 'last_activity_at', 'id'),
+        # Duplicate posting detection on job creation
+        Index('ix_jobs_posting_id', 'posting_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     company = db.Column(db.String(100), nullable=False)
     company_website = db.Column(db.String(200), nullable=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
+    description_text = db.Column(db.Text, nullable=True)  # Plain text of description for the search index, set on flush
     description_format = db.Column(db.String(20), default='html')  # Track format: 'html', 'text', 'markdown'
     location = db.Column(db.String(100), nullable=True)
     referrer = db.Column(db.String(100), nullable=True)
@@ -23,13 +37,18 @@ class Job(db.Model):
     remote_option = db.Column(db.String(50), nullable=True)
     posting_id = db.Column(db.String(100), nullable=True)
     created_dt = db.Column(db.DateTime, default=lambda: datetime.now(pytz.timezone(current_app.config['LOCAL_TIMEZONE'])))
-    job_description_file = db.Column(db.String(50), nullable=True)
-    resume_file = db.Column(db.String(50), nullable=True)
-    cover_letter_file = db.Column(db.String(50), nullable=True)
+    # File keys in the content-addressed store ("<sha256><ext>"), see FileStoreService
+    job_description_file = db.Column(db.String(80), nullable=True)
+    resume_file = db.Column(db.String(80), nullable=True)
+    cover_letter_file = db.Column(db.String(80), nullable=True)
     posting_status = db.Column(db.String(50), default='Open')
     posting_url = db.Column(db.String(200), nullable=True)
     github_branch = db.Column(db.String(100), nullable=True)  # New field for GitHub branch name
     is_draft = db.Column(db.Boolean, default=False)  # New field to track draft status
+    # Denormalized counters, maintained by the SQLite triggers defined below
+    notes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    activities_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = db.Column(db.DateTime, nullable=True)  # Latest of created_dt, note and activity dates
     notes = db.relationship('JobNotes', backref='Job', cascade='all, delete-orphan')
     activities = db.relationship('JobActivities', backref='Job', cascade='all, delete-orphan')
 
@@ -59,16 +78,41 @@ class Job(db.Model):
             'posting_url': self.posting_url,
             'github_branch': self.github_branch,
             'is_draft': self.is_draft,
+            'notes_count': self.notes_count,
+            'activities_count': self.activities_count,
+            'last_activity_at': self.last_activity_at,
             'notes': [note.to_dict() for note in self.notes],
             'activities': [activity.to_dict() for activity in self.activities]
         }
+
+    def to_summary_dict(self):
+        """Lightweight representation for job lists (no description or child rows)"""
+        return {
+            'id': self.id,
+            'company': self.company,
+            'title': self.title,
+            'location': self.location,
+            'remote_option': self.remote_option,
+            'salary_range_low': self.salary_range_low,
+            'salary_range_high': self.salary_range_high,
+            'posting_status': self.posting_status,
+            'created_dt': self.created_dt,
+            'last_activity_at': self.last_activity_at,
+            'notes_count': self.notes_count,
+            'activities_count': self.activities_count,
+            'has_files': bool(self.resume_file or self.job_description_file or self.cover_letter_file)
+        }
     
 class JobNotes(db.Model):
     __tablename__ = 'job_notes'
+    __table_args__ = (
+        Index('ix_job_notes_job_id_created_at', 'job_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    content_text = db.Column(db.Text, nullable=True)  # Plain text of content for the search index, set on flush
     content_format = db.Column(db.String(20), default='html')
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(pytz.timezone(current_app.config['LOCAL_TIMEZONE'])))
 
@@ -86,6 +130,9 @@ class JobNotes(db.Model):
 
 class JobActivities(db.Model):
     __tablename__ = 'job_activities'
+    __table_args__ = (
+        Index('ix_job_activities_job_id_activity_date', 'job_id', 'activity_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), nullable=False)
@@ -137,4 +184,257 @@ class Settings(db.Model):
             'id': self.id,
             'key': self.key,
             'value': self.value
-        }
\ No newline at end of file
+        }
+
+class StoredFile(db.Model):
+    """A file blob in the content-addressed store, shared by every reference to the same content"""
+    __tablename__ = 'stored_files'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(pytz.timezone(current_app.config['LOCAL_TIMEZONE'])))
+
+    def __repr__(self):
+        return f'<StoredFile {self.sha256[:12]} refs={self.ref_count}>'
+
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'size': self.size,
+            'ref_count': self.ref_count,
+            'created_at': self.created_at
+        }
+
+class CloudBackup(db.Model):
+    """Catalog entry for a backup archive on an rclone remote, so listing backups doesn't hit the remote"""
+    __tablename__ = 'cloud_backups'
+    __table_args__ = (
+        Index('ix_cloud_backups_remote_path', 'remote', 'path', unique=True),
+        # Cloud page: each remote's backups, newest first
+        Index('ix_cloud_backups_remote_modified', 'remote', 'modified'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    remote = db.Column(db.String(100), nullable=False)
+    path = db.Column(db.String(500), nullable=False)  # Path on the remote, including RCLONE_BACKUP_PATH
+    relative_path = db.Column(db.String(500), nullable=True)
+    name = db.Column(db.String(200), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    modified = db.Column(db.String(40), nullable=True)  # rclone ModTime (RFC 3339)
+    sha256 = db.Column(db.String(64), nullable=True)  # Known for archives uploaded by this app
+    backup_type = db.Column(db.String(20), nullable=False, default='full')
+    detection_method = db.Column(db.String(30), nullable=True)
+    manifest_summary = db.Column(JSON, nullable=True)
+    last_seen_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<CloudBackup {self.remote}:{self.path}>'
+
+    def to_dict(self):
+        # Same shape as CloudBackupService.list_cloud_backups() entries
+        return {
+            'name': self.name,
+            'path': self.path,
+            'relative_path': self.relative_path,
+            'size': self.size,
+            'size_mb': round((self.size or 0) / (1024 * 1024), 2),
+            'modified': self.modified or '',
+            'remote': self.remote,
+            'backup_type': self.backup_type,
+            'detection_method': self.detection_method or 'standard_pattern',
+            'sha256': self.sha256,
+            'manifest': self.manifest_summary,
+        }
+
+class CloudBackupRemote(db.Model):
+    """When the cloud_backups catalog was last reconciled with each remote"""
+    __tablename__ = 'cloud_backup_remotes'
+
+    remote = db.Column(db.String(100), primary_key=True)
+    synced_at = db.Column(db.DateTime, nullable=True)
+    full_synced_at = db.Column(db.DateTime, nullable=True)
+    sync_started_at = db.Column(db.DateTime, nullable=True)  # Lease so only one worker lists a remote at a time
+    attempted_at = db.Column(db.DateTime, nullable=True)  # Last sync attempt, successful or not
+    last_error = db.Column(db.String(500), nullable=True)
+
+    def __repr__(self):
+        return f'<CloudBackupRemote {self.remote}>'
+
+    def to_dict(self):
+        return {
+            'remote': self.remote,
+            'synced_at': self.synced_at,
+            'full_synced_at': self.full_synced_at,
+            'last_error': self.last_error
+        }
+
+class BackgroundTask(db.Model):
+    """A unit of work (e.g. a cloud upload) run by the background task worker instead of the request"""
+    __tablename__ = 'background_tasks'
+    __table_args__ = (
+        # Worker: oldest queued task first
+        Index('ix_background_tasks_status_created', 'status', 'created_at'),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    params = db.Column(JSON, nullable=True)
+    progress = db.Column(JSON, nullable=True)
+    result = db.Column(JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    worker = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<BackgroundTask {self.id} {self.kind} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': self.params,
+            'progress': self.progress or {},
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+
+# Recomputes jobs.last_activity_at for the job row being updated. Multi-argument
+# MAX() returns NULL if any argument is NULL, hence the COALESCE/NULLIF pair.
+LAST_ACTIVITY_SQL = """NULLIF(MAX(
+        COALESCE(jobs.created_dt, ''),
+        COALESCE((SELECT MAX(created_at) FROM job_notes WHERE job_id = jobs.id), ''),
+        COALESCE((SELECT MAX(activity_date) FROM job_activities WHERE job_id = jobs.id), '')
+    ), '')"""
+
+JOB_COUNTER_TRIGGERS = {
+    'jobs': [
+        """CREATE TRIGGER IF NOT EXISTS jobs_last_activity_insert AFTER INSERT ON jobs
+        WHEN NEW.last_activity_at IS NULL
+        BEGIN
+            UPDATE jobs SET last_activity_at = NEW.created_dt WHERE id = NEW.id;
+        END""",
+    ],
+    'job_notes': [
+        """CREATE TRIGGER IF NOT EXISTS job_notes_counter_insert AFTER INSERT ON job_notes
+        BEGIN
+            UPDATE jobs SET notes_count = notes_count + 1,
+                last_activity_at = NULLIF(MAX(COALESCE(last_activity_at, ''), COALESCE(NEW.created_at, '')), '')
+            WHERE id = NEW.job_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS job_notes_counter_delete AFTER DELETE ON job_notes
+        BEGIN
+            UPDATE jobs SET notes_count = notes_count - 1,
+                last_activity_at = {LAST_ACTIVITY_SQL}
+            WHERE id = OLD.job_id;
+        END""",
+    ],
+    'job_activities': [
+        """CREATE TRIGGER IF NOT EXISTS job_activities_counter_insert AFTER INSERT ON job_activities
+        BEGIN
+            UPDATE jobs SET activities_count = activities_count + 1,
+                last_activity_at = NULLIF(MAX(COALESCE(last_activity_at, ''), COALESCE(NEW.activity_date, '')), '')
+            WHERE id = NEW.job_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS job_activities_counter_delete AFTER DELETE ON job_activities
+        BEGIN
+            UPDATE jobs SET activities_count = activities_count - 1,
+                last_activity_at = {LAST_ACTIVITY_SQL}
+            WHERE id = OLD.job_id;
+        END""",
+    ],
+}
+
+
+# Full-text search index: one FTS5 row per job (rowid = jobs.id) holding the job
+# fields plus the plain text of all its notes and activity briefs. The plain text
+# columns are filled in from Python (see the flush listeners below), so the triggers
+# only use built-in SQL and any SQLite client can write to these tables. Rows written
+# without them (e.g. from the sqlite3 shell) are indexed with their markup; set the
+# plain text column to NULL when changing the HTML outside the app.
+NOTES_TEXT_SQL = "(SELECT group_concat(COALESCE(content_text, content), ' ') FROM job_notes WHERE job_id = {job_id})"
+ACTIVITIES_TEXT_SQL = "(SELECT group_concat(activity_brief, ' ') FROM job_activities WHERE job_id = {job_id})"
+
+JOB_SEARCH_DDL = {
+    'jobs': [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+            company, title, location, description, notes, activities,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS jobs_fts_insert AFTER INSERT ON jobs
+        BEGIN
+            INSERT INTO jobs_fts(rowid, company, title, location, description, notes, activities)
+            VALUES (NEW.id, NEW.company, NEW.title, NEW.location, COALESCE(NEW.description_text, NEW.description), '', '');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS jobs_fts_update AFTER UPDATE OF company, title, location, description, description_text ON jobs
+        BEGIN
+            UPDATE jobs_fts SET company = NEW.company, title = NEW.title, location = NEW.location,
+                description = COALESCE(NEW.description_text, NEW.description)
+            WHERE rowid = NEW.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS jobs_fts_delete AFTER DELETE ON jobs
+        BEGIN
+            DELETE FROM jobs_fts WHERE rowid = OLD.id;
+        END""",
+    ],
+    'job_notes': [
+        f"""CREATE TRIGGER IF NOT EXISTS job_notes_fts_insert AFTER INSERT ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS job_notes_fts_update AFTER UPDATE OF content, content_text ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS job_notes_fts_delete AFTER DELETE ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='OLD.job_id')} WHERE rowid = OLD.job_id;
+        END""",
+    ],
+    'job_activities': [
+        f"""CREATE TRIGGER IF NOT EXISTS job_activities_fts_insert AFTER INSERT ON job_activities
+        BEGIN
+            UPDATE jobs_fts SET activities = {ACTIVITIES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS job_activities_fts_update AFTER UPDATE OF activity_brief ON job_activities
+        BEGIN
+            UPDATE jobs_fts SET activities = {ACTIVITIES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS job_activities_fts_delete AFTER DELETE ON job_activities
+        BEGIN
+            UPDATE jobs_fts SET activities = {ACTIVITIES_TEXT_SQL.format(job_id='OLD.job_id')} WHERE rowid = OLD.job_id;
+        END""",
+    ],
+}
+
+# Create the triggers (and the FTS table) alongside their tables for fresh
+# databases (db.create_all). Existing databases get them from migrations.
+for ddl_by_table in (JOB_COUNTER_TRIGGERS, JOB_SEARCH_DDL):
+    for table_name, statements in ddl_by_table.items():
+        for ddl_sql in statements:
+            event.listen(db.metadata.tables[table_name], 'after_create', DDL(ddl_sql))
+
+
+@event.listens_for(Job, 'before_insert')
+@event.listens_for(Job, 'before_update')
+def set_job_description_text(mapper, connection, target):
+    if target.description_text is None or inspect(target).attrs.description.history.has_changes():
+        target.description_text = html_to_text(target.description)
+
+
+@event.listens_for(JobNotes, 'before_insert')
+@event.listens_for(JobNotes, 'before_update')
+def set_note_content_text(mapper, connection, target):
+    if target.content_text is None or inspect(target).attrs.content.history.has_changes():
+        target.content_text = html_to_text(target.content)
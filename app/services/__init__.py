@@ -1,4 +1,7 @@
 from .api_service import APIService
 from .cloud_backup_service import CloudBackupService
+from .search_service import SearchService
+from .file_store_service import FileStoreService
+from .cloud_catalog_service import CloudCatalogService
 
-__all__ = ['APIService', 'GitHubService', 'CloudBackupService']
\ No newline at end of file
+__all__ = ['APIService', 'GitHubService', 'CloudBackupService', 'SearchService', 'FileStoreService', 'CloudCatalogService']
\ No newline at end of file
@@ -0,0 +1,299 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+from flask import current_app
+from typing import Dict, List, Optional
+from app.utils.file_hashing import hash_files, hash_zip_members
+from app.utils.sqlite_utils import SnapshotError, table_row_counts, verify_database
+from app.utils.zip_extract import ExtractionLimits, InvalidArchiveError, check_archive
+
+FILES_PREFIX = 'JobTrackerFiles/'
+
+
+def entry_role(arcname: str) -> str:
+    """What an archive member is: the database snapshot, the manifest or an uploaded file"""
+    if arcname == 'app.db':
+        return 'database'
+    if arcname == 'manifest.json':
+        return 'manifest'
+    if arcname.startswith(FILES_PREFIX):
+        return 'file'
+    return 'other'
+
+
+class BackupManifestService:
+    """
+    Checks backup archives against their manifests, and compares them with each other
+    or with the live data, without restoring them.
+
+    Manifests from version 1.1 list every entry with its size, SHA-256 and role, and
+    the row counts of the database snapshot. Verifying an archive reads its central
+    directory, then decompresses and hashes every member across a thread pool
+    (BACKUP_HASH_WORKERS), which also checks their CRCs. The database snapshot is
+    copied out while it is hashed, integrity-checked and counted.
+    """
+
+    MAX_MANIFEST_SIZE = 64 * 1024 * 1024
+
+    def __init__(self):
+        self.limits = ExtractionLimits.from_config(current_app.config)
+        self.hash_workers = current_app.config.get('BACKUP_HASH_WORKERS', 0)
+        self.work_dir = current_app.config['APP_FOLDER']
+        self.file_storage_path = current_app.config['FILE_STORAGE_PATH']
+        self.db_path = current_app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+
+    def read_manifest(self, zipf: zipfile.ZipFile, members: Dict[str, zipfile.ZipInfo]) -> Dict:
+        # The manifest is parsed in memory, so it gets a much tighter cap than other members
+        if members['manifest.json'].file_size > self.MAX_MANIFEST_SIZE:
+            raise InvalidArchiveError('manifest.json is too large')
+        try:
+            manifest = json.loads(zipf.read(members['manifest.json']))
+        except ValueError as e:
+            raise InvalidArchiveError(f'manifest.json is not valid JSON: {e}')
+        if not isinstance(manifest, dict):
+            raise InvalidArchiveError('manifest.json is not a backup manifest')
+        return manifest
+
+    def verify_archive(self, zip_path: str) -> Dict:
+        """
+        Check every member of a local archive against the manifest. Returns a report
+        with 'ok', the number of entries read and of SHA-256 hashes compared, the
+        problems found in 'errors' and anything that could not be checked (e.g. in
+        archives from before checksums were recorded) in 'warnings'.
+        """
+        started = time.perf_counter()
+        errors: List[str] = []
+        warnings: List[str] = []
+        report = {
+            'ok': False,
+            'backup_type': None,
+            'created_at': None,
+            'backup_version': None,
+            'entries': 0,
+            'bytes': 0,
+            'checksums': 0,
+            'tables': None,
+            'errors': errors,
+            'warnings': warnings,
+        }
+
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zipf:
+                members = check_archive(zipf, self.limits, required=('app.db', 'manifest.json'))
+                manifest = self.read_manifest(zipf, members)
+        except (InvalidArchiveError, zipfile.BadZipFile) as e:
+            errors.append(f'Invalid backup archive: {e}')
+            report['seconds'] = round(time.perf_counter() - started, 3)
+            return report
+
+        report.update(backup_type=manifest.get('backup_type'), created_at=manifest.get('created_at'),
+                      backup_version=manifest.get('backup_version'))
+        listed = {entry['name']: entry for entry in manifest.get('entries') or []
+                  if isinstance(entry, dict) and 'name' in entry}
+        file_index = manifest.get('files') if isinstance(manifest.get('files'), dict) else {}
+        contents = {name: info for name, info in members.items() if name != 'manifest.json'}
+
+        if listed:
+            for name in sorted(set(contents) - set(listed)):
+                errors.append(f'{name} is in the archive but not in the manifest')
+            for name in sorted(set(listed) - set(contents)):
+                errors.append(f'{name} is listed in the manifest but missing from the archive')
+            unhashed = [name for name, entry in listed.items() if not entry.get('sha256')]
+            if unhashed:
+                warnings.append(f'{len(unhashed)} entries have no recorded SHA-256 (backup made before '
+                                f'checksums were recorded); their CRCs were checked')
+        else:
+            warnings.append('The manifest does not list its entries (backup made by an older version); '
+                            'only CRCs were checked')
+
+        with tempfile.TemporaryDirectory(prefix='.verify_', dir=self.work_dir) as work_dir:
+            db_copy = os.path.join(work_dir, 'app.db')
+            hashes = hash_zip_members(zip_path, contents.values(), self.hash_workers, copy_to={'app.db': db_copy})
+
+            for name, (sha256, size, error) in sorted(hashes.items()):
+                report['entries'] += 1
+                report['bytes'] += size
+                if error:
+                    errors.append(f'{name} is corrupt: {error}')
+                    continue
+                entry = listed.get(name, {})
+                if entry.get('size') is not None and entry['size'] != size:
+                    errors.append(f"{name} is {size} bytes but the manifest records {entry['size']}")
+                if entry.get('sha256'):
+                    report['checksums'] += 1
+                    if entry['sha256'] != sha256:
+                        errors.append(f'{name} does not match the SHA-256 in the manifest')
+                indexed = file_index.get(name[len(FILES_PREFIX):]) if name.startswith(FILES_PREFIX) else None
+                if indexed and indexed != sha256:
+                    errors.append(f'{name} does not match the SHA-256 in the manifest file index')
+
+            if hashes.get('app.db', (None, 0, 'missing'))[2] is None:
+                self.verify_database_copy(db_copy, manifest, report)
+
+        report['ok'] = not errors
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        return report
+
+    @staticmethod
+    def verify_database_copy(db_path: str, manifest: Dict, report: Dict):
+        """Integrity-check the extracted snapshot and compare its row counts with the manifest's"""
+        try:
+            verify_database(db_path)
+            counts = table_row_counts(db_path)
+        except (SnapshotError, sqlite3.Error) as e:
+            report['errors'].append(f'app.db is damaged: {e}')
+            return
+        report['tables'] = counts
+
+        recorded = manifest.get('tables')
+        if not isinstance(recorded, dict):
+            report['warnings'].append('The manifest has no table row counts to compare with')
+            return
+        for table, rows in sorted(recorded.items()):
+            if table not in counts:
+                report['errors'].append(f'Table {table} is missing from app.db')
+            elif counts[table] != rows:
+                report['errors'].append(f'Table {table} has {counts[table]} rows but the manifest records {rows}')
+
+    def archive_state(self, zip_path: str) -> Dict:
+        """
+        The files ({path: {'size', 'sha256'}}) and table row counts a backup restores
+        to, from its central directory and manifest; nothing is extracted. The file
+        index of an incremental backup covers files archived earlier in its chain,
+        so it describes the whole state too. Only archives made before hashes and row
+        counts were recorded have their files hashed, in parallel, and their
+        database copied out to be counted.
+        """
+        with zipfile.ZipFile(zip_path, 'r') as zipf:
+            members = check_archive(zipf, self.limits, required=('app.db', 'manifest.json'))
+            manifest = self.read_manifest(zipf, members)
+
+        listed = {entry['name']: entry for entry in manifest.get('entries') or []
+                  if isinstance(entry, dict) and 'name' in entry}
+        files = {name[len(FILES_PREFIX):]: {'size': info.file_size, 'sha256': listed.get(name, {}).get('sha256')}
+                 for name, info in members.items() if name.startswith(FILES_PREFIX)}
+        if isinstance(manifest.get('files'), dict):
+            files = {path: {'size': files.get(path, {}).get('size'), 'sha256': sha256}
+                     for path, sha256 in manifest['files'].items()}
+        tables = manifest.get('tables') if isinstance(manifest.get('tables'), dict) else None
+
+        unhashed = [members[FILES_PREFIX + path] for path, info in files.items()
+                    if not info['sha256'] and FILES_PREFIX + path in members]
+        if unhashed or tables is None:
+            with tempfile.TemporaryDirectory(prefix='.diff_', dir=self.work_dir) as work_dir:
+                db_copy = os.path.join(work_dir, 'app.db')
+                infos = unhashed + ([members['app.db']] if tables is None else [])
+                for name, (sha256, size, error) in hash_zip_members(zip_path, infos, self.hash_workers,
+                                                                    copy_to={'app.db': db_copy}).items():
+                    if error:
+                        raise InvalidArchiveError(f'{name} is corrupt: {error}')
+                    if name.startswith(FILES_PREFIX):
+                        files[name[len(FILES_PREFIX):]]['sha256'] = sha256
+                if tables is None:
+                    try:
+                        tables = table_row_counts(db_copy)
+                    except sqlite3.Error as e:
+                        raise InvalidArchiveError(f'app.db is damaged: {e}')
+
+        return {
+            'label': os.path.basename(zip_path),
+            'created_at': manifest.get('created_at'),
+            'backup_type': manifest.get('backup_type', 'full'),
+            'files': files,
+            'tables': tables,
+        }
+
+    def live_state(self, reference: Optional[Dict] = None, known_hashes: Optional[Dict] = None) -> Dict:
+        """
+        The live files and table row counts, in the same shape as archive_state. A
+        file only needs hashing when reference has one with the same path and size,
+        so only those are hashed, in parallel; known_hashes ({path: {'size',
+        'mtime_ns', 'sha256'}}, e.g. from incremental backup state) are reused for
+        files whose size and mtime haven't changed.
+        """
+        reference_files = (reference or {}).get('files', {})
+        known_hashes = known_hashes or {}
+        files = {}
+        to_hash = {}
+        if os.path.exists(self.file_storage_path):
+            for root, dirs, names in os.walk(self.file_storage_path):
+                for name in names:
+                    file_path = os.path.join(root, name)
+                    relative_path = os.path.relpath(file_path, self.file_storage_path).replace(os.sep, '/')
+                    stat = os.stat(file_path)
+                    files[relative_path] = {'size': stat.st_size, 'sha256': None}
+
+                    if reference_files.get(relative_path, {}).get('size') not in (None, stat.st_size):
+                        continue
+                    known = known_hashes.get(relative_path)
+                    if known and known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+                        files[relative_path]['sha256'] = known.get('sha256')
+                    elif relative_path in reference_files:
+                        to_hash[file_path] = relative_path
+
+        for file_path, sha256 in hash_files(to_hash, self.hash_workers).items():
+            files[to_hash[file_path]]['sha256'] = sha256
+
+        return {
+            'label': 'live',
+            'created_at': None,
+            'backup_type': None,
+            'files': files,
+            'tables': table_row_counts(self.db_path),
+        }
+
+    @staticmethod
+    def diff(base: Dict, target: Dict) -> Dict:
+        """
+        What changes going from the base state to the target state (e.g. from the live
+        data to a backup that is about to be restored): added, removed and changed
+        files, and the row count of every table whose count differs.
+        """
+        base_files, target_files = base['files'], target['files']
+        added = sorted(set(target_files) - set(base_files))
+        removed = sorted(set(base_files) - set(target_files))
+        changed = []
+        unchanged = 0
+        for path in sorted(set(base_files) & set(target_files)):
+            before, after = base_files[path], target_files[path]
+            if before['size'] is not None and after['size'] is not None and before['size'] != after['size']:
+                changed.append(path)
+            elif before['sha256'] and after['sha256']:
+                if before['sha256'] != after['sha256']:
+                    changed.append(path)
+                else:
+                    unchanged += 1
+            else:
+                # Neither the size nor a hash tells them apart, so assume the worst
+                changed.append(path)
+
+        tables = {}
+        base_tables, target_tables = base.get('tables') or {}, target.get('tables') or {}
+        for table in sorted(set(base_tables) | set(target_tables)):
+            before, after = base_tables.get(table), target_tables.get(table)
+            if before != after:
+                tables[table] = {'base': before, 'target': after, 'delta': (after or 0) - (before or 0)}
+
+        return {
+            'base': {key: base[key] for key in ('label', 'created_at', 'backup_type')},
+            'target': {key: target[key] for key in ('label', 'created_at', 'backup_type')},
+            'files': {'added': added, 'removed': removed, 'changed': changed, 'unchanged': unchanged},
+            'bytes': {
+                'added': sum(target_files[path]['size'] or 0 for path in added),
+                'removed': sum(base_files[path]['size'] or 0 for path in removed),
+            },
+            'tables': tables,
+        }
+
+    def compare(self, target_path: str, base_path: Optional[str] = None,
+                known_hashes: Optional[Dict] = None) -> Dict:
+        """Diff a backup archive against another (base_path) or, without one, against the live data"""
+        started = time.perf_counter()
+        target = self.archive_state(target_path)
+        base = self.archive_state(base_path) if base_path else self.live_state(target, known_hashes)
+        result = self.diff(base, target)
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
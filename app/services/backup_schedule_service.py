@@ -0,0 +1,273 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.services.cloud_backup_service import CloudBackupService
+from app.services.cloud_catalog_service import CloudCatalogService
+from app.services.incremental_backup_service import IncrementalBackupService
+from app.services.rclone_backend import RcloneError
+from app.services.task_queue_service import TaskQueueService
+
+# Archives named by the app: job_tracker_backup_YYYYMMDD_HHMMSS.zip (full) or
+# job_tracker_incremental_YYYYMMDD_HHMMSS.zip. Retention never touches anything else.
+BACKUP_NAME_PATTERN = re.compile(r'^job_tracker_(backup|incremental)_(\d{8}_\d{6})\.zip$')
+
+
+def parse_backup_name(name: str) -> Optional[Tuple[str, datetime]]:
+    """('full' or 'incremental', creation time) from an archive name, or None if the app didn't name it"""
+    match = BACKUP_NAME_PATTERN.match(name)
+    if not match:
+        return None
+    try:
+        created = datetime.strptime(match.group(2), '%Y%m%d_%H%M%S')
+    except ValueError:
+        return None
+    return ('full' if match.group(1) == 'backup' else 'incremental'), created
+
+
+class RetentionPolicy:
+    """
+    Grandfather-father-son retention: keep the newest backup of each of the last
+    `daily` days, `weekly` ISO weeks and `monthly` months that have one, plus the
+    newest backup overall. An incremental backup is only restorable with the full
+    backup and earlier increments it builds on, so keeping one keeps its chain too.
+    """
+
+    def __init__(self, daily: int = 7, weekly: int = 4, monthly: int = 12):
+        self.daily = daily
+        self.weekly = weekly
+        self.monthly = monthly
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            daily=config.get('BACKUP_RETENTION_DAILY', 7),
+            weekly=config.get('BACKUP_RETENTION_WEEKLY', 4),
+            monthly=config.get('BACKUP_RETENTION_MONTHLY', 12),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """All tiers at 0 means keep everything"""
+        return any(count > 0 for count in (self.daily, self.weekly, self.monthly))
+
+    def select(self, backups: List[Dict], protect: Iterable[str] = ()) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Split backups (dicts with 'name' and 'path') into (keep, prune). Backups whose
+        names the app didn't generate, and paths in protect, are always kept.
+        """
+        dated = []
+        keep_paths = set(protect)
+        for backup in backups:
+            parsed = parse_backup_name(backup['name'])
+            if parsed is None:
+                keep_paths.add(backup['path'])
+            else:
+                dated.append((parsed[1], parsed[0], backup))
+        dated.sort(key=lambda item: item[0], reverse=True)
+
+        if dated:
+            keep_paths.add(dated[0][2]['path'])
+        tiers = (
+            (self.daily, lambda created: created.date()),
+            (self.weekly, lambda created: tuple(created.isocalendar())[:2]),
+            (self.monthly, lambda created: (created.year, created.month)),
+        )
+        for count, period_of in tiers:
+            periods = set()
+            for created, backup_type, backup in dated:
+                period = period_of(created)
+                if period in periods:
+                    continue
+                if len(periods) >= count:
+                    break
+                periods.add(period)
+                keep_paths.add(backup['path'])
+
+        chains = self._chains(dated)
+        for path in list(keep_paths):
+            keep_paths.update(chains.get(path, []))
+
+        keep = [backup for backup in backups if backup['path'] in keep_paths]
+        prune = [backup for backup in backups if backup['path'] not in keep_paths]
+        return keep, prune
+
+    @staticmethod
+    def _chains(dated: List[Tuple[datetime, str, Dict]]) -> Dict[str, List[str]]:
+        """
+        The archives each backup needs for a restore, inferred from the order they were
+        made in: the last full backup before it and every increment in between.
+        """
+        chains = {}
+        chain = []
+        for created, backup_type, backup in reversed(dated):
+            chain = [backup['path']] if backup_type == 'full' else chain + [backup['path']]
+            chains[backup['path']] = chain
+        return chains
+
+
+class BackupScheduleService:
+    """
+    Automatic backups every BACKUP_SCHEDULE_INTERVAL seconds, to the remotes in
+    BACKUP_SCHEDULE_REMOTES and/or the BACKUP_LOCAL_PATH folder, each followed by
+    pruning under the retention policy.
+
+    Each interval is a numbered slot, and a slot's backup is enqueued as a background
+    task whose id is derived from the slot number (TaskQueueService.enqueue_once), so
+    however many gunicorn workers or cron hosts notice the slot, it is backed up once.
+    """
+
+    TASK_KIND = 'scheduled_backup'
+
+    def __init__(self, cloud_service: Optional[CloudBackupService] = None):
+        self._cloud_service = cloud_service
+        self.interval = current_app.config.get('BACKUP_SCHEDULE_INTERVAL', 0)
+        self.remotes = current_app.config.get('BACKUP_SCHEDULE_REMOTES') or []
+        self.backup_type = current_app.config.get('BACKUP_SCHEDULE_TYPE', 'incremental')
+        self.local_path = current_app.config.get('BACKUP_LOCAL_PATH')
+        self.policy = RetentionPolicy.from_config(current_app.config)
+
+    @property
+    def cloud_service(self) -> CloudBackupService:
+        if self._cloud_service is None:
+            self._cloud_service = CloudBackupService()
+        return self._cloud_service
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0 and bool(self.remotes or self.local_path)
+
+    def task_params(self) -> Dict:
+        return {
+            'remotes': list(self.remotes),
+            'backup_type': self.backup_type,
+            'local': bool(self.local_path),
+        }
+
+    def enqueue_due(self, now: Optional[float] = None, interval: Optional[int] = None) -> Optional[str]:
+        """
+        Enqueue the backup for the current slot if no process has yet. Skipped while an
+        earlier scheduled backup is still queued or running. Returns the task id, or None.
+        """
+        interval = interval or self.interval
+        slot = int((now if now is not None else time.time()) // interval)
+        queue = TaskQueueService()
+        if queue.active(self.TASK_KIND):
+            return None
+        task_id = queue.enqueue_once(self.TASK_KIND, f'{interval}:{slot}', self.task_params())
+        if task_id:
+            print(f"Scheduled backup queued as task {task_id}")
+        return task_id
+
+    def prune_remote(self, remote_name: str, dry_run: bool = False) -> Dict:
+        """
+        Delete the backups on a remote that the retention policy doesn't keep. The
+        remote is re-listed first so the decision isn't made from a stale catalog, and
+        the chain the next incremental backup builds on is never deleted.
+        """
+        if not self.policy.enabled:
+            return {'kept': None, 'deleted': [], 'failed': {}}
+
+        catalog = CloudCatalogService(self.cloud_service)
+        errors = catalog.sync([remote_name], full=True, force=True)
+        if remote_name in errors:
+            raise RcloneError(f'Could not list {remote_name}: {errors[remote_name]}')
+        backups = catalog.get_backups([remote_name])[0][remote_name]
+
+        incremental_service = IncrementalBackupService()
+        protect = incremental_service.load_state(remote_name).get('chain', [])
+        keep, prune = self.policy.select(backups, protect=protect)
+
+        deleted = []
+        failed = {}
+        for backup in prune:
+            if dry_run:
+                deleted.append(backup['path'])
+                continue
+            success, message = self.cloud_service.delete_cloud_backup(remote_name, backup['path'])
+            if success:
+                catalog.record_delete(remote_name, backup['path'])
+                deleted.append(backup['path'])
+            else:
+                failed[backup['path']] = message
+
+        print(f"Retention on {remote_name}: kept {len(keep)}, "
+              f"{'would delete' if dry_run else 'deleted'} {len(deleted)}, failed {len(failed)}")
+        return {'kept': len(keep), 'deleted': deleted, 'failed': failed}
+
+    def local_backups(self) -> List[Dict]:
+        if not self.local_path or not os.path.isdir(self.local_path):
+            return []
+        return [{'name': name, 'path': os.path.join(self.local_path, name)}
+                for name in os.listdir(self.local_path)
+                if os.path.isfile(os.path.join(self.local_path, name))]
+
+    def prune_local(self, dry_run: bool = False) -> Dict:
+        """Delete the archives in BACKUP_LOCAL_PATH that the retention policy doesn't keep"""
+        if not self.policy.enabled:
+            return {'kept': None, 'deleted': [], 'failed': {}}
+
+        keep, prune = self.policy.select(self.local_backups())
+        deleted = []
+        failed = {}
+        for backup in prune:
+            try:
+                if not dry_run:
+                    os.remove(backup['path'])
+                deleted.append(backup['path'])
+            except OSError as e:
+                failed[backup['path']] = str(e)
+
+        print(f"Retention in {self.local_path}: kept {len(keep)}, "
+              f"{'would delete' if dry_run else 'deleted'} {len(deleted)}, failed {len(failed)}")
+        return {'kept': len(keep), 'deleted': deleted, 'failed': failed}
+
+
+class BackupScheduler:
+    """
+    Background thread that checks every POLL_INTERVAL seconds whether the current
+    schedule slot has been backed up, and enqueues it if not. Every app process runs
+    one; enqueue_once makes sure only one of them gets the slot.
+    """
+
+    POLL_INTERVAL = 60
+
+    def __init__(self, app):
+        self.app = app
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='backup-scheduler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    BackupScheduleService().enqueue_due()
+            except Exception as e:
+                print(f"Backup scheduler error: {e}")
+            if self.stop_event.wait(self.POLL_INTERVAL):
+                return
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_backup_scheduler(app) -> Optional[BackupScheduler]:
+    """Start this process's scheduler once. BACKUP_SCHEDULE_INTERVAL=0 (the default) disables it."""
+    global _scheduler
+    if not app.config.get('BACKUP_SCHEDULE_INTERVAL', 0):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BackupScheduler(app)
+            _scheduler.start()
+        return _scheduler
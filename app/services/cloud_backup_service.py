@@ -1,25 +1,44 @@
-import subprocess
 import os
-import tempfile
-import json
+import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from flask import current_app
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Optional
 import configparser
-from pathlib import Path
+from app.services.rclone_backend import (
+    RcloneError, RcloneTimeout, RcRcloneBackend, SubprocessRcloneBackend, get_daemon
+)
+from app.utils.cache import TTLCache
+
+# rclone executable location, availability and remote metadata. Shared by every
+# CloudBackupService instance in the process so page loads don't re-probe rclone.
+# Entries derived from the config file are keyed on its mtime and also cleared
+# whenever this app edits the config.
+rclone_cache = TTLCache(ttl=300)
+# Re-check sooner when rclone was not found, so installing it is picked up quickly
+UNAVAILABLE_TTL = 30
 
 
 class CloudBackupService:
     """Service for managing cloud backups using rclone"""
     
+    # Year/month/day folders anywhere in a path, e.g. "2025/08/09/"
+    DATE_PATH_PATTERN = re.compile(r'(^|/)\d{4}/\d{2}/\d{2}/')
+    
     def __init__(self):
         self.rclone_config_path = current_app.config.get('RCLONE_CONFIG_PATH')
         self.default_remote = current_app.config.get('RCLONE_DEFAULT_REMOTE')
         self.backup_path = current_app.config.get('RCLONE_BACKUP_PATH', 'job-tracker-backups')
         self.rclone_executable = self._find_rclone_executable()
+        self.backend = self._create_backend()
         
     def _find_rclone_executable(self) -> str:
+        """Find rclone executable, cached per process"""
+        return rclone_cache.get_or_set(('executable', os.environ.get('RCLONE_PATH')),
+                                       self._discover_rclone_executable)
+    
+    def _discover_rclone_executable(self) -> str:
         """Find rclone executable with Windows compatibility"""
         # Try different possible names/locations
         possible_names = ['rclone', 'rclone.exe']
@@ -172,6 +191,7 @@ class CloudBackupService:
             
             # Set appropriate permissions (readable/writable by owner only)
             os.chmod(config_path, 0o600)
+            self.invalidate_cache()
             
             return True, f"Config file created successfully at {config_path}"
             
@@ -224,6 +244,7 @@ class CloudBackupService:
             
             # Set appropriate permissions
             os.chmod(config_path, 0o600)
+            self.invalidate_cache()
             
             return True, f"Successfully added remote '{remote_name}' to rclone config"
             
@@ -250,6 +271,7 @@ class CloudBackupService:
             # Write the updated config back
             with open(config_path, 'w') as config_file:
                 config.write(config_file)
+            self.invalidate_cache()
             
             return True, f"Successfully removed remote '{remote_name}' from config"
             
@@ -271,67 +293,46 @@ class CloudBackupService:
             return False, f"Error reading config: {str(e)}"
     
     def check_rclone_available(self) -> bool:
-        """Check if rclone is available in the system"""
+        """Check if rclone is available, falling back to subprocesses if rclone rcd can't start"""
+        if self._backend_available():
+            return True
+        if isinstance(self.backend, RcRcloneBackend):
+            print("Falling back to running rclone as a subprocess per command")
+            self.backend = SubprocessRcloneBackend(self.rclone_executable, self.rclone_config_path)
+            return self._backend_available()
+        return False
+    
+    def _backend_available(self) -> bool:
+        """Cached result of probing the current backend (`rclone version` or the rcd API)"""
+        key = ('available', self.backend.name, self.rclone_executable, self.rclone_config_path)
+        available = rclone_cache.get(key)
+        if available and isinstance(self.backend, RcRcloneBackend) and not self.backend.daemon.process:
+            # The daemon was stopped since the last probe; check it can still be started
+            available = None
+        if available is None:
+            available = self.backend.is_available()
+            rclone_cache.set(key, available, ttl=None if available else UNAVAILABLE_TTL)
+        return available
+    
+    def _config_signature(self) -> Tuple[str, Optional[int]]:
+        """Config file path and mtime, used in cache keys so edits made outside the app are noticed"""
+        config_path = self.get_rclone_config_path()
         try:
-            # Use shell=True on Windows to help with PATH resolution
-            import platform
-            use_shell = platform.system() == 'Windows'
-            
-            result = subprocess.run(
-                [self.rclone_executable, 'version'], 
-                capture_output=True, 
-                text=True, 
-                timeout=10,
-                shell=use_shell
-            )
-            if result.stderr:
-                print(f"stderr: {result.stderr}")
-            return result.returncode == 0
-        except (subprocess.TimeoutExpired, FileNotFoundError, OSError) as e:
-            print(f"rclone is not available or not found: {e}")
-            print(f"Exception type: {type(e)}")
-            
-            # Additional debugging for Windows
-            if platform.system() == 'Windows':
-                # Try with .exe extension explicitly
-                try:
-                    result = subprocess.run(
-                        ['rclone.exe', 'version'], 
-                        capture_output=True, 
-                        text=True, 
-                        timeout=10,
-                        shell=True
-                    )
-                    if result.returncode == 0:
-                        print("rclone.exe works with shell=True")
-                        self.rclone_executable = 'rclone.exe'
-                        return True
-                except Exception as e2:
-                    print(f"rclone.exe also failed: {e2}")
-            
-            return False
+            return config_path, os.stat(config_path).st_mtime_ns
+        except OSError:
+            return config_path, None
     
-    def _run_rclone_command(self, cmd_args: List[str], timeout: int = 30) -> subprocess.CompletedProcess:
-        """Run rclone command with Windows compatibility"""
-        import platform
-        
-        # Prepare command
-        cmd = [self.rclone_executable] + cmd_args
-        
-        # Add config path if specified
-        if self.rclone_config_path:
-            cmd.extend(['--config', self.rclone_config_path])
-        
-        # Use shell=True on Windows for better compatibility
-        use_shell = platform.system() == 'Windows'
-        
-        return subprocess.run(
-            cmd, 
-            capture_output=True, 
-            text=True, 
-            timeout=timeout,
-            shell=use_shell
-        )
+    @staticmethod
+    def invalidate_cache():
+        """Forget cached remote metadata, e.g. after the rclone config file was edited"""
+        rclone_cache.clear()
+    
+    def _create_backend(self):
+        """rclone rcd client when RCLONE_BACKEND is 'rcd' (default), otherwise one subprocess per command"""
+        if current_app.config.get('RCLONE_BACKEND', 'rcd') == 'rcd':
+            daemon = get_daemon(self.rclone_executable, self.rclone_config_path, self.get_rclone_config_path())
+            return RcRcloneBackend(daemon)
+        return SubprocessRcloneBackend(self.rclone_executable, self.rclone_config_path)
     
     def list_configured_remotes(self) -> List[Dict[str, str]]:
         """List all configured rclone remotes"""
@@ -339,37 +340,39 @@ class CloudBackupService:
             return []
         
         try:
-            result = self._run_rclone_command(['listremotes'])
-            if result.returncode == 0:
-                remotes = []
-                for line in result.stdout.strip().split('\n'):
-                    if line.strip() and line.endswith(':'):
-                        remote_name = line.rstrip(':')
-                        remote_info = self._get_remote_info(remote_name)
-                        remotes.append({
-                            'name': remote_name,
-                            'type': remote_info.get('type', 'unknown'),
-                            'description': f"{remote_name} ({remote_info.get('type', 'unknown')})"
-                        })
-                return remotes
-            else:
-                print(f"listremotes failed: {result.stderr}")
-                return []
+            remote_types = rclone_cache.get_or_set(('remotes', self._config_signature()), self._load_remote_types)
+            return [{
+                'name': remote_name,
+                'type': remote_type or 'unknown',
+                'description': f"{remote_name} ({remote_type or 'unknown'})"
+            } for remote_name, remote_type in remote_types.items()]
         except Exception as e:
+            print(f"listremotes failed: {e}")
             current_app.logger.error(f"Error listing rclone remotes: {str(e)}")
             return []
     
+    def _load_remote_types(self) -> Dict[str, Optional[str]]:
+        """
+        Map remote name -> type. Read straight from the config file when it can be
+        parsed; otherwise (e.g. an encrypted config) ask rclone for each remote.
+        """
+        config_path = self.get_rclone_config_path()
+        if os.path.exists(config_path):
+            try:
+                config = configparser.ConfigParser()
+                config.read(config_path)
+                return {section: config.get(section, 'type', fallback=None) for section in config.sections()}
+            except configparser.Error as e:
+                print(f"Could not parse rclone config, asking rclone instead: {e}")
+        
+        return {remote_name: self._get_remote_info(remote_name).get('type')
+                for remote_name in self.backend.list_remotes()}
+    
     def _get_remote_info(self, remote_name: str) -> Dict[str, str]:
         """Get information about a specific remote"""
         try:
-            result = self._run_rclone_command(['config', 'show', remote_name], timeout=10)
-            
-            if result.returncode == 0:
-                # Parse the config output to extract type
-                for line in result.stdout.split('\n'):
-                    if line.strip().startswith('type ='):
-                        return {'type': line.split('=')[1].strip()}
-            return {}
+            remote_type = self.backend.remote_type(remote_name)
+            return {'type': remote_type} if remote_type else {}
         except Exception:
             return {}
     
@@ -379,23 +382,22 @@ class CloudBackupService:
             return False, "rclone is not available"
         
         try:
-            result = self._run_rclone_command([
-                'lsd', f'{remote_name}:', '--max-depth', '1'
-            ], timeout=30)
-            
-            if result.returncode == 0:
-                return True, "Connection successful"
-            else:
-                return False, f"Connection failed: {result.stderr.strip()}"
-        except subprocess.TimeoutExpired:
+            self.backend.list(remote_name, '', dirs_only=True, timeout=30)
+            return True, "Connection successful"
+        except RcloneTimeout:
             return False, "Connection timeout"
+        except RcloneError as e:
+            return False, f"Connection failed: {str(e)}"
         except Exception as e:
             return False, f"Error testing connection: {str(e)}"
     
-    # ... (rest of the existing methods remain the same)
     def upload_backup(self, backup_file_path: str, remote_name: str, 
-                     custom_path: Optional[str] = None) -> Tuple[bool, str, Dict]:
-        """Upload backup file to cloud storage"""
+                     custom_path: Optional[str] = None, timeout: int = 300,
+                     progress: Optional[Callable[[Dict], None]] = None) -> Tuple[bool, str, Dict]:
+        """
+        Upload backup file to cloud storage. progress, if given, is called about once
+        a second with rclone's transfer stats (bytes, total_bytes, percent, speed, eta).
+        """
         if not self.check_rclone_available():
             return False, "rclone is not available", {}
         
@@ -403,55 +405,78 @@ class CloudBackupService:
             return False, "Backup file not found", {}
         
         # Generate remote path
-        timestamp = datetime.now().strftime('%Y/%m/%d')
-        filename = os.path.basename(backup_file_path)
-        
-        if custom_path:
-            remote_path = f"{remote_name}:{custom_path}/{filename}"
-        else:
-            remote_path = f"{remote_name}:{self.backup_path}/{timestamp}/{filename}"
+        file_path = self._remote_backup_path(os.path.basename(backup_file_path), custom_path)
+        remote_path = f"{remote_name}:{file_path}"
         
         try:
-            # Upload with progress
-            result = self._run_rclone_command([
-                'copy', backup_file_path, 
-                os.path.dirname(remote_path),
-                '--progress',
-                '--stats-one-line',
-                '--stats', '1s'
-            ], timeout=300)
-            
-            if result.returncode == 0:
-                # Get file info after upload
-                file_info = self._get_remote_file_info(remote_path)
-                return True, f"Backup uploaded successfully to {remote_path}", file_info
-            else:
-                error_msg = result.stderr.strip() or "Upload failed"
-                return False, error_msg, {}
+            self.backend.upload_file(backup_file_path, remote_name, file_path, timeout=timeout, progress=progress)
+            
+            # Get file info after upload
+            file_info = self._get_remote_file_info(remote_name, file_path) or {'path': remote_path}
+            return True, f"Backup uploaded successfully to {remote_path}", file_info
                 
-        except subprocess.TimeoutExpired:
-            return False, "Upload timeout (5 minutes)", {}
+        except RcloneTimeout:
+            return False, f"Upload timeout ({timeout // 60} minutes)", {}
+        except RcloneError as e:
+            return False, str(e) or "Upload failed", {}
         except Exception as e:
             return False, f"Upload error: {str(e)}", {}
     
-    def _get_remote_file_info(self, remote_path: str) -> Dict:
+    def upload_backup_stream(self, chunks: Iterable[bytes], filename: str, remote_name: str,
+                             custom_path: Optional[str] = None, timeout: int = 300) -> Tuple[bool, str, Dict]:
+        """
+        Upload a backup archive as it is generated (e.g. from stream_zip), with no local
+        copy: rclone rcat reads it from a pipe, or the rcd API receives it as a streamed
+        request body. If generating the archive fails, the upload is abandoned.
+        """
+        if not self.check_rclone_available():
+            return False, "rclone is not available", {}
+        
+        file_path = self._remote_backup_path(filename, custom_path)
+        remote_path = f"{remote_name}:{file_path}"
+        
+        try:
+            self.backend.upload_stream(chunks, remote_name, file_path, timeout=timeout)
+            
+            # Get file info after upload
+            file_info = self._get_remote_file_info(remote_name, file_path) or {'path': remote_path}
+            return True, f"Backup uploaded successfully to {remote_path}", file_info
+        
+        except RcloneTimeout:
+            self._discard_partial_upload(remote_name, file_path)
+            return False, f"Upload timeout ({timeout // 60} minutes)", {}
+        except RcloneError as e:
+            self._discard_partial_upload(remote_name, file_path)
+            return False, str(e) or "Upload failed", {}
+        except Exception as e:
+            self._discard_partial_upload(remote_name, file_path)
+            return False, f"Upload error: {str(e)}", {}
+    
+    def _discard_partial_upload(self, remote_name: str, file_path: str):
+        """Best-effort removal of whatever a failed streaming upload left behind"""
+        try:
+            if self.backend.stat(remote_name, file_path, timeout=30):
+                self.backend.delete_file(remote_name, file_path)
+                print(f"Removed partial upload {remote_name}:{file_path}")
+        except Exception as e:
+            print(f"Could not check for a partial upload at {remote_name}:{file_path}: {e}")
+    
+    def _remote_backup_path(self, filename: str, custom_path: Optional[str] = None) -> str:
+        """Where a new backup goes: custom_path, or a YYYY/MM/DD folder under the backup path"""
+        if custom_path:
+            return f"{custom_path}/{filename}"
+        return f"{self.backup_path}/{datetime.now().strftime('%Y/%m/%d')}/{filename}"
+    
+    def _get_remote_file_info(self, remote_name: str, file_path: str) -> Dict:
         """Get information about uploaded file"""
         try:
-            # Use rclone lsjson to get file details
-            remote_dir = os.path.dirname(remote_path)
-            filename = os.path.basename(remote_path)
-            
-            result = self._run_rclone_command(['lsjson', remote_dir], timeout=30)
-            
-            if result.returncode == 0:
-                files = json.loads(result.stdout)
-                for file_info in files:
-                    if file_info.get('Name') == filename:
-                        return {
-                            'size': file_info.get('Size', 0),
-                            'modified': file_info.get('ModTime', ''),
-                            'path': remote_path
-                        }
+            file_info = self.backend.stat(remote_name, file_path)
+            if file_info:
+                return {
+                    'size': file_info.get('Size', 0),
+                    'modified': file_info.get('ModTime', ''),
+                    'path': f"{remote_name}:{file_path}"
+                }
             return {}
         except Exception:
             return {}
@@ -463,64 +488,130 @@ class CloudBackupService:
             return []
         
         try:
-            search_path = f"{remote_name}:{custom_path or self.backup_path}"
-            backup_base_path = custom_path or self.backup_path
-            
-            result = self._run_rclone_command(['lsjson', search_path, '--recursive'], timeout=60)
-            
-            if result.returncode == 0:
-                try:
-                    files = json.loads(result.stdout)
-                    backups = []
-                    
-                    for file_info in files:
-                        filename = file_info.get('Name', '')
-                        relative_path = file_info.get('Path', '')
-                        
-                        # Skip directories
-                        if file_info.get('IsDir', False):
-                            continue
-                        
-                        # More flexible matching for backup files
-                        is_zip = filename.endswith('.zip')
-                        
-                        # Check multiple patterns to identify backup files
-                        is_backup = any([
-                            'job_tracker_backup_' in filename,  # Standard pattern
-                            filename.startswith('job_tracker_'),  # Alternative pattern
-                            self._is_likely_backup_file(file_info, filename),  # Heuristic check
-                        ])
-                        
-                        if is_zip and is_backup:
-                            # Create full path for deletion
-                            full_path = f"{backup_base_path}/{relative_path}" if relative_path else f"{backup_base_path}/{filename}"
-                            
-                            backups.append({
-                                'name': filename,
-                                'path': full_path,  # Store full path including backup base
-                                'relative_path': relative_path,  # Store relative path for reference
-                                'size': file_info.get('Size', 0),
-                                'size_mb': round(file_info.get('Size', 0) / (1024 * 1024), 2),
-                                'modified': file_info.get('ModTime', ''),
-                                'remote': remote_name,
-                                'detection_method': self._get_detection_method(filename)
-                            })
-                    
-                    # Sort by modification time (newest first)
-                    backups.sort(key=lambda x: x['modified'], reverse=True)
-                    return backups
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}")
-                    return []
-            else:
-                print(f"rclone command failed with return code {result.returncode}")
-                print(f"Error output: {result.stderr}")
-                return []
+            return self._list_cloud_backups(remote_name, custom_path)
+        except RcloneError as e:
+            print(f"Listing {remote_name} failed: {e}")
+            return []
         except Exception as e:
             print(f"Exception in list_cloud_backups: {e}")
             current_app.logger.error(f"Error listing cloud backups: {str(e)}")
             return []
     
+    def list_all_cloud_backups(self, remote_names: List[str],
+                               custom_path: Optional[str] = None) -> Tuple[Dict[str, List[Dict]], Dict[str, str]]:
+        """
+        List backups on several remotes at once. Returns (backups, errors): remotes
+        that failed or timed out map to an empty list in backups and to a message in errors.
+        """
+        timeout = current_app.config.get('RCLONE_LIST_TIMEOUT', 20)
+        backups, errors = self.map_remotes(
+            lambda remote_name: self._list_cloud_backups(remote_name, custom_path, timeout=timeout),
+            remote_names
+        )
+        for remote_name in remote_names:
+            backups.setdefault(remote_name, [])
+        return backups, errors
+    
+    def map_remotes(self, func: Callable[[str], Any], remote_names: List[str]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Call func(remote_name) for several remotes at once on a bounded thread pool,
+        each in its own app context.
+        
+        func should pass RCLONE_LIST_TIMEOUT to its rclone calls, so the total time is
+        about that of the slowest remote rather than the sum. Returns (results, errors)
+        keyed by remote name; a remote that failed or timed out only appears in errors.
+        """
+        results = {}
+        errors = {}
+        if not remote_names or not self.check_rclone_available():
+            return results, errors
+        
+        timeout = current_app.config.get('RCLONE_LIST_TIMEOUT', 20)
+        max_workers = max(1, min(current_app.config.get('RCLONE_LIST_WORKERS', 4), len(remote_names)))
+        app = current_app._get_current_object()
+        
+        def call(remote_name):
+            with app.app_context():
+                return func(remote_name)
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rclone-list')
+        try:
+            futures = {executor.submit(call, remote_name): remote_name for remote_name in remote_names}
+            # rclone enforces the per-call timeout itself; the extra wait covers queueing
+            # behind other remotes when there are more remotes than workers
+            rounds = -(-len(remote_names) // max_workers)
+            done, not_done = wait(futures, timeout=timeout * rounds + 5)
+            
+            for future in done:
+                remote_name = futures[future]
+                try:
+                    results[remote_name] = future.result()
+                except RcloneTimeout:
+                    errors[remote_name] = f"Timed out after {timeout} seconds"
+                except Exception as e:
+                    errors[remote_name] = str(e)
+            for future in not_done:
+                errors[futures[future]] = f"Timed out after {timeout} seconds"
+        finally:
+            # Don't hold the caller for stragglers; their rclone calls time out on their own
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        for remote_name, error in errors.items():
+            print(f"Listing backups on {remote_name} failed: {error}")
+            current_app.logger.warning(f"Error listing cloud backups on {remote_name}: {error}")
+        return results, errors
+    
+    def _list_cloud_backups(self, remote_name: str, custom_path: Optional[str] = None,
+                            timeout: int = 60) -> List[Dict]:
+        """List backup files on one remote. Raises RcloneError if the listing fails."""
+        backup_base_path = custom_path or self.backup_path
+        try:
+            files = self.backend.list(remote_name, backup_base_path, recursive=True, timeout=timeout)
+        except RcloneError as e:
+            # Nothing has been uploaded to this remote yet
+            if 'directory not found' in str(e).lower():
+                return []
+            raise
+        
+        backups = []
+        for file_info in files:
+            filename = file_info.get('Name', '')
+            relative_path = file_info.get('Path', '')
+            
+            # Skip directories
+            if file_info.get('IsDir', False):
+                continue
+            
+            # More flexible matching for backup files
+            is_zip = filename.endswith('.zip')
+            
+            # Check multiple patterns to identify backup files
+            is_backup = any([
+                'job_tracker_backup_' in filename,  # Standard pattern
+                filename.startswith('job_tracker_'),  # Alternative pattern
+                self._is_likely_backup_file(file_info, filename),  # Heuristic check
+            ])
+            
+            if is_zip and is_backup:
+                # Create full path for deletion
+                full_path = f"{backup_base_path}/{relative_path}" if relative_path else f"{backup_base_path}/{filename}"
+                
+                backups.append({
+                    'name': filename,
+                    'path': full_path,  # Store full path including backup base
+                    'relative_path': relative_path,  # Store relative path for reference
+                    'size': file_info.get('Size', 0),
+                    'size_mb': round(file_info.get('Size', 0) / (1024 * 1024), 2),
+                    'modified': file_info.get('ModTime', ''),
+                    'remote': remote_name,
+                    'backup_type': 'incremental' if filename.startswith('job_tracker_incremental_') else 'full',
+                    'detection_method': self._get_detection_method(filename)
+                })
+        
+        # Sort by modification time (newest first)
+        backups.sort(key=lambda x: x['modified'], reverse=True)
+        return backups
+    
     def _is_likely_backup_file(self, file_info: Dict, filename: str) -> bool:
         """Use heuristics to identify backup files"""
         # Check if it contains manifest.json (for existing backups)
@@ -534,7 +625,7 @@ class CloudBackupService:
         # Path-based heuristic: in a date-structured folder
         path = file_info.get('Path', '')
         date_pattern_in_path = any([
-            '/2024/' in path or '/2025/' in path,  # Year in path
+            self.DATE_PATH_PATTERN.search(path),  # YYYY/MM/DD folders, as used by upload_backup
             path.count('/') >= 2,  # Deep path structure (year/month/day)
         ])
         
@@ -553,7 +644,7 @@ class CloudBackupService:
 
     def _get_detection_method(self, filename: str) -> str:
         """Return how the backup was detected"""
-        if 'job_tracker_backup_' in filename:
+        if 'job_tracker_backup_' in filename or filename.startswith('job_tracker_incremental_'):
             return 'standard_pattern'
         elif filename.startswith('job_tracker_'):
             return 'alternative_pattern'
@@ -575,70 +666,74 @@ class CloudBackupService:
             os.makedirs(local_dir, exist_ok=True)
             
             # First, verify the file exists on remote
-            verify_result = self._run_rclone_command(['lsjson', remote_path], timeout=30)
-            
-            if verify_result.returncode == 0:
-                try:
-                    remote_files = json.loads(verify_result.stdout)
-                    if not remote_files:
-                        return False, f"File not found at {remote_path}"
-                except json.JSONDecodeError:
-                    pass
-            else:
-                print(f"Failed to verify remote file: {verify_result.stderr}")
-                return False, f"Could not verify remote file: {verify_result.stderr}"
+            try:
+                if not self.backend.stat(remote_name, remote_file_path):
+                    return False, f"File not found at {remote_path}"
+            except RcloneError as e:
+                print(f"Failed to verify remote file: {e}")
+                return False, f"Could not verify remote file: {e}"
             
             # Download the file
-            result = self._run_rclone_command([
-                'copy', remote_path, 
-                local_dir,
-                '--progress',
-                '--stats', '1s',
-                '--stats-one-line'
-            ], timeout=300)
-            
-            if result.returncode == 0:
-                # Verify the downloaded file
-                if os.path.exists(local_download_path):
-                    local_size = os.path.getsize(local_download_path)
-                    
-                    if local_size > 0:
-                        return True, f"Backup downloaded successfully to {local_download_path}"
-                    else:
-                        print("Downloaded file is 0 bytes!")
-                        return False, "Downloaded file is empty (0 bytes)"
-                else:
-                    # List what files were actually downloaded
-                    if os.path.exists(local_dir):
-                        downloaded_files = os.listdir(local_dir)
-                        
-                        # Maybe the filename is different, find any .zip files
-                        zip_files = [f for f in downloaded_files if f.endswith('.zip')]
-                        if zip_files:
-                            actual_file = os.path.join(local_dir, zip_files[0])
-                            actual_size = os.path.getsize(actual_file)
-                            
-                            # Rename to expected filename
-                            os.rename(actual_file, local_download_path)
-                            
-                            if actual_size > 0:
-                                return True, f"Backup downloaded successfully to {local_download_path}"
-                            else:
-                                return False, "Downloaded file is empty (0 bytes)"
-                    
-                    return False, "Downloaded file not found at expected location"
-            else:
-                error_msg = result.stderr.strip() or "Download failed"
-                print(f"rclone copy failed: {error_msg}")
-                return False, error_msg
+            self.backend.download_file(remote_name, remote_file_path, local_download_path, timeout=300)
+            
+            # Verify the downloaded file
+            if not os.path.exists(local_download_path):
+                return False, "Downloaded file not found at expected location"
+            
+            if os.path.getsize(local_download_path) == 0:
+                print("Downloaded file is 0 bytes!")
+                return False, "Downloaded file is empty (0 bytes)"
+            
+            return True, f"Backup downloaded successfully to {local_download_path}"
                 
-        except subprocess.TimeoutExpired:
+        except RcloneTimeout:
             print("Download timeout (5 minutes)")
             return False, "Download timeout (5 minutes)"
+        except RcloneError as e:
+            error_msg = str(e) or "Download failed"
+            print(f"rclone download failed: {error_msg}")
+            return False, error_msg
         except Exception as e:
             print(f"Exception in download_backup: {e}")
             return False, f"Download error: {str(e)}"
 
+    def stream_backup(self, remote_name: str, remote_file_path: str,
+                      timeout: int = 3600) -> Tuple[bool, str, Optional[Iterator[bytes]]]:
+        """
+        Open a backup for streaming with `rclone cat`, with no local copy. The first
+        chunk is read before returning, so a missing file or rclone error is reported
+        here rather than as a truncated download.
+        """
+        if not self.check_rclone_available():
+            return False, "rclone is not available", None
+        
+        remote_path = f"{remote_name}:{remote_file_path}"
+        chunks = self.backend.cat(remote_name, remote_file_path, timeout=timeout)
+        try:
+            first_chunk = next(chunks, b'')
+        except RcloneTimeout:
+            return False, f"Timed out opening {remote_path}", None
+        except RcloneError as e:
+            print(f"rclone cat failed: {e}")
+            return False, str(e) or f"Could not read {remote_path}", None
+        except Exception as e:
+            print(f"Exception in stream_backup: {e}")
+            return False, f"Download error: {str(e)}", None
+        
+        if not first_chunk:
+            chunks.close()
+            return False, "Downloaded file is empty (0 bytes)", None
+        
+        def relay():
+            try:
+                yield first_chunk
+                yield from chunks
+            finally:
+                # Stops rclone if the client goes away mid-download
+                chunks.close()
+        
+        return True, f"Streaming {remote_path}", relay()
+    
     def delete_cloud_backup(self, remote_name: str, remote_file_path: str) -> Tuple[bool, str]:
         """Delete backup from cloud storage"""
         if not self.check_rclone_available():
@@ -646,22 +741,17 @@ class CloudBackupService:
         
         try:
             # Check if the path already includes the backup folder
-            if remote_file_path.startswith(self.backup_path):
-                # Path already includes backup folder
-                remote_path = f"{remote_name}:{remote_file_path}"
-            else:
+            if not remote_file_path.startswith(self.backup_path):
                 # Path is relative, need to add backup folder
-                remote_path = f"{remote_name}:{self.backup_path}/{remote_file_path}"
-            
-            result = self._run_rclone_command(['delete', remote_path], timeout=60)
+                remote_file_path = f"{self.backup_path}/{remote_file_path}"
             
-            if result.returncode == 0:
-                return True, "Backup deleted successfully"
-            else:
-                error_msg = result.stderr.strip() or "Delete failed"
-                print(f"Delete failed with error: {error_msg}")
-                return False, error_msg
+            self.backend.delete_file(remote_name, remote_file_path, timeout=60)
+            return True, "Backup deleted successfully"
             
+        except RcloneError as e:
+            error_msg = str(e) or "Delete failed"
+            print(f"Delete failed with error: {error_msg}")
+            return False, error_msg
         except Exception as e:
             print(f"Exception in delete_cloud_backup: {e}")
             return False, f"Delete error: {str(e)}"
@@ -672,16 +762,6 @@ class CloudBackupService:
             return {}
         
         try:
-            result = self._run_rclone_command(['about', f'{remote_name}:'], timeout=30)
-            
-            if result.returncode == 0:
-                # Parse the about output
-                usage_info = {}
-                for line in result.stdout.split('\n'):
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        usage_info[key.strip()] = value.strip()
-                return usage_info
-            return {}
+            return self.backend.about(remote_name, timeout=30)
         except Exception:
-            return {}
\ No newline at end of file
+            return {}
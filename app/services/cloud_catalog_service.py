@@ -0,0 +1,307 @@
+import hashlib
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, or_
+from sqlalchemy.dialects.sqlite import insert
+from typing import Dict, List, Optional, Tuple
+from app import db
+from app.models import CloudBackup, CloudBackupRemote
+from app.services.cloud_backup_service import CloudBackupService
+
+
+class CloudCatalogService:
+    """
+    Local catalog of the backups on each rclone remote (cloud_backups table), so
+    the cloud page doesn't list every remote recursively on each request.
+
+    Uploads and deletes made through the app update the catalog directly. Changes
+    made outside the app are picked up by reconciling with the remote: an
+    incremental pass only lists the YYYY/MM/DD folders written to since the last
+    pass, and a full pass relists the whole backup path every
+    RCLONE_CATALOG_FULL_REFRESH seconds.
+    """
+
+    HASH_CHUNK_SIZE = 1024 * 1024
+    # Incremental passes that would cover more day folders than this relist everything instead
+    MAX_INCREMENTAL_DAYS = 7
+
+    def __init__(self, cloud_service: Optional[CloudBackupService] = None):
+        self.cloud_service = cloud_service or CloudBackupService()
+        self.backup_path = self.cloud_service.backup_path
+        self.refresh_interval = current_app.config.get('RCLONE_CATALOG_REFRESH', 900)
+        self.full_refresh_interval = current_app.config.get('RCLONE_CATALOG_FULL_REFRESH', 86400)
+        self.list_timeout = current_app.config.get('RCLONE_LIST_TIMEOUT', 20)
+
+    def get_backups(self, remote_names: List[str]) -> Tuple[Dict[str, List[Dict]], Dict[str, str]]:
+        """
+        Catalogued backups per remote (newest first) and the error from each remote's
+        last sync, if any. Remotes that have never been catalogued are listed now.
+        """
+        states = self.get_states(remote_names)
+        uncatalogued = [remote_name for remote_name in remote_names
+                        if remote_name not in states
+                        or (states[remote_name].full_synced_at is None and not states[remote_name].last_error)]
+        if uncatalogued:
+            self.sync(uncatalogued, full=True)
+            states = self.get_states(remote_names)
+
+        backups = {remote_name: [] for remote_name in remote_names}
+        rows = (CloudBackup.query
+                .filter(CloudBackup.remote.in_(remote_names))
+                .order_by(CloudBackup.remote, CloudBackup.modified.desc())
+                .all())
+        for row in rows:
+            backups[row.remote].append(row.to_dict())
+
+        errors = {remote_name: state.last_error for remote_name, state in states.items() if state.last_error}
+        return backups, errors
+
+    def get_backup(self, remote_name: str, path: str) -> Optional[CloudBackup]:
+        """The catalog entry for one remote file, or None if it isn't catalogued"""
+        return CloudBackup.query.filter_by(remote=remote_name, path=path).first()
+
+    def get_states(self, remote_names: List[str]) -> Dict[str, CloudBackupRemote]:
+        rows = CloudBackupRemote.query.filter(CloudBackupRemote.remote.in_(remote_names)).all()
+        return {row.remote: row for row in rows}
+
+    def sync(self, remote_names: List[str], full: bool = False, force: bool = False) -> Dict[str, str]:
+        """
+        Reconcile the catalog with the given remotes, listing them concurrently.
+
+        Without force, remotes tried within RCLONE_CATALOG_REFRESH seconds are skipped.
+        A remote another worker is already listing is always skipped. Returns the
+        listing errors by remote name.
+        """
+        now = datetime.now()
+        scopes = {}
+        for remote_name in remote_names:
+            state = self._claim(remote_name, now, force)
+            if state is not None:
+                scopes[remote_name] = self._scope(state, now, full)
+        if not scopes:
+            return {}
+
+        def list_scope(remote_name):
+            return [(path, self.cloud_service._list_cloud_backups(remote_name, path, timeout=self.list_timeout))
+                    for path in scopes[remote_name]]
+
+        results, errors = self.cloud_service.map_remotes(list_scope, list(scopes))
+
+        for remote_name, listings in results.items():
+            self._apply(remote_name, listings, now)
+            values = {'synced_at': now, 'sync_started_at': None, 'last_error': None}
+            if scopes[remote_name] == [self.backup_path]:
+                values['full_synced_at'] = now
+            self._update_state(remote_name, values)
+        for remote_name, error in errors.items():
+            self._update_state(remote_name, {'sync_started_at': None, 'last_error': error[:500]})
+        db.session.commit()
+
+        print(f"Cloud catalog synced: {', '.join(f'{name} ({len(scopes[name])} folders)' for name in results) or 'none'}")
+        return errors
+
+    def _claim(self, remote_name: str, now: datetime, force: bool) -> Optional[CloudBackupRemote]:
+        """Take the sync lease for a remote; None if it is not due or another worker holds it"""
+        db.session.execute(insert(CloudBackupRemote).values(remote=remote_name).on_conflict_do_nothing())
+
+        # A lease older than a few listing timeouts belongs to a worker that died mid-sync
+        lease_expired = now - timedelta(seconds=self.list_timeout * 3 + 60)
+        conditions = [
+            CloudBackupRemote.remote == remote_name,
+            or_(CloudBackupRemote.sync_started_at.is_(None), CloudBackupRemote.sync_started_at < lease_expired),
+        ]
+        if not force:
+            # Due once the refresh interval has passed since the last attempt, so a
+            # failing remote is retried at the same pace as a working one
+            conditions.append(or_(CloudBackupRemote.attempted_at.is_(None),
+                                  CloudBackupRemote.attempted_at < now - timedelta(seconds=self.refresh_interval)))
+
+        result = db.session.execute(
+            db.update(CloudBackupRemote).where(*conditions).values(sync_started_at=now, attempted_at=now)
+        )
+        db.session.commit()
+        return db.session.get(CloudBackupRemote, remote_name) if result.rowcount == 1 else None
+
+    def _scope(self, state: CloudBackupRemote, now: datetime, full: bool) -> List[str]:
+        """Remote folders to list: the whole backup path, or the day folders since the last sync"""
+        if (full or state.synced_at is None or state.full_synced_at is None
+                or now - state.full_synced_at > timedelta(seconds=self.full_refresh_interval)):
+            return [self.backup_path]
+
+        # upload_backup writes to <backup path>/YYYY/MM/DD/. Start a day early in case
+        # the uploading machine's clock or timezone differs from ours.
+        first_day = state.synced_at.date() - timedelta(days=1)
+        days = (now.date() - first_day).days
+        if days > self.MAX_INCREMENTAL_DAYS:
+            return [self.backup_path]
+        return [f"{self.backup_path}/{(first_day + timedelta(days=offset)).strftime('%Y/%m/%d')}"
+                for offset in range(days + 1)]
+
+    def _apply(self, remote_name: str, listings: List[Tuple[str, List[Dict]]], now: datetime):
+        """Upsert listed backups and drop catalog entries under the listed folders that are gone"""
+        for folder, backups in listings:
+            seen = set()
+            for backup in backups:
+                seen.add(backup['path'])
+                self._upsert(remote_name, backup, now)
+
+            catalogued = CloudBackup.query.filter(
+                CloudBackup.remote == remote_name,
+                CloudBackup.path.startswith(f'{folder}/', autoescape=True)
+            ).all()
+            for row in catalogued:
+                if row.path not in seen:
+                    db.session.delete(row)
+
+    def _upsert(self, remote_name: str, backup: Dict, now: datetime,
+                sha256: Optional[str] = None, manifest_summary: Optional[Dict] = None):
+        path = backup['path']
+        values = {
+            'remote': remote_name,
+            'path': path,
+            'relative_path': path[len(self.backup_path) + 1:] if path.startswith(f'{self.backup_path}/') else path,
+            'name': backup['name'],
+            'size': backup.get('size', 0),
+            'modified': backup.get('modified', ''),
+            'backup_type': backup.get('backup_type', 'full'),
+            'detection_method': backup.get('detection_method'),
+            'last_seen_at': now,
+        }
+        if sha256:
+            values['sha256'] = sha256
+            values['manifest_summary'] = manifest_summary
+
+        statement = insert(CloudBackup).values(**values)
+        update_values = {key: statement.excluded[key] for key in values if key not in ('remote', 'path')}
+        if not sha256:
+            # A listing can't tell us the hash; keep the one recorded at upload unless the file changed size
+            update_values['sha256'] = case((CloudBackup.size == statement.excluded.size, CloudBackup.sha256), else_=None)
+            update_values['manifest_summary'] = case(
+                (CloudBackup.size == statement.excluded.size, CloudBackup.manifest_summary), else_=None
+            )
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[CloudBackup.remote, CloudBackup.path],
+            set_=update_values
+        ))
+
+    def _update_state(self, remote_name: str, values: Dict):
+        db.session.execute(
+            db.update(CloudBackupRemote).where(CloudBackupRemote.remote == remote_name).values(**values)
+        )
+
+    def record_upload(self, remote_name: str, file_info: Dict, sha256: str, size: int,
+                      manifest: Optional[Dict] = None):
+        """Add an archive this app just uploaded, with its hash and manifest summary"""
+        path = file_info['path'].split(':', 1)[1]
+        name = os.path.basename(path)
+        manifest = manifest or {}
+        self._upsert(remote_name, {
+            'path': path,
+            'name': name,
+            'size': file_info.get('size') or size,
+            'modified': file_info.get('modified') or datetime.now().astimezone().isoformat(),
+            'backup_type': manifest.get('backup_type', 'full'),
+            'detection_method': self.cloud_service._get_detection_method(name),
+        }, datetime.now(), sha256=sha256, manifest_summary=self.summarize_manifest(manifest))
+        db.session.commit()
+
+    def record_delete(self, remote_name: str, remote_file_path: str):
+        db.session.execute(
+            db.delete(CloudBackup).where(CloudBackup.remote == remote_name, CloudBackup.path == remote_file_path)
+        )
+        db.session.commit()
+
+    def reset(self):
+        """
+        Empty the catalog so it is rebuilt from the remotes. Used after a restore, which
+        replaces the database (and its catalog) with an older copy.
+        """
+        for model in (CloudBackup, CloudBackupRemote):
+            model.__table__.create(db.engine, checkfirst=True)
+            db.session.execute(db.delete(model))
+        db.session.commit()
+
+    @staticmethod
+    def summarize_manifest(manifest: Dict) -> Dict:
+        """The parts of a backup manifest worth showing without downloading the archive"""
+        if not manifest:
+            return {}
+        statistics = manifest.get('statistics', {})
+        return {
+            'created_at': manifest.get('created_at'),
+            'backup_type': manifest.get('backup_type', 'full'),
+            'total_jobs': statistics.get('total_jobs'),
+            'total_notes': statistics.get('total_notes'),
+            'total_activities': statistics.get('total_activities'),
+            'total_size': statistics.get('total_size'),
+            'compression_ratio': statistics.get('compression_ratio'),
+            'file_count': len(manifest['files']) if 'files' in manifest else None,
+            'changed_files': manifest.get('changed_files'),
+            'chain_length': len(manifest.get('chain', [])),
+        }
+
+    @classmethod
+    def hash_file(cls, path: str) -> str:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+
+class CatalogReconciler:
+    """
+    Background thread that keeps the catalog in step with every configured remote.
+    It wakes up every POLL_INTERVAL seconds; CloudCatalogService.sync() only lists
+    remotes that are due, and its lease stops several gunicorn workers listing the
+    same remote.
+    """
+
+    POLL_INTERVAL = 60
+
+    def __init__(self, app):
+        self.app = app
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='cloud-catalog', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.reconcile()
+            except Exception as e:
+                print(f"Cloud catalog reconcile failed: {e}")
+            if self.stop_event.wait(self.POLL_INTERVAL):
+                return
+
+    def reconcile(self):
+        catalog = CloudCatalogService()
+        if not catalog.cloud_service.check_rclone_available():
+            return
+        remote_names = [remote['name'] for remote in catalog.cloud_service.list_configured_remotes()]
+        if remote_names:
+            catalog.sync(remote_names)
+
+
+_reconciler = None
+_reconciler_lock = threading.Lock()
+
+
+def start_catalog_reconciler(app) -> Optional[CatalogReconciler]:
+    """Start this process's reconciler once. RCLONE_CATALOG_REFRESH=0 disables it."""
+    global _reconciler
+    if not app.config.get('RCLONE_CATALOG_REFRESH', 900):
+        return None
+    with _reconciler_lock:
+        if _reconciler is None:
+            _reconciler = CatalogReconciler(app)
+            _reconciler.start()
+        return _reconciler
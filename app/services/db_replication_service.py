@@ -0,0 +1,577 @@
+import gzip
+import os
+import re
+import secrets
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from typing import Callable, Dict, List, Optional, Tuple
+from app.services.rclone_backend import RcloneError
+from app.utils.sqlite_utils import SnapshotError, verify_database
+from app.utils.sqlite_wal import (WAL_HEADER_SIZE, WalHeader, apply_frames, database_page_size,
+                                  parse_wal_header, read_committed_frames, read_wal_header, wal_path_for)
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single app process
+    fcntl = None
+
+# Replica layout, the same on a local folder or an rclone remote:
+#   generations/<generation>/snapshot.db.gz           database at the start of the generation
+#   generations/<generation>/wal/<seq>_<time>.wal.gz  WAL header + committed frames, in order
+# Generation ids and segment times are UTC, so they sort in the order they were written.
+TIME_FORMAT = '%Y%m%dT%H%M%S%fZ'
+GENERATION_PATTERN = re.compile(r'^(\d{8}T\d{12}Z)_[0-9a-f]{8}$')
+SEGMENT_PATTERN = re.compile(r'^(\d{8})_(\d{8}T\d{12}Z)\.wal\.gz$')
+SNAPSHOT_NAME = 'snapshot.db.gz'
+
+
+class ReplicationError(Exception):
+    """The database replica could not be written, read or restored"""
+
+
+def format_time(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime(TIME_FORMAT)
+
+
+def parse_time(value: str) -> datetime:
+    return datetime.strptime(value, TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def parse_restore_time(value: Optional[str]) -> Optional[datetime]:
+    """An ISO 8601 restore target as an aware datetime; times without an offset are local time"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.strip())
+    return moment.astimezone() if moment.tzinfo is None else moment
+
+
+class LocalReplicaTarget:
+    """Replica kept in a local (or mounted) folder"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def __str__(self):
+        return self.root
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split('/'))
+
+    def write(self, name: str, data: bytes):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name so a reader never sees a partial file
+        partial_path = f'{path}.part'
+        with open(partial_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial_path, path)
+
+    def write_file(self, name: str, local_path: str):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(local_path, f'{path}.part')
+        os.replace(f'{path}.part', path)
+
+    def read(self, name: str) -> bytes:
+        with open(self._path(name), 'rb') as f:
+            return f.read()
+
+    def list(self, prefix: str) -> List[str]:
+        """Names of the files under prefix, relative to the replica root"""
+        names = []
+        for root, dirs, files in os.walk(self._path(prefix)):
+            for file in files:
+                if not file.endswith('.part'):
+                    names.append(os.path.relpath(os.path.join(root, file), self.root).replace(os.sep, '/'))
+        return names
+
+    def delete_tree(self, prefix: str):
+        shutil.rmtree(self._path(prefix), ignore_errors=True)
+
+
+class RcloneReplicaTarget:
+    """Replica kept under a path on an rclone remote, written through the app's rclone backend"""
+
+    def __init__(self, remote_name: str, path: str, backend, timeout: int = 300):
+        self.remote_name = remote_name
+        self.path = path.strip('/')
+        self.backend = backend
+        self.timeout = timeout
+
+    def __str__(self):
+        return f'{self.remote_name}:{self.path}'
+
+    def _path(self, name: str) -> str:
+        return f'{self.path}/{name}' if self.path else name
+
+    def write(self, name: str, data: bytes):
+        self.backend.upload_stream(iter([data]), self.remote_name, self._path(name), timeout=self.timeout)
+
+    def write_file(self, name: str, local_path: str):
+        self.backend.upload_file(local_path, self.remote_name, self._path(name), timeout=self.timeout)
+
+    def read(self, name: str) -> bytes:
+        return b''.join(self.backend.cat(self.remote_name, self._path(name), timeout=self.timeout))
+
+    def list(self, prefix: str) -> List[str]:
+        try:
+            items = self.backend.list(self.remote_name, self._path(prefix), recursive=True, timeout=self.timeout)
+        except RcloneError as e:
+            if 'directory not found' in str(e).lower():
+                return []
+            raise
+        return [f"{prefix}/{item['Path']}" for item in items if not item.get('IsDir')]
+
+    def delete_tree(self, prefix: str):
+        for name in self.list(prefix):
+            self.backend.delete_file(self.remote_name, self._path(name), timeout=self.timeout)
+
+
+def replica_target(config):
+    """
+    The replica target named by SQLITE_REPLICA_TARGET: an absolute path is a local
+    folder, "remote:path" a path on an rclone remote. None if replication is off.
+    """
+    target = config.get('SQLITE_REPLICA_TARGET')
+    if not target:
+        return None
+    if os.path.isabs(target):
+        return LocalReplicaTarget(target)
+    if ':' in target:
+        from app.services.cloud_backup_service import CloudBackupService
+        remote_name, path = target.split(':', 1)
+        return RcloneReplicaTarget(remote_name, path or 'job-tracker-db-replica', CloudBackupService().backend,
+                                   timeout=config.get('RCLONE_TRANSFER_TIMEOUT', 3600))
+    raise ValueError(f"SQLITE_REPLICA_TARGET must be an absolute path or remote:path, not '{target}'")
+
+
+class DatabaseReplicaService:
+    """
+    Reads the continuous replica written by DatabaseReplicator: lists its generations
+    and rebuilds the database as it was at a point in time.
+    """
+
+    def __init__(self, target=None):
+        self.target = target or replica_target(current_app.config)
+        if self.target is None:
+            raise ReplicationError('Database replication is not configured (SQLITE_REPLICA_TARGET)')
+
+    def list_generations(self) -> List[Dict]:
+        """Generations, oldest first, each with its start time and WAL segments in order"""
+        generations = {}
+        for name in self.target.list('generations'):
+            parts = name.split('/')
+            if len(parts) < 3 or not GENERATION_PATTERN.match(parts[1]):
+                continue
+            generation = generations.setdefault(parts[1], {
+                'id': parts[1],
+                'started_at': parse_time(GENERATION_PATTERN.match(parts[1]).group(1)),
+                'has_snapshot': False,
+                'segments': [],
+            })
+            if parts[2:] == [SNAPSHOT_NAME]:
+                generation['has_snapshot'] = True
+            elif len(parts) == 4 and parts[2] == 'wal':
+                match = SEGMENT_PATTERN.match(parts[3])
+                if match:
+                    generation['segments'].append({'seq': int(match.group(1)),
+                                                   'written_at': parse_time(match.group(2)),
+                                                   'name': name})
+
+        result = []
+        for generation in sorted(generations.values(), key=lambda g: g['started_at']):
+            if not generation['has_snapshot']:
+                continue
+            # Only an unbroken run of segments from the first can be replayed
+            segments = sorted(generation['segments'], key=lambda s: s['seq'])
+            contiguous = []
+            for expected, segment in enumerate(segments):
+                if segment['seq'] != expected:
+                    break
+                contiguous.append(segment)
+            generation['segments'] = contiguous
+            generation['latest_at'] = contiguous[-1]['written_at'] if contiguous else generation['started_at']
+            result.append(generation)
+        return result
+
+    def restore(self, output_path: str, target_time: Optional[datetime] = None,
+                report: Optional[Callable] = None) -> Dict:
+        """
+        Rebuild the database as of target_time (the latest replicated state if None)
+        into output_path: the newest snapshot taken at or before that time, then every
+        WAL segment written up to it. The result is integrity-checked before it is
+        moved into place. Precision is the replicator's sync interval.
+        """
+        generations = self.list_generations()
+        if target_time is not None:
+            generations = [g for g in generations if g['started_at'] <= target_time]
+        if not generations:
+            raise ReplicationError('No database replica covers that time' if target_time
+                                   else 'The database replica is empty')
+        generation = generations[-1]
+        segments = [s for s in generation['segments'] if target_time is None or s['written_at'] <= target_time]
+
+        partial_path = f'{output_path}.part'
+        transactions = 0
+        try:
+            if report:
+                report(stage='downloading', message=f"Fetching snapshot from {generation['started_at'].astimezone():%Y-%m-%d %H:%M:%S}")
+            with open(partial_path, 'wb') as db_file:
+                db_file.write(gzip.decompress(self.target.read(f"generations/{generation['id']}/{SNAPSHOT_NAME}")))
+            page_size = database_page_size(partial_path)
+
+            with open(partial_path, 'r+b') as db_file:
+                for position, segment in enumerate(segments):
+                    if report:
+                        report(stage='replaying', message=f'Replaying WAL segment {position + 1} of {len(segments)}',
+                               percent=round((position + 1) * 100 / len(segments)))
+                    data = gzip.decompress(self.target.read(segment['name']))
+                    header = parse_wal_header(data[:WAL_HEADER_SIZE])
+                    if header is None or header.page_size != page_size:
+                        raise ReplicationError(f"{segment['name']} has an invalid WAL header")
+                    transactions += apply_frames(db_file, data[WAL_HEADER_SIZE:], page_size)
+            verify_database(partial_path)
+            os.replace(partial_path, output_path)
+        except (OSError, ValueError, SnapshotError, RcloneError) as e:
+            raise ReplicationError(f'Could not rebuild the database from the replica: {e}')
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+        recovered_to = segments[-1]['written_at'] if segments else generation['started_at']
+        return {
+            'generation': generation['id'],
+            'segments': len(segments),
+            'transactions': transactions,
+            'recovered_to': recovered_to.astimezone().isoformat(),
+        }
+
+    def prune(self, retention: int, keep: Optional[str] = None) -> List[str]:
+        """
+        Delete generations no longer needed to restore to any point in the last
+        `retention` seconds: those followed by a generation that started before then.
+        """
+        cutoff = datetime.now(timezone.utc).timestamp() - retention
+        generations = self.list_generations()
+        removed = []
+        for generation, successor in zip(generations, generations[1:]):
+            if successor['started_at'].timestamp() < cutoff and generation['id'] != keep:
+                self.target.delete_tree(f"generations/{generation['id']}")
+                removed.append(generation['id'])
+        return removed
+
+
+class DatabaseReplicator:
+    """
+    Background thread that ships app.db's write-ahead log to the replica as it is
+    written, in the manner of Litestream.
+
+    A generation starts with a snapshot of the database; from then on, every
+    SQLITE_REPLICA_SYNC_INTERVAL seconds the frames of transactions committed since
+    the last pass are copied from the WAL file into a numbered segment. The
+    replicator keeps a read transaction open, which stops SQLite from restarting the
+    WAL (and overwriting frames) before they are copied, and runs checkpoints
+    itself: with the write lock held it copies the last frames, checkpoints, and
+    takes a new read transaction before writers continue. If the WAL ever changes in
+    a way that could have lost frames, a new generation is started.
+
+    Only one process replicates; the others wait on a lock file and take over if it exits.
+    """
+
+    # Segments held in memory while the target is unreachable; past this a new
+    # generation is started once it is back
+    MAX_PENDING_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, app, target):
+        self.app = app
+        self.target = target
+        self.db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+        self.wal_path = wal_path_for(self.db_path)
+        self.sync_interval = app.config.get('SQLITE_REPLICA_SYNC_INTERVAL', 1)
+        self.checkpoint_pages = app.config.get('SQLITE_REPLICA_CHECKPOINT_PAGES', 1000)
+        self.checkpoint_interval = app.config.get('SQLITE_REPLICA_CHECKPOINT_INTERVAL', 60)
+        self.snapshot_interval = app.config.get('SQLITE_REPLICA_SNAPSHOT_INTERVAL', 86400)
+        self.retention = app.config.get('SQLITE_REPLICA_RETENTION', 7 * 86400)
+        self.busy_timeout = app.config.get('SQLITE_BUSY_TIMEOUT_MS', 15000) / 1000
+
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='db-replicator', daemon=True)
+        self.lock_file = None
+        self.connection = None
+        self.db_fd = None
+        self.db_inode = None
+        self.generation = None
+        self.generation_started = 0.0
+        self.seq = 0
+        self.header: Optional[WalHeader] = None
+        self.offset = WAL_HEADER_SIZE
+        self.checksum: Tuple[int, int] = (0, 0)
+        self.frames_since_checkpoint = 0
+        self.checkpointed_at = 0.0
+        self.pending: List[Tuple[str, bytes]] = []
+        self.last_error = None
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.step()
+            except Exception as e:
+                print(f"Database replication error: {e}")
+                self.last_error = str(e)
+                self.close()
+            if self.stop_event.wait(self.sync_interval):
+                self.close()
+                return
+
+    def step(self):
+        if not self.acquire_process_lock():
+            return
+        if self.generation is None or time.monotonic() - self.generation_started > self.snapshot_interval:
+            self.flush()
+            self.start_generation()
+        else:
+            self.sync()
+            if self.checkpoint_due():
+                self.checkpoint()
+        self.flush()
+
+    def acquire_process_lock(self) -> bool:
+        if self.lock_file is not None:
+            return True
+        lock_file = open(f'{self.db_path}-replica.lock', 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self.lock_file = lock_file
+        print(f"Replicating {self.db_path} to {self.target}")
+        return True
+
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        journal_mode = connection.execute('PRAGMA journal_mode').fetchone()[0]
+        if journal_mode.lower() != 'wal':
+            connection.close()
+            raise ReplicationError(f'Replication needs SQLITE_JOURNAL_MODE=WAL (the database uses {journal_mode})')
+        return connection
+
+    def begin_read(self):
+        """Hold a read transaction so the WAL can't be restarted under us"""
+        self.connection.execute('BEGIN')
+        self.connection.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+
+    def end_read(self):
+        if self.connection is not None and self.connection.in_transaction:
+            self.connection.execute('ROLLBACK')
+
+    def open_database_file(self):
+        """
+        A descriptor for reading app.db's pages directly, kept open for as long as the
+        file exists. Closing any descriptor of a file drops every POSIX lock the
+        process holds on it, including SQLite's, which would let another process
+        delete the WAL while this one still reads it.
+        """
+        inode = os.stat(self.db_path).st_ino
+        if self.db_fd is None or inode != self.db_inode:
+            # The old descriptor belongs to a file that was replaced, so closing it is harmless
+            if self.db_fd is not None:
+                os.close(self.db_fd)
+            self.db_fd = os.open(self.db_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            self.db_inode = inode
+
+    def copy_database_file(self, dest_path: str):
+        if not hasattr(os, 'pread'):  # Windows, where closing a handle doesn't drop other locks
+            shutil.copyfile(self.db_path, dest_path)
+            return
+        with open(dest_path, 'wb') as dest:
+            position = 0
+            while True:
+                chunk = os.pread(self.db_fd, 1024 * 1024, position)
+                if not chunk:
+                    break
+                dest.write(chunk)
+                position += len(chunk)
+
+    def close(self):
+        """Drop the read transaction and connection; the next step starts a new generation"""
+        try:
+            self.end_read()
+            if self.connection is not None:
+                self.connection.close()
+        except sqlite3.Error:
+            pass
+        self.connection = None
+        self.generation = None
+
+    def start_generation(self):
+        self.close()
+        self.connection = self.connect()
+        self.open_database_file()
+        self.begin_read()
+
+        generation = f"{format_time(datetime.now(timezone.utc))}_{secrets.token_hex(4)}"
+        fd, snapshot_path = tempfile.mkstemp(prefix='.replica_snapshot_', dir=os.path.dirname(self.db_path))
+        os.close(fd)
+        try:
+            # The database file plus the committed WAL frames is the current state. A
+            # checkpoint may copy frames into the file while it is read, but only frames
+            # that are applied again on top, so the result is consistent; if the WAL
+            # was restarted meanwhile, read it again.
+            for attempt in range(5):
+                header = read_wal_header(self.wal_path)
+                self.copy_database_file(snapshot_path)
+                frames, offset, checksum = (read_committed_frames(self.wal_path, header, WAL_HEADER_SIZE, header.checksum)
+                                            if header else (b'', WAL_HEADER_SIZE, (0, 0)))
+                if read_wal_header(self.wal_path) == header:
+                    break
+            else:
+                raise ReplicationError('The WAL kept changing while the snapshot was taken')
+
+            with open(snapshot_path, 'r+b') as db_file:
+                apply_frames(db_file, frames, database_page_size(snapshot_path))
+            verify_database(snapshot_path)
+            with open(snapshot_path, 'rb') as source, gzip.open(f'{snapshot_path}.gz', 'wb') as compressed:
+                shutil.copyfileobj(source, compressed)
+            self.target.write_file(f'generations/{generation}/{SNAPSHOT_NAME}', f'{snapshot_path}.gz')
+        finally:
+            for path in (snapshot_path, f'{snapshot_path}.gz'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self.generation = generation
+        self.generation_started = time.monotonic()
+        self.checkpointed_at = time.monotonic()
+        self.seq = 0
+        self.header = header
+        self.offset = offset
+        self.checksum = checksum
+        self.frames_since_checkpoint = len(frames) // header.frame_size if header else 0
+        print(f"Database replica generation {generation} started")
+
+        try:
+            removed = DatabaseReplicaService(self.target).prune(self.retention, keep=generation)
+            if removed:
+                print(f"Removed {len(removed)} expired replica generation(s)")
+        except Exception as e:
+            print(f"Could not prune replica generations: {e}")
+
+    def sync(self):
+        """Queue the transactions committed to the WAL since the last pass as a new segment"""
+        if os.stat(self.db_path).st_ino != self.db_inode:
+            raise ReplicationError('The database file was replaced')
+        header = read_wal_header(self.wal_path)
+        if header is None:
+            if self.header is not None:
+                raise ReplicationError('The WAL was removed outside replication')
+            return
+        if self.header is None:
+            # No WAL when the generation started: the snapshot holds everything
+            self.offset, self.checksum = WAL_HEADER_SIZE, header.checksum
+        elif header.raw != self.header.raw:
+            # While our read transaction is open SQLite can restart the WAL at most once,
+            # and only after every frame in it was copied; anything else may have lost frames
+            if header.salt1 != (self.header.salt1 + 1) & 0xffffffff or header.page_size != self.header.page_size:
+                raise ReplicationError('The WAL was restarted outside replication')
+            self.offset, self.checksum = WAL_HEADER_SIZE, header.checksum
+        self.header = header
+
+        frames, self.offset, self.checksum = read_committed_frames(self.wal_path, header, self.offset, self.checksum)
+        if not frames:
+            return
+        name = f"generations/{self.generation}/wal/{self.seq:08d}_{format_time(datetime.now(timezone.utc))}.wal.gz"
+        self.pending.append((name, gzip.compress(header.raw + frames, compresslevel=6)))
+        self.seq += 1
+        self.frames_since_checkpoint += len(frames) // header.frame_size
+
+    def checkpoint_due(self) -> bool:
+        if self.frames_since_checkpoint >= self.checkpoint_pages:
+            return True
+        return self.frames_since_checkpoint > 0 and time.monotonic() - self.checkpointed_at >= self.checkpoint_interval
+
+    def checkpoint(self):
+        """
+        Checkpoint the WAL without losing frames: writers are held off while the last
+        frames are copied, the read transaction is dropped so the checkpoint can copy
+        everything into the database, and a new one is taken before writers resume.
+        """
+        # Catch up first, so only frames written in the meantime are copied under the lock
+        self.sync()
+        writer = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        try:
+            try:
+                writer.execute('BEGIN IMMEDIATE')
+            except sqlite3.OperationalError as e:
+                print(f"Replica checkpoint skipped: {e}")
+                return
+            try:
+                self.sync()
+                self.end_read()
+                self.connection.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+                self.begin_read()
+            finally:
+                writer.execute('ROLLBACK')
+        finally:
+            writer.close()
+        self.frames_since_checkpoint = 0
+        self.checkpointed_at = time.monotonic()
+
+    def flush(self):
+        """Write queued segments to the target in order; on failure they are retried next pass"""
+        try:
+            while self.pending:
+                name, data = self.pending[0]
+                self.target.write(name, data)
+                self.pending.pop(0)
+        except Exception as e:
+            print(f"Could not write database replica segment: {e}")
+            self.last_error = str(e)
+            if sum(len(data) for name, data in self.pending) > self.MAX_PENDING_BYTES:
+                print("Database replica target unavailable for too long; a new generation will be started")
+                self.pending.clear()
+                self.close()
+
+    def status(self) -> Dict:
+        return {
+            'generation': self.generation,
+            'segments': self.seq,
+            'pending_segments': len(self.pending),
+            'last_error': self.last_error,
+        }
+
+
+_replicator = None
+_replicator_lock = threading.Lock()
+
+
+def start_db_replicator(app) -> Optional[DatabaseReplicator]:
+    """Start this process's replicator once. Replication is off unless SQLITE_REPLICA_TARGET is set."""
+    global _replicator
+    if not app.config.get('SQLITE_REPLICA_TARGET'):
+        return None
+    with _replicator_lock:
+        if _replicator is None:
+            with app.app_context():
+                target = replica_target(app.config)
+            _replicator = DatabaseReplicator(app, target)
+            _replicator.start()
+        return _replicator
+
+
+def get_db_replicator() -> Optional[DatabaseReplicator]:
+    return _replicator
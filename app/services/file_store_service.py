@@ -0,0 +1,216 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from typing import Optional
+from flask import current_app
+from sqlalchemy.dialects.sqlite import insert
+from werkzeug.utils import secure_filename
+from app import db
+from app.models import StoredFile
+
+
+class FileStoreService:
+    """
+    Content-addressed file store under FILE_STORAGE_PATH/Store.
+
+    Each distinct file content is kept once, as Store/<first two hex digits>/<sha256>,
+    with a row in stored_files counting how many job fields and settings point at it.
+    References are file keys of the form "<sha256><ext>"; the extension is only used
+    for the download name and MIME type. Files saved before the store existed keep
+    their legacy names and are resolved from their original folders.
+    """
+
+    STORE_FOLDER = 'Store'
+    KEY_PATTERN = re.compile(r'^(?P<sha256>[0-9a-f]{64})(?P<ext>\.[A-Za-z0-9]+)?$')
+    BLOB_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+    CHUNK_SIZE = 1024 * 1024
+    # Upload temp files older than this (seconds) were left by a crashed worker
+    ORPHAN_TEMP_AGE = 3600
+
+    def __init__(self):
+        self.storage_path = current_app.config['FILE_STORAGE_PATH']
+        self.store_path = os.path.join(self.storage_path, self.STORE_FOLDER)
+
+    def parse_key(self, name: Optional[str]) -> Optional[str]:
+        """Return the SHA-256 of a file key, or None for legacy filenames"""
+        match = self.KEY_PATTERN.match(name or '')
+        return match.group('sha256') if match else None
+
+    def is_key(self, name: Optional[str]) -> bool:
+        return self.parse_key(name) is not None
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.store_path, sha256[:2], sha256)
+
+    def resolve_path(self, name: str, legacy_folder: Optional[str] = None) -> Optional[str]:
+        """Path on disk for a file key, or for a legacy filename in legacy_folder"""
+        sha256 = self.parse_key(name)
+        if sha256:
+            return self.blob_path(sha256)
+        if legacy_folder:
+            return os.path.join(self.storage_path, legacy_folder, name)
+        return None
+
+    def save(self, stream, filename: str) -> str:
+        """
+        Store the contents of a binary stream (e.g. a FileStorage) and return its file key.
+        The data is hashed while it is written, so identical content is stored once and
+        only gains a reference. The caller commits the session.
+        """
+        os.makedirs(self.store_path, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+
+        fd, temp_path = tempfile.mkstemp(dir=self.store_path, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                while True:
+                    chunk = stream.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+
+            sha256 = hasher.hexdigest()
+            self._increment(sha256, size)
+
+            final_path = self.blob_path(sha256)
+            if os.path.exists(final_path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(temp_path, final_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        _, ext = os.path.splitext(secure_filename(filename))
+        return sha256 + ext.lower()
+
+    def save_file(self, path: str) -> str:
+        """Store a file from disk and return its file key"""
+        with open(path, 'rb') as source:
+            return self.save(source, os.path.basename(path))
+
+    def add_reference(self, key: str) -> bool:
+        """Reference an already stored file again. Returns False if it is not in the store."""
+        sha256 = self.parse_key(key)
+        if not sha256 or not os.path.exists(self.blob_path(sha256)):
+            return False
+        result = db.session.execute(
+            db.update(StoredFile)
+            .where(StoredFile.sha256 == sha256)
+            .values(ref_count=StoredFile.ref_count + 1)
+        )
+        return result.rowcount == 1
+
+    def release(self, name: Optional[str], legacy_folder: Optional[str] = None):
+        """
+        Drop one reference to a file key. Unreferenced blobs are removed by
+        purge_unreferenced() once the caller has committed. Legacy files are
+        deleted from legacy_folder directly.
+        """
+        if not name:
+            return
+        sha256 = self.parse_key(name)
+        if sha256:
+            db.session.execute(
+                db.update(StoredFile)
+                .where(StoredFile.sha256 == sha256)
+                .values(ref_count=StoredFile.ref_count - 1)
+            )
+        elif legacy_folder:
+            legacy_path = os.path.join(self.storage_path, legacy_folder, name)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+
+    def purge_unreferenced(self) -> int:
+        """
+        Delete blobs that no longer have any references, then any blobs left without a
+        row (see sweep_orphans). Returns the number removed.
+        """
+        removed = 0
+        candidates = db.session.execute(
+            db.select(StoredFile.sha256).where(StoredFile.ref_count <= 0)
+        ).scalars().all()
+
+        for sha256 in candidates:
+            # Re-check in the DELETE itself in case another request referenced it meanwhile
+            result = db.session.execute(
+                db.delete(StoredFile)
+                .where(StoredFile.sha256 == sha256, StoredFile.ref_count <= 0)
+            )
+            if result.rowcount != 1:
+                db.session.rollback()
+                continue
+
+            # Remove the blob before committing, while the DELETE still holds the write lock.
+            # A concurrent save() of the same content waits in _increment until the commit,
+            # then finds no blob and moves its own copy into place.
+            try:
+                self._remove_blob(sha256)
+            except OSError as e:
+                db.session.rollback()
+                print(f"Error removing stored file {sha256}: {e}")
+                continue
+            db.session.commit()
+            removed += 1
+
+        return removed + self.sweep_orphans()
+
+    def sweep_orphans(self) -> int:
+        """
+        Delete blobs with no stored_files row, left by a save() whose transaction was
+        rolled back, and upload temp files older than ORPHAN_TEMP_AGE. Returns the
+        number of blobs removed.
+        """
+        blobs = set()
+        now = time.time()
+        for directory, _, names in os.walk(self.store_path):
+            for name in names:
+                path = os.path.join(directory, name)
+                if self.BLOB_PATTERN.match(name) and path == self.blob_path(name):
+                    blobs.add(name)
+                elif name.startswith('.upload-'):
+                    try:
+                        if now - os.path.getmtime(path) > self.ORPHAN_TEMP_AGE:
+                            os.remove(path)
+                    except OSError:
+                        pass
+        if not blobs:
+            return 0
+
+        # Take the write lock before reading the rows: save() holds it from _increment
+        # until its commit, so a blob moved into place by a save still in flight has
+        # its row visible once the lock is ours
+        db.session.execute(db.update(StoredFile).where(db.false()).values(ref_count=StoredFile.ref_count))
+        removed = 0
+        try:
+            known = set(db.session.execute(db.select(StoredFile.sha256)).scalars())
+            for sha256 in blobs - known:
+                try:
+                    self._remove_blob(sha256)
+                    removed += 1
+                except OSError as e:
+                    print(f"Error removing orphaned stored file {sha256}: {e}")
+        finally:
+            db.session.commit()
+        return removed
+
+    def _remove_blob(self, sha256: str):
+        try:
+            os.remove(self.blob_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def _increment(self, sha256: str, size: int):
+        statement = insert(StoredFile).values(sha256=sha256, size=size, ref_count=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[StoredFile.sha256],
+            set_={'ref_count': StoredFile.ref_count + 1}
+        )
+        db.session.execute(statement)
@@ -0,0 +1,219 @@
+import json
+import os
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+from flask import current_app
+from typing import Dict, List, Optional, Tuple
+from app.utils.file_hashing import hash_files
+from app.utils.zip_extract import ExtractionLimits, InvalidArchiveError, check_archive, extract_member
+
+
+class IncrementalBackupService:
+    """
+    Tracks what has already been uploaded to each remote so cloud backups can ship
+    only new or changed files.
+
+    A local state file per remote records the backup chain (one full backup followed
+    by increments) and, for every file under FILE_STORAGE_PATH, its size, mtime and
+    SHA-256 as of the last upload. Every archive in a chain carries a complete DB
+    snapshot and a manifest listing the full file index and its ancestors, so the
+    newest archive alone is enough to find everything needed to restore it.
+    """
+
+    FILES_DIRECTORY = 'JobTrackerFiles'
+
+    def __init__(self):
+        self.file_storage_path = current_app.config['FILE_STORAGE_PATH']
+        self.state_dir = os.path.join(current_app.config['APP_FOLDER'], 'backup_state')
+        self.max_chain_length = current_app.config.get('BACKUP_INCREMENTAL_MAX_CHAIN', 6)
+        self.hash_workers = current_app.config.get('BACKUP_HASH_WORKERS', 0)
+
+    def _state_path(self, remote_name: str) -> str:
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', remote_name)
+        return os.path.join(self.state_dir, f'{safe_name}.json')
+
+    def load_state(self, remote_name: str) -> Dict:
+        """Return the saved state for a remote, or an empty state if none exists"""
+        try:
+            with open(self._state_path(remote_name), 'r') as state_file:
+                return json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'chain': [], 'files': {}}
+
+    def save_state(self, remote_name: str, state: Dict):
+        """Write the state atomically so an interrupted save keeps the previous one"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        state_path = self._state_path(remote_name)
+        fd, temp_path = tempfile.mkstemp(dir=self.state_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as state_file:
+            json.dump(state, state_file, indent=2)
+        os.replace(temp_path, state_path)
+
+    def reset_state(self, remote_name: str):
+        try:
+            os.remove(self._state_path(remote_name))
+        except FileNotFoundError:
+            pass
+
+    def known_hashes(self) -> Dict[str, Dict]:
+        """The file index from every remote's state merged, to reuse hashes of files that haven't changed"""
+        known = {}
+        if not os.path.isdir(self.state_dir):
+            return known
+        for name in sorted(os.listdir(self.state_dir)):
+            if name.endswith('.json'):
+                known.update(self.load_state(name[:-len('.json')]).get('files', {}))
+        return known
+
+    def scan_files(self, previous: Optional[Dict] = None) -> Dict[str, Dict]:
+        """
+        Index every file under FILE_STORAGE_PATH by path relative to it.
+        Files whose size and mtime match the previous index reuse its hash
+        instead of being read again; the rest are hashed across a thread pool.
+        """
+        previous = previous or {}
+        index = {}
+        if not os.path.exists(self.file_storage_path):
+            return index
+
+        to_hash = {}
+        for root, dirs, files in os.walk(self.file_storage_path):
+            for file in files:
+                file_path = os.path.join(root, file)
+                relative_path = os.path.relpath(file_path, self.file_storage_path).replace(os.sep, '/')
+                stat = os.stat(file_path)
+
+                known = previous.get(relative_path)
+                index[relative_path] = {
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'sha256': None,
+                }
+                if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                    index[relative_path]['sha256'] = known['sha256']
+                else:
+                    to_hash[file_path] = relative_path
+
+        for file_path, sha256 in hash_files(to_hash, self.hash_workers).items():
+            index[to_hash[file_path]]['sha256'] = sha256
+        return index
+
+    def plan_backup(self, remote_name: str, incremental: bool = True) -> Dict:
+        """
+        Work out what the next backup to a remote must contain.
+
+        Returns a dict with backup_type ('full' or 'incremental'), the chain of
+        earlier archives it builds on, the new file index, and the (arcname, path)
+        entries and deleted paths to put in the archive. Falls back to a full backup
+        when there is no chain yet or it has reached BACKUP_INCREMENTAL_MAX_CHAIN.
+        """
+        state = self.load_state(remote_name)
+        chain = state.get('chain', [])
+        index = self.scan_files(state.get('files'))
+
+        if not incremental or not chain or len(chain) > self.max_chain_length:
+            backup_type = 'full'
+            chain = []
+            changed = sorted(index)
+            deleted = []
+        else:
+            backup_type = 'incremental'
+            previous = state.get('files', {})
+            changed = sorted(path for path, info in index.items()
+                             if previous.get(path, {}).get('sha256') != info['sha256'])
+            deleted = sorted(path for path in previous if path not in index)
+
+        entries = [
+            (f'{self.FILES_DIRECTORY}/{path}', os.path.join(self.file_storage_path, *path.split('/')))
+            for path in changed
+        ]
+
+        return {
+            'backup_type': backup_type,
+            'chain': chain,
+            'index': index,
+            'entries': entries,
+            'changed': changed,
+            'deleted': deleted,
+        }
+
+    def manifest_fields(self, plan: Dict) -> Dict:
+        """Extra manifest fields describing an archive's place in its chain"""
+        return {
+            'backup_type': plan['backup_type'],
+            'chain': plan['chain'],
+            'files': {path: info['sha256'] for path, info in plan['index'].items()},
+            'changed_files': len(plan['changed']),
+            'deleted_files': plan['deleted'],
+        }
+
+    def record_backup(self, remote_name: str, plan: Dict, remote_file_path: str):
+        """Save the state once the archive for a plan has been uploaded"""
+        self.save_state(remote_name, {
+            'remote': remote_name,
+            'updated_at': datetime.now().isoformat(),
+            'chain': plan['chain'] + [remote_file_path],
+            'files': plan['index'],
+        })
+
+    @staticmethod
+    def read_manifest(zip_path: str) -> Dict:
+        with zipfile.ZipFile(zip_path, 'r') as zipf:
+            return json.loads(zipf.read('manifest.json'))
+
+    @classmethod
+    def rebuild_from_chain(cls, archive_paths: List[str], extract_dir: str,
+                           limits: Optional[ExtractionLimits] = None) -> Tuple[bool, str]:
+        """
+        Rebuild the state captured by the last archive in archive_paths (oldest first,
+        starting with a full backup) into extract_dir, laid out like an extracted full
+        backup: app.db, manifest.json and JobTrackerFiles/. Every archive is checked
+        against limits before any of them is extracted.
+        """
+        if not archive_paths:
+            return False, "No backup archives to restore"
+
+        files_dir = os.path.join(extract_dir, cls.FILES_DIRECTORY)
+        prefix = f'{cls.FILES_DIRECTORY}/'
+
+        checked = []
+        try:
+            for position, archive_path in enumerate(archive_paths):
+                zipf = zipfile.ZipFile(archive_path, 'r')
+                checked.append((zipf, {}))
+                required = ('app.db', 'manifest.json') if position == len(archive_paths) - 1 else ()
+                checked[-1] = (zipf, check_archive(zipf, limits, required=required))
+
+            # Apply file changes oldest first so later archives overwrite earlier versions
+            for zipf, members in checked:
+                for name, info in members.items():
+                    if name.startswith(prefix):
+                        extract_member(zipf, info, os.path.join(extract_dir, *name.split('/')))
+
+            zipf, members = checked[-1]
+            extract_member(zipf, members['app.db'], os.path.join(extract_dir, 'app.db'))
+            extract_member(zipf, members['manifest.json'], os.path.join(extract_dir, 'manifest.json'))
+            manifest = json.loads(zipf.read(members['manifest.json']))
+        except (InvalidArchiveError, zipfile.BadZipFile) as e:
+            return False, f"Invalid backup archive: {e}"
+        finally:
+            for zipf, members in checked:
+                zipf.close()
+
+        # Drop files deleted somewhere along the chain
+        index = manifest.get('files')
+        if index is not None and os.path.exists(files_dir):
+            for root, dirs, files in os.walk(files_dir):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    relative_path = os.path.relpath(file_path, files_dir).replace(os.sep, '/')
+                    if relative_path not in index:
+                        os.remove(file_path)
+
+            missing = [path for path in index if not os.path.exists(os.path.join(files_dir, *path.split('/')))]
+            if missing:
+                return False, f"Backup chain is incomplete: {len(missing)} files are missing (e.g. {missing[0]})"
+
+        return True, f"Rebuilt backup from {len(archive_paths)} archive(s)"
@@ -0,0 +1,621 @@
+import atexit
+import json
+import os
+import platform
+import posixpath
+import secrets
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import quote
+
+import requests
+
+
+class RcloneError(Exception):
+    """An rclone operation failed; the message is rclone's error output"""
+
+
+class RcloneTimeout(RcloneError):
+    """An rclone operation did not finish within its timeout"""
+
+
+# Read size when relaying a remote file to a client
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def format_bytes(size: Optional[int]) -> str:
+    """Human-readable size in the style of `rclone about` (e.g. '1.500 GiB')"""
+    if size is None:
+        return 'unknown'
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if abs(size) < 1024 or unit == 'TiB':
+            return f"{size} {unit}" if unit == 'B' else f"{size:.3f} {unit}"
+        size /= 1024
+
+
+def parse_stats(stats: Dict) -> Dict:
+    """Transfer progress from an rclone stats block (`--use-json-log` output or rc core/stats)"""
+    transferred = stats.get('bytes') or 0
+    total = stats.get('totalBytes') or 0
+    # A single-file transfer may not report totalBytes until it is listed as in progress
+    if not total:
+        total = sum(item.get('size') or 0 for item in stats.get('transferring') or [])
+    return {
+        'bytes': transferred,
+        'total_bytes': total or None,
+        'percent': round(transferred * 100 / total, 1) if total else None,
+        'speed': round(stats.get('speed') or 0),
+        'eta': stats.get('eta'),
+    }
+
+
+class SubprocessRcloneBackend:
+    """Runs one rclone process per operation"""
+
+    name = 'subprocess'
+
+    def __init__(self, executable: str, config_path: Optional[str] = None):
+        self.executable = executable
+        self.config_path = config_path
+
+    def run(self, cmd_args: List[str], timeout: int = 30) -> subprocess.CompletedProcess:
+        """Run rclone command with Windows compatibility"""
+        # Prepare command
+        cmd = [self.executable] + cmd_args
+
+        # Add config path if specified
+        if self.config_path:
+            cmd.extend(['--config', self.config_path])
+
+        # Use shell=True on Windows for better compatibility
+        use_shell = platform.system() == 'Windows'
+
+        return subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            shell=use_shell
+        )
+
+    def _check(self, cmd_args: List[str], timeout: int = 30) -> subprocess.CompletedProcess:
+        try:
+            result = self.run(cmd_args, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise RcloneTimeout(f"rclone {cmd_args[0]} timed out after {timeout} seconds")
+        if result.returncode != 0:
+            raise RcloneError(result.stderr.strip() or f"rclone {cmd_args[0]} failed")
+        return result
+
+    def is_available(self) -> bool:
+        """Check if rclone is available in the system"""
+        use_shell = platform.system() == 'Windows'
+        try:
+            result = subprocess.run(
+                [self.executable, 'version'],
+                capture_output=True,
+                text=True,
+                timeout=10,
+                shell=use_shell
+            )
+            if result.stderr:
+                print(f"stderr: {result.stderr}")
+            return result.returncode == 0
+        except (subprocess.TimeoutExpired, FileNotFoundError, OSError) as e:
+            print(f"rclone is not available or not found: {e}")
+            print(f"Exception type: {type(e)}")
+
+            # Additional debugging for Windows
+            if use_shell:
+                # Try with .exe extension explicitly
+                try:
+                    result = subprocess.run(
+                        ['rclone.exe', 'version'],
+                        capture_output=True,
+                        text=True,
+                        timeout=10,
+                        shell=True
+                    )
+                    if result.returncode == 0:
+                        print("rclone.exe works with shell=True")
+                        self.executable = 'rclone.exe'
+                        return True
+                except Exception as e2:
+                    print(f"rclone.exe also failed: {e2}")
+
+            return False
+
+    def list_remotes(self) -> List[str]:
+        result = self._check(['listremotes'])
+        return [line.strip().rstrip(':') for line in result.stdout.split('\n')
+                if line.strip() and line.strip().endswith(':')]
+
+    def remote_type(self, remote_name: str) -> Optional[str]:
+        result = self._check(['config', 'show', remote_name], timeout=10)
+        for line in result.stdout.split('\n'):
+            if line.strip().startswith('type ='):
+                return line.split('=')[1].strip()
+        return None
+
+    def list(self, remote_name: str, path: str = '', recursive: bool = False,
+             dirs_only: bool = False, timeout: int = 60) -> List[Dict]:
+        """lsjson-style items ({Path, Name, Size, ModTime, IsDir, ...}) under remote:path"""
+        cmd = ['lsjson', f'{remote_name}:{path}']
+        if recursive:
+            cmd.append('--recursive')
+        if dirs_only:
+            cmd.append('--dirs-only')
+        result = self._check(cmd, timeout=timeout)
+        return json.loads(result.stdout or '[]')
+
+    def stat(self, remote_name: str, path: str, timeout: int = 30) -> Optional[Dict]:
+        """lsjson item for a single file, or None if it does not exist"""
+        try:
+            result = self._check(['lsjson', '--stat', f'{remote_name}:{path}'], timeout=timeout)
+        except RcloneTimeout:
+            raise
+        except RcloneError as e:
+            if 'not found' in str(e).lower():
+                return None
+            raise
+        return json.loads(result.stdout) if result.stdout.strip() else None
+
+    def _check_with_stats(self, cmd_args: List[str], timeout: int, progress: Callable[[Dict], None]):
+        """Like _check, but passes rclone's per-second transfer stats to progress() while it runs"""
+        cmd = [self.executable] + cmd_args + ['--stats', '1s', '--stats-log-level', 'NOTICE', '--use-json-log']
+        if self.config_path:
+            cmd.extend(['--config', self.config_path])
+
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE, text=True,
+                                   shell=platform.system() == 'Windows')
+        errors = []
+
+        def read_log():
+            for line in process.stderr:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    errors.append(line.strip())
+                    continue
+                if 'stats' in entry:
+                    progress(parse_stats(entry['stats']))
+                elif entry.get('level') in ('error', 'critical'):
+                    errors.append(entry.get('msg', '').strip())
+
+        reader = threading.Thread(target=read_log, daemon=True)
+        reader.start()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            raise RcloneTimeout(f"rclone {cmd_args[0]} timed out after {timeout} seconds")
+        finally:
+            reader.join(timeout=5)
+
+        if process.returncode != 0:
+            raise RcloneError('\n'.join(error for error in errors if error) or f"rclone {cmd_args[0]} failed")
+
+    def upload_file(self, local_path: str, remote_name: str, remote_path: str, timeout: int = 300,
+                    progress: Optional[Callable[[Dict], None]] = None):
+        cmd_args = ['copyto', local_path, f'{remote_name}:{remote_path}']
+        if progress:
+            self._check_with_stats(cmd_args, timeout, progress)
+        else:
+            self._check(cmd_args, timeout=timeout)
+
+    def upload_stream(self, chunks: Iterable[bytes], remote_name: str, remote_path: str, timeout: int = 300):
+        """Pipe chunks into `rclone rcat`, so the data is uploaded as it is produced and never written locally"""
+        cmd = [self.executable, 'rcat', f'{remote_name}:{remote_path}']
+        if self.config_path:
+            cmd.extend(['--config', self.config_path])
+
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE, shell=platform.system() == 'Windows')
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+        reader.start()
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            process.kill()
+
+        watchdog = threading.Timer(timeout, kill_on_timeout)
+        watchdog.start()
+        try:
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass  # rclone exited early; its error output says why
+            except BaseException:
+                # rcat commits whatever it received once stdin closes, so kill it
+                # rather than leave a truncated archive on the remote
+                process.kill()
+                process.wait()
+                raise
+            process.wait()
+        finally:
+            watchdog.cancel()
+            reader.join(timeout=5)
+            close = getattr(chunks, 'close', None)
+            if close:
+                close()
+
+        if timed_out.is_set():
+            raise RcloneTimeout(f"rclone rcat timed out after {timeout} seconds")
+        if process.returncode != 0:
+            error = b''.join(stderr).decode('utf-8', errors='replace').strip()
+            raise RcloneError(error or "rclone rcat failed")
+
+    def cat(self, remote_name: str, remote_path: str, timeout: int = 300) -> Iterator[bytes]:
+        """
+        Yield the contents of a remote file from `rclone cat`'s stdout. Raises RcloneError
+        once the output ends if rclone failed. Closing the generator early kills rclone.
+        """
+        cmd = [self.executable, 'cat', f'{remote_name}:{remote_path}']
+        if self.config_path:
+            cmd.extend(['--config', self.config_path])
+
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, shell=platform.system() == 'Windows')
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+        reader.start()
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            process.kill()
+
+        watchdog = threading.Timer(timeout, kill_on_timeout)
+        watchdog.start()
+        try:
+            for chunk in iter(lambda: process.stdout.read(STREAM_CHUNK_SIZE), b''):
+                yield chunk
+            process.wait()
+        finally:
+            watchdog.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            reader.join(timeout=5)
+
+        if timed_out.is_set():
+            raise RcloneTimeout(f"rclone cat timed out after {timeout} seconds")
+        if process.returncode != 0:
+            error = b''.join(stderr).decode('utf-8', errors='replace').strip()
+            raise RcloneError(error or "rclone cat failed")
+
+    def download_file(self, remote_name: str, remote_path: str, local_path: str, timeout: int = 300):
+        self._check(['copyto', f'{remote_name}:{remote_path}', local_path], timeout=timeout)
+
+    def delete_file(self, remote_name: str, remote_path: str, timeout: int = 60):
+        self._check(['delete', f'{remote_name}:{remote_path}'], timeout=timeout)
+
+    def about(self, remote_name: str, timeout: int = 30) -> Dict[str, str]:
+        result = self._check(['about', f'{remote_name}:'], timeout=timeout)
+        usage_info = {}
+        for line in result.stdout.split('\n'):
+            if ':' in line:
+                key, value = line.split(':', 1)
+                usage_info[key.strip()] = value.strip()
+        return usage_info
+
+
+class RcloneDaemon:
+    """
+    One `rclone rcd` process per app process, reached over its HTTP rc API on
+    127.0.0.1 with a random port and credentials. It is started on first use,
+    restarted if it exits, and restarted when the rclone config file changes
+    so new or removed remotes are picked up. A config restart waits until no
+    call is in flight (see using()), so it never kills another thread's transfer.
+    """
+
+    STARTUP_TIMEOUT = 10
+    # After a failed start, callers fall back to subprocesses for this long before retrying
+    RETRY_AFTER = 60
+
+    def __init__(self, executable: str, config_path: Optional[str], watch_path: Optional[str]):
+        self.executable = executable
+        self.config_path = config_path
+        self.watch_path = watch_path
+        self.process = None
+        self.url = None
+        self.auth = None
+        self.config_mtime = None
+        self.failed_at = None
+        self.active_calls = 0
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+
+    def _config_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.watch_path) if self.watch_path else None
+        except OSError:
+            return None
+
+    def _free_port(self) -> int:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def _start(self):
+        port = self._free_port()
+        user, password = 'jobtracker', secrets.token_urlsafe(24)
+        cmd = [self.executable, 'rcd',
+               '--rc-addr', f'127.0.0.1:{port}',
+               # Serve remote objects at /[remote:]/path, used to stream downloads
+               '--rc-serve']
+        if self.config_path:
+            cmd.extend(['--config', self.config_path])
+        # Credentials go in the environment rather than on the command line, where
+        # any local user could read them with ps
+        env = dict(os.environ, RCLONE_RC_USER=user, RCLONE_RC_PASS=password)
+
+        self.config_mtime = self._config_mtime()
+        self.process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.url = f'http://127.0.0.1:{port}/'
+        self.auth = (user, password)
+
+        deadline = time.monotonic() + self.STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RcloneError(f"rclone rcd exited with code {self.process.returncode}")
+            try:
+                self.session.post(self.url + 'rc/noop', json={}, auth=self.auth, timeout=1).raise_for_status()
+                print(f"Started rclone rcd on 127.0.0.1:{port} (pid {self.process.pid})")
+                return
+            except requests.RequestException:
+                time.sleep(0.1)
+
+        self.stop()
+        raise RcloneError("rclone rcd did not start in time")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def ensure_running(self):
+        with self.lock:
+            self._ensure_running()
+
+    def _ensure_running(self):
+        if self.process and self.process.poll() is None:
+            if self._config_mtime() == self.config_mtime:
+                return
+            if self.active_calls:
+                # Picked up by the first call made once the others have finished
+                return
+            print("rclone config changed, restarting rclone rcd")
+            self.stop()
+
+        if self.failed_at and time.monotonic() - self.failed_at < self.RETRY_AFTER:
+            raise RcloneError("rclone rcd failed to start recently")
+        try:
+            self._start()
+            self.failed_at = None
+        except (RcloneError, OSError):
+            self.failed_at = time.monotonic()
+            raise
+
+    @contextmanager
+    def using(self):
+        """Make sure the daemon is running and keep it from being restarted until the block exits"""
+        with self.lock:
+            self._ensure_running()
+            self.active_calls += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active_calls -= 1
+
+    def call(self, command: str, params: Optional[Dict] = None, timeout: int = 30) -> Dict:
+        """POST a command to the rc API and return its JSON result"""
+        return self._post(command, timeout, json=params or {})
+
+    def call_with_body(self, command: str, params: Dict, body, content_type: str, timeout: int = 30) -> Dict:
+        """POST a command with its parameters in the query string and a raw (possibly streamed) body"""
+        return self._post(command, timeout, params=params, data=body, headers={'Content-Type': content_type})
+
+    def open_object(self, remote_name: str, remote_path: str, timeout: int = 30) -> requests.Response:
+        """GET a remote file through --rc-serve as a streamed response. Call within using()."""
+        self.ensure_running()
+        url = f"{self.url}[{remote_name}:]/{quote(remote_path.lstrip('/'))}"
+        try:
+            response = self.session.get(url, auth=self.auth, timeout=timeout, stream=True)
+        except requests.Timeout:
+            raise RcloneTimeout(f"rclone timed out opening {remote_name}:{remote_path}")
+        except requests.RequestException as e:
+            raise RcloneError(f"rclone rc request failed: {e}")
+        if response.status_code != 200:
+            response.close()
+            if response.status_code == 404:
+                raise RcloneError(f"object not found: {remote_name}:{remote_path}")
+            raise RcloneError(f"rclone failed to read {remote_name}:{remote_path} (HTTP {response.status_code})")
+        return response
+
+    def _post(self, command: str, timeout: int, **request_args) -> Dict:
+        with self.using():
+            try:
+                response = self.session.post(self.url + command, auth=self.auth, timeout=timeout, **request_args)
+            except requests.Timeout:
+                raise RcloneTimeout(f"rclone {command} timed out after {timeout} seconds")
+            except requests.RequestException as e:
+                raise RcloneError(f"rclone rc request failed: {e}")
+
+        try:
+            result = response.json()
+        except ValueError:
+            result = {}
+        if response.status_code != 200:
+            raise RcloneError(result.get('error') or f"rclone {command} failed with HTTP {response.status_code}")
+        return result
+
+
+# Process-wide daemons keyed by (executable, config path), shared by every request
+_daemons = {}
+_daemons_lock = threading.Lock()
+
+
+def get_daemon(executable: str, config_path: Optional[str], watch_path: Optional[str]) -> RcloneDaemon:
+    key = (executable, config_path)
+    with _daemons_lock:
+        if key not in _daemons:
+            _daemons[key] = RcloneDaemon(executable, config_path, watch_path)
+        return _daemons[key]
+
+
+@atexit.register
+def _stop_daemons():
+    for daemon in list(_daemons.values()):
+        daemon.stop()
+
+
+class RcRcloneBackend:
+    """Sends operations to a long-running `rclone rcd` instead of forking rclone per call"""
+
+    name = 'rcd'
+
+    def __init__(self, daemon: RcloneDaemon):
+        self.daemon = daemon
+
+    @staticmethod
+    def _fs(remote_name: str) -> str:
+        return f'{remote_name}:'
+
+    def is_available(self) -> bool:
+        try:
+            self.daemon.call('core/version', timeout=10)
+            return True
+        except (RcloneError, OSError) as e:
+            print(f"rclone rcd is not available: {e}")
+            return False
+
+    def list_remotes(self) -> List[str]:
+        return self.daemon.call('config/listremotes').get('remotes') or []
+
+    def remote_type(self, remote_name: str) -> Optional[str]:
+        return self.daemon.call('config/get', {'name': remote_name}, timeout=10).get('type')
+
+    def list(self, remote_name: str, path: str = '', recursive: bool = False,
+             dirs_only: bool = False, timeout: int = 60) -> List[Dict]:
+        result = self.daemon.call('operations/list', {
+            'fs': self._fs(remote_name),
+            'remote': path,
+            'opt': {'recurse': recursive, 'dirsOnly': dirs_only},
+        }, timeout=timeout)
+        return result.get('list') or []
+
+    def stat(self, remote_name: str, path: str, timeout: int = 30) -> Optional[Dict]:
+        result = self.daemon.call('operations/stat', {
+            'fs': self._fs(remote_name),
+            'remote': path,
+        }, timeout=timeout)
+        return result.get('item')
+
+    def _call_with_stats(self, command: str, params: Dict, timeout: int,
+                         progress: Callable[[Dict], None]) -> Dict:
+        """Run a command as an rc job, passing its transfer stats to progress() every second"""
+        # The job runs in the daemon between calls, so hold it for the whole transfer
+        with self.daemon.using():
+            job_id = self.daemon.call(command, dict(params, _async=True))['jobid']
+            deadline = time.monotonic() + timeout
+            while True:
+                status = self.daemon.call('job/status', {'jobid': job_id}, timeout=10)
+                progress(parse_stats(self.daemon.call('core/stats', {'group': f'job/{job_id}'}, timeout=10)))
+                if status.get('finished'):
+                    if not status.get('success'):
+                        raise RcloneError(status.get('error') or f"rclone {command} failed")
+                    return status.get('output') or {}
+                if time.monotonic() > deadline:
+                    try:
+                        self.daemon.call('job/stop', {'jobid': job_id}, timeout=10)
+                    except RcloneError:
+                        pass
+                    raise RcloneTimeout(f"rclone {command} timed out after {timeout} seconds")
+                time.sleep(1)
+
+    def upload_file(self, local_path: str, remote_name: str, remote_path: str, timeout: int = 300,
+                    progress: Optional[Callable[[Dict], None]] = None):
+        params = {
+            'srcFs': os.path.dirname(os.path.abspath(local_path)),
+            'srcRemote': os.path.basename(local_path),
+            'dstFs': self._fs(remote_name),
+            'dstRemote': remote_path,
+        }
+        if progress:
+            self._call_with_stats('operations/copyfile', params, timeout, progress)
+        else:
+            self.daemon.call('operations/copyfile', params, timeout=timeout)
+
+    def upload_stream(self, chunks: Iterable[bytes], remote_name: str, remote_path: str, timeout: int = 300):
+        """
+        Stream chunks to operations/uploadfile as a multipart body. rclone writes the
+        part to the remote as it arrives, so the data is never written locally.
+        """
+        directory, filename = posixpath.split(remote_path)
+        boundary = secrets.token_hex(16)
+
+        def multipart_body():
+            yield (f'--{boundary}\r\n'
+                   f'Content-Disposition: form-data; name="file0"; filename="{filename}"\r\n'
+                   'Content-Type: application/octet-stream\r\n\r\n').encode()
+            yield from chunks
+            yield f'\r\n--{boundary}--\r\n'.encode()
+
+        # If producing chunks fails, requests drops the connection before the closing
+        # boundary and rclone discards the upload instead of storing a truncated file
+        self.daemon.call_with_body('operations/uploadfile', {'fs': self._fs(remote_name), 'remote': directory},
+                                   multipart_body(), f'multipart/form-data; boundary={boundary}', timeout=timeout)
+
+    def cat(self, remote_name: str, remote_path: str, timeout: int = 300) -> Iterator[bytes]:
+        """Yield the contents of a remote file as the daemon reads it, like `rclone cat`"""
+        # timeout bounds each wait for data rather than the whole transfer
+        with self.daemon.using():
+            response = self.daemon.open_object(remote_name, remote_path, timeout=timeout)
+            try:
+                yield from response.iter_content(STREAM_CHUNK_SIZE)
+            except requests.RequestException as e:
+                raise RcloneError(f"Reading {remote_name}:{remote_path} failed: {e}")
+            finally:
+                response.close()
+
+    def download_file(self, remote_name: str, remote_path: str, local_path: str, timeout: int = 300):
+        self.daemon.call('operations/copyfile', {
+            'srcFs': self._fs(remote_name),
+            'srcRemote': remote_path,
+            'dstFs': os.path.dirname(os.path.abspath(local_path)),
+            'dstRemote': os.path.basename(local_path),
+        }, timeout=timeout)
+
+    def delete_file(self, remote_name: str, remote_path: str, timeout: int = 60):
+        self.daemon.call('operations/deletefile', {
+            'fs': self._fs(remote_name),
+            'remote': remote_path,
+        }, timeout=timeout)
+
+    def about(self, remote_name: str, timeout: int = 30) -> Dict[str, str]:
+        result = self.daemon.call('operations/about', {'fs': self._fs(remote_name)}, timeout=timeout)
+        # Same keys and units as `rclone about` output
+        usage_info = {}
+        for key in ('total', 'used', 'free', 'trashed', 'other'):
+            if key in result:
+                usage_info[key.title()] = format_bytes(result[key])
+        if 'objects' in result:
+            usage_info['Objects'] = str(result['objects'])
+        return usage_info
@@ -0,0 +1,94 @@
+import html
+import re
+import time
+from typing import Dict, Optional
+from sqlalchemy import text
+from app import db
+
+
+class SearchService:
+    """Full-text search over jobs, notes and activity briefs using the jobs_fts FTS5 index"""
+
+    # Marker characters wrapped around matches by highlight()/snippet(). The text is
+    # HTML-escaped before they are swapped for <mark> tags, so stored content can't inject markup.
+    MATCH_START = '\x02'
+    MATCH_END = '\x03'
+
+    # bm25 column weights: company, title, location, description, notes, activities
+    COLUMN_WEIGHTS = (10.0, 8.0, 4.0, 1.0, 1.0, 1.0)
+    SNIPPET_COLUMNS = ('description', 'notes', 'activities')
+
+    def build_match_query(self, query_text: str) -> Optional[str]:
+        """Turn free text into an FTS5 MATCH expression: every word must match as a prefix"""
+        terms = re.findall(r'\w+', query_text or '', flags=re.UNICODE)
+        if not terms:
+            return None
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, query_text: str, limit: int = 20, include_drafts: bool = False) -> Dict:
+        """Return ranked results with highlighted fields and the query time in milliseconds"""
+        started = time.perf_counter()
+        match_query = self.build_match_query(query_text)
+        if not match_query:
+            return {'results': [], 'took_ms': 0.0}
+
+        weights = ', '.join(str(weight) for weight in self.COLUMN_WEIGHTS)
+        sql = text(f"""
+            SELECT jobs.id, jobs.company, jobs.title, jobs.location, jobs.posting_status,
+                   jobs.created_dt, jobs.last_activity_at,
+                   bm25(jobs_fts, {weights}) AS score,
+                   highlight(jobs_fts, 0, :start, :end) AS company_hl,
+                   highlight(jobs_fts, 1, :start, :end) AS title_hl,
+                   highlight(jobs_fts, 2, :start, :end) AS location_hl,
+                   snippet(jobs_fts, 3, :start, :end, '…', 16) AS description_hl,
+                   snippet(jobs_fts, 4, :start, :end, '…', 16) AS notes_hl,
+                   snippet(jobs_fts, 5, :start, :end, '…', 16) AS activities_hl
+            FROM jobs_fts
+            JOIN jobs ON jobs.id = jobs_fts.rowid
+            WHERE jobs_fts MATCH :match_query
+              AND (:include_drafts OR jobs.is_draft = 0)
+            ORDER BY score
+            LIMIT :limit
+        """).columns(created_dt=db.DateTime, last_activity_at=db.DateTime)
+
+        rows = db.session.execute(sql, {
+            'start': self.MATCH_START,
+            'end': self.MATCH_END,
+            'match_query': match_query,
+            'include_drafts': include_drafts,
+            'limit': limit,
+        }).mappings().all()
+
+        results = []
+        for row in rows:
+            snippets = {
+                column: self._to_html(row[f'{column}_hl'])
+                for column in self.SNIPPET_COLUMNS
+                if row[f'{column}_hl'] and self.MATCH_START in row[f'{column}_hl']
+            }
+            results.append({
+                'job_id': row['id'],
+                'company': row['company'],
+                'title': row['title'],
+                'location': row['location'],
+                'posting_status': row['posting_status'],
+                'created_dt': row['created_dt'],
+                'last_activity_at': row['last_activity_at'],
+                'score': round(row['score'], 4),
+                'highlights': {
+                    'company': self._to_html(row['company_hl']),
+                    'title': self._to_html(row['title_hl']),
+                    'location': self._to_html(row['location_hl']),
+                },
+                'snippets': snippets,
+            })
+
+        took_ms = round((time.perf_counter() - started) * 1000, 2)
+        return {'results': results, 'took_ms': took_ms}
+
+    def _to_html(self, value: Optional[str]) -> str:
+        """Escape highlighted text and replace the match markers with <mark> tags"""
+        if not value:
+            return ''
+        escaped = html.escape(value)
+        return escaped.replace(self.MATCH_START, '<mark>').replace(self.MATCH_END, '</mark>')
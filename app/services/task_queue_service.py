@@ -0,0 +1,318 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert
+from typing import Callable, Dict, List, Optional
+from app import db
+from app.models import BackgroundTask
+
+
+class TaskError(Exception):
+    """A background task failed; the message is shown to the user as the task's error"""
+
+
+# kind -> handler(params, report) returning a JSON-serialisable result dict.
+# report(**fields) merges fields (stage, message, bytes, percent, ...) into the task's progress.
+TASK_HANDLERS: Dict[str, Callable] = {}
+
+
+def task_handler(kind: str):
+    """Register a function as the handler for a kind of background task"""
+    def decorator(func):
+        TASK_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+class TaskQueueService:
+    """
+    Persistent queue of background tasks in the background_tasks table.
+
+    Requests enqueue a task and return its id straight away; a TaskWorker thread
+    claims queued tasks one at a time and runs their handler. Claims are a single
+    conditional UPDATE, so several gunicorn workers can share the queue.
+    """
+
+    # Running tasks without a heartbeat for this long belong to a worker that died
+    STALE_AFTER = 120
+
+    def enqueue(self, kind: str, params: Optional[Dict] = None) -> BackgroundTask:
+        if kind not in TASK_HANDLERS:
+            raise ValueError(f"Unknown task kind: {kind}")
+        task = BackgroundTask(id=uuid.uuid4().hex, kind=kind, status='queued',
+                              params=params or {}, progress={'stage': 'queued'})
+        db.session.add(task)
+        db.session.commit()
+        notify_task_worker()
+        return task
+
+    def enqueue_once(self, kind: str, key: str, params: Optional[Dict] = None) -> Optional[str]:
+        """
+        Enqueue a task unless one with the same kind and key was already enqueued, by
+        any process. The task id is derived from the key and inserted with ON CONFLICT
+        DO NOTHING, so of several workers racing to enqueue the same key exactly one
+        wins. Returns the new task's id, or None if the key was taken.
+        """
+        if kind not in TASK_HANDLERS:
+            raise ValueError(f"Unknown task kind: {kind}")
+        task_id = hashlib.md5(f'{kind}:{key}'.encode('utf-8')).hexdigest()
+        result = db.session.execute(
+            insert(BackgroundTask)
+            .values(id=task_id, kind=kind, status='queued', params=params or {},
+                    progress={'stage': 'queued'}, created_at=datetime.now())
+            .on_conflict_do_nothing(index_elements=[BackgroundTask.id])
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            return None
+        notify_task_worker()
+        return task_id
+
+    def active(self, kind: str) -> List[BackgroundTask]:
+        """Queued or running tasks of a kind"""
+        return (BackgroundTask.query
+                .filter(BackgroundTask.kind == kind, BackgroundTask.status.in_(['queued', 'running']))
+                .all())
+
+    def get(self, task_id: str) -> Optional[BackgroundTask]:
+        return db.session.get(BackgroundTask, task_id)
+
+    def recent(self, kind: Optional[str] = None, limit: int = 20) -> List[BackgroundTask]:
+        query = BackgroundTask.query
+        if kind:
+            query = query.filter(BackgroundTask.kind == kind)
+        return query.order_by(BackgroundTask.created_at.desc()).limit(limit).all()
+
+    def claim_next(self, worker_id: str) -> Optional[BackgroundTask]:
+        """Mark the oldest queued task as running for this worker and return it"""
+        candidate = db.session.execute(
+            db.select(BackgroundTask.id)
+            .where(BackgroundTask.status == 'queued')
+            .order_by(BackgroundTask.created_at)
+            .limit(1)
+        ).scalar()
+        if candidate is None:
+            return None
+
+        now = datetime.now()
+        # Re-check the status in the UPDATE in case another worker claimed it meanwhile
+        result = db.session.execute(
+            db.update(BackgroundTask)
+            .where(BackgroundTask.id == candidate, BackgroundTask.status == 'queued')
+            .values(status='running', worker=worker_id, started_at=now, heartbeat_at=now)
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            return None
+        task = db.session.get(BackgroundTask, candidate)
+        db.session.refresh(task)
+        return task
+
+    def finish(self, task_id: str, result: Optional[Dict] = None):
+        self._set_final(task_id, status='succeeded', result=result or {})
+
+    def fail(self, task_id: str, error: str):
+        self._set_final(task_id, status='failed', error=error)
+
+    def _set_final(self, task_id: str, **values):
+        task = db.session.get(BackgroundTask, task_id)
+        progress = dict(task.progress or {})
+        progress['stage'] = values['status']
+        db.session.execute(
+            db.update(BackgroundTask)
+            .where(BackgroundTask.id == task_id)
+            .values(finished_at=datetime.now(), progress=progress, **values)
+        )
+        db.session.commit()
+
+    def fail_stale(self) -> int:
+        """Fail running tasks whose worker stopped sending heartbeats. Returns how many."""
+        cutoff = datetime.now() - timedelta(seconds=self.STALE_AFTER)
+        result = db.session.execute(
+            db.update(BackgroundTask)
+            .where(BackgroundTask.status == 'running',
+                   or_(BackgroundTask.heartbeat_at.is_(None), BackgroundTask.heartbeat_at < cutoff))
+            .values(status='failed', finished_at=datetime.now(),
+                    error='Interrupted: the worker running this task stopped')
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def snapshot(self, task_id: str) -> Dict:
+        """A task's column values, so it can be put back after the database is replaced"""
+        task = db.session.get(BackgroundTask, task_id)
+        return {column.name: getattr(task, column.name) for column in BackgroundTask.__table__.columns}
+
+    def reset_after_restore(self, keep: Optional[Dict] = None):
+        """
+        Bring the queue in line with a database that was just replaced by a backup. The
+        restored copy may predate the table, and tasks that were pending when the backup
+        was taken must not run again. keep is a snapshot() of the task that did the
+        restore, put back so its progress and result are still reported.
+        """
+        BackgroundTask.__table__.create(db.engine, checkfirst=True)
+        db.session.execute(
+            db.update(BackgroundTask)
+            .where(BackgroundTask.status.in_(['queued', 'running']))
+            .values(status='failed', finished_at=datetime.now(),
+                    error='Cancelled: the database was restored from a backup')
+        )
+        if keep:
+            statement = insert(BackgroundTask).values(**keep)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[BackgroundTask.id],
+                set_={key: statement.excluded[key] for key in keep if key != 'id'}
+            ))
+        db.session.commit()
+
+
+class ProgressReporter:
+    """
+    The report() callable handed to task handlers. Progress is written on its own
+    connection, so it never commits the handler's session, and at most every
+    MIN_INTERVAL seconds unless the stage changes.
+    """
+
+    MIN_INTERVAL = 1.0
+
+    def __init__(self, engine, task_id: str):
+        self.engine = engine
+        self.task_id = task_id
+        self.progress = {}
+        self.written_at = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self, **fields):
+        with self.lock:
+            stage_changed = 'stage' in fields and fields['stage'] != self.progress.get('stage')
+            self.progress.update(fields)
+            if stage_changed or time.monotonic() - self.written_at >= self.MIN_INTERVAL:
+                self._write(progress=dict(self.progress))
+
+    def heartbeat(self):
+        with self.lock:
+            self._write()
+
+    def _write(self, **values):
+        with self.engine.begin() as connection:
+            connection.execute(
+                db.update(BackgroundTask)
+                .where(BackgroundTask.id == self.task_id)
+                .values(heartbeat_at=datetime.now(), **values)
+            )
+        self.written_at = time.monotonic()
+
+
+class TaskWorker:
+    """
+    Thread that runs queued background tasks, one at a time, outside the request
+    cycle. Each app process starts one; enqueueing in the same process wakes it,
+    otherwise it polls every POLL_INTERVAL seconds.
+    """
+
+    POLL_INTERVAL = 2
+    HEARTBEAT_INTERVAL = 15
+    STALE_CHECK_INTERVAL = 60
+
+    def __init__(self, app):
+        self.app = app
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='task-worker', daemon=True)
+        self.stale_checked_at = 0.0
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def wake(self):
+        self.wake_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    self.run_pending()
+            except Exception as e:
+                print(f"Task worker error: {e}")
+            self.wake_event.wait(self.POLL_INTERVAL)
+            self.wake_event.clear()
+
+    def run_pending(self):
+        queue = TaskQueueService()
+        if time.monotonic() - self.stale_checked_at > self.STALE_CHECK_INTERVAL:
+            stale = queue.fail_stale()
+            if stale:
+                print(f"Marked {stale} interrupted background task(s) as failed")
+            self.stale_checked_at = time.monotonic()
+
+        while not self.stop_event.is_set():
+            task = queue.claim_next(self.worker_id)
+            if task is None:
+                return
+            self.execute(queue, task)
+            db.session.remove()
+
+    def execute(self, queue: TaskQueueService, task: BackgroundTask):
+        print(f"Running background task {task.id} ({task.kind})")
+        reporter = ProgressReporter(db.engine, task.id)
+        done = threading.Event()
+
+        def send_heartbeats():
+            while not done.wait(self.HEARTBEAT_INTERVAL):
+                try:
+                    reporter.heartbeat()
+                except Exception as e:
+                    print(f"Task heartbeat failed: {e}")
+
+        heartbeat_thread = threading.Thread(target=send_heartbeats, name=f'task-heartbeat-{task.id[:8]}', daemon=True)
+        heartbeat_thread.start()
+        try:
+            reporter(stage='running')
+            result = TASK_HANDLERS[task.kind](dict(task.params or {}), reporter)
+            done.set()
+            db.session.rollback()
+            queue.finish(task.id, result)
+            print(f"Background task {task.id} succeeded")
+        except Exception as e:
+            done.set()
+            if not isinstance(e, TaskError):
+                traceback.print_exc()
+            current_app.logger.error(f"Background task {task.id} ({task.kind}) failed: {str(e)}")
+            db.session.rollback()
+            queue.fail(task.id, str(e) or e.__class__.__name__)
+        finally:
+            heartbeat_thread.join(timeout=1)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_task_worker(app) -> Optional[TaskWorker]:
+    """Start this process's task worker once. TASK_WORKER_ENABLED=false leaves tasks to another process."""
+    global _worker
+    if not app.config.get('TASK_WORKER_ENABLED', True):
+        return None
+    with _worker_lock:
+        if _worker is None:
+            _worker = TaskWorker(app)
+            _worker.start()
+        return _worker
+
+
+def notify_task_worker():
+    """Wake this process's worker so a task enqueued here starts without waiting for the next poll"""
+    if _worker is not None:
+        _worker.wake()
@@ -0,0 +1,48 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with per-entry expiry.
+    Each gunicorn worker has its own copy, so entries must be safe to serve
+    slightly stale for up to `ttl` seconds.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+        return value
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Return the cached value for key, computing it with factory() on a miss"""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = self.set(key, factory(), ttl)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
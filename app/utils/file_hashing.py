@@ -0,0 +1,92 @@
+import hashlib
+import os
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.zip_stream import CHUNK_SIZE
+
+# hashlib, zlib and file reads all release the GIL on large buffers, so hashing in
+# threads keeps several cores busy without the cost of processes
+MAX_DEFAULT_WORKERS = 8
+
+
+def hash_workers(configured: Optional[int] = None) -> int:
+    """Threads to hash with: the configured number, or one per CPU up to MAX_DEFAULT_WORKERS"""
+    if configured:
+        return max(1, configured)
+    return min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1)
+
+
+def sha256_file(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def hash_files(paths: Iterable[str], workers: Optional[int] = None) -> Dict[str, str]:
+    """SHA-256 of each file, hashed across a thread pool. Returns {path: hex digest}."""
+    paths = list(paths)
+    workers = min(hash_workers(workers), len(paths))
+    if workers <= 1:
+        return {path: sha256_file(path) for path in paths}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash') as executor:
+        return dict(zip(paths, executor.map(sha256_file, paths)))
+
+
+def _balanced_batches(infos: List[zipfile.ZipInfo], count: int) -> List[List[zipfile.ZipInfo]]:
+    """Split members into count batches of similar uncompressed size, largest first"""
+    batches = [[] for _ in range(count)]
+    sizes = [0] * count
+    for info in sorted(infos, key=lambda info: info.file_size, reverse=True):
+        smallest = sizes.index(min(sizes))
+        batches[smallest].append(info)
+        sizes[smallest] += info.file_size
+    return [batch for batch in batches if batch]
+
+
+def _hash_member_batch(zip_path: str, batch: List[zipfile.ZipInfo], copy_to: Dict[str, str]) -> Dict[str, Tuple]:
+    results = {}
+    # A ZipFile reads through one shared file handle, so each thread opens its own
+    with zipfile.ZipFile(zip_path, 'r') as zipf:
+        for info in batch:
+            hasher = hashlib.sha256()
+            size = 0
+            dest = open(copy_to[info.filename], 'wb') if info.filename in copy_to else None
+            try:
+                with zipf.open(info) as src:
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        if dest:
+                            dest.write(chunk)
+                results[info.filename] = (hasher.hexdigest(), size, None)
+            except (zipfile.BadZipFile, EOFError, zlib.error, NotImplementedError) as e:
+                results[info.filename] = (None, size, str(e) or e.__class__.__name__)
+            finally:
+                if dest:
+                    dest.close()
+    return results
+
+
+def hash_zip_members(zip_path: str, infos: Iterable[zipfile.ZipInfo], workers: Optional[int] = None,
+                     copy_to: Optional[Dict[str, str]] = None) -> Dict[str, Tuple[Optional[str], int, Optional[str]]]:
+    """
+    Decompress and hash archive members across a thread pool, without extracting
+    them. Reading a member to the end also checks its CRC. Members named in copy_to
+    are written to the given path as they are hashed, so they are only read once.
+    Returns {name: (sha256 or None, bytes read, error or None)}.
+    """
+    infos = list(infos)
+    copy_to = copy_to or {}
+    if not infos:
+        return {}
+    batches = _balanced_batches(infos, min(hash_workers(workers), len(infos)))
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(batches), thread_name_prefix='zip-hash') as executor:
+        for batch_results in executor.map(lambda batch: _hash_member_batch(zip_path, batch, copy_to), batches):
+            results.update(batch_results)
+    return results
@@ -1,5 +1,6 @@
 # Create app/utils/html_utils.py
 import bleach
+import html
 
 # Define allowed HTML tags for job descriptions
 ALLOWED_TAGS = [
@@ -33,4 +34,13 @@ def strip_html_tags(html_content):
     if not html_content:
         return html_content
     
-    return bleach.clean(html_content, tags=[], strip=True)
\ No newline at end of file
+    return bleach.clean(html_content, tags=[], strip=True)
+
+def html_to_text(html_content):
+    """
+    Convert HTML to unescaped plain text (used for the full-text search index)
+    """
+    if not html_content:
+        return html_content
+    
+    return html.unescape(strip_html_tags(html_content))
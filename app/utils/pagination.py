@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode a (sort value, id) pair as an opaque URL-safe cursor"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor; returns None if it is malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(sort_value, str):
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+class KeysetPagination:
+    """
+    Cursor based pagination over (sort_column, id), newest first.
+
+    Pages are fetched with a row-value comparison against the last/first row of
+    the current page, so every page costs the same index range scan no matter
+    how deep it is, and no OFFSET or COUNT(*) is needed. The total is supplied
+    by the caller (typically from a cache).
+
+    That only holds if an index leads with the query's equality filters and then
+    (sort_column, id_column), in that order. Otherwise SQLite sorts every matching
+    row to produce each page.
+    """
+
+    is_keyset = True
+
+    def __init__(self, query, sort_column, id_column, per_page=10, after=None, before=None, total=None):
+        self.per_page = per_page
+        self.total = total
+        self.sort_column = sort_column
+        self.id_column = id_column
+
+        after_key = decode_cursor(after)
+        before_key = decode_cursor(before) if not after_key else None
+        key = tuple_(sort_column, id_column)
+
+        if before_key:
+            # Walk backwards from the first row of the current page, then restore display order
+            rows = (query.filter(key > tuple_(*before_key))
+                    .order_by(sort_column.asc(), id_column.asc())
+                    .limit(per_page + 1)
+                    .all())
+            self.has_prev = len(rows) > per_page
+            self.has_next = True
+            self.items = list(reversed(rows[:per_page]))
+        else:
+            if after_key:
+                query = query.filter(key < tuple_(*after_key))
+            rows = (query.order_by(sort_column.desc(), id_column.desc())
+                    .limit(per_page + 1)
+                    .all())
+            self.has_next = len(rows) > per_page
+            self.has_prev = after_key is not None
+            self.items = rows[:per_page]
+
+    def _cursor_for(self, item):
+        return encode_cursor(getattr(item, self.sort_column.key), getattr(item, self.id_column.key))
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.items:
+            return None
+        return self._cursor_for(self.items[-1])
+
+    @property
+    def prev_cursor(self):
+        if not self.has_prev or not self.items:
+            return None
+        return self._cursor_for(self.items[0])
@@ -0,0 +1,109 @@
+import os
+import sqlite3
+from sqlalchemy import event
+
+
+def configure_sqlite_engine(engine, config):
+    """
+    Apply connection PRAGMAs to every new SQLite connection made by the engine.
+    WAL lets readers run alongside a writer, and the busy timeout makes writers
+    from other gunicorn workers wait for the lock instead of failing with
+    "database is locked".
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    # The values come from config.py, so there is one set of defaults to keep in step
+    pragmas = [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}",
+        f"PRAGMA temp_store={config['SQLITE_TEMP_STORE']}",
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+class SnapshotError(Exception):
+    """A database snapshot could not be taken or failed its integrity check"""
+
+
+def snapshot_database(source_path, dest_path, method='vacuum', pages_per_step=256,
+                      step_pause=0.005, busy_timeout_ms=15000, verify=True):
+    """
+    Copy a live SQLite database to dest_path without closing the app's connections.
+
+    'vacuum' runs VACUUM INTO, which reads one consistent snapshot; in WAL mode other
+    workers keep writing while it runs, and the copy comes out compacted. 'backup'
+    uses the online backup API, copying pages_per_step pages at a time and sleeping
+    step_pause seconds between steps so writers can take the lock. Either way the
+    copy is checked with PRAGMA integrity_check before it is returned.
+    """
+    if method not in ('vacuum', 'backup'):
+        raise ValueError(f"Unknown snapshot method '{method}'. Allowed methods are: vacuum, backup")
+
+    # VACUUM INTO needs a missing or empty target
+    if os.path.exists(dest_path) and os.path.getsize(dest_path) > 0:
+        os.remove(dest_path)
+
+    source = sqlite3.connect(source_path, timeout=busy_timeout_ms / 1000)
+    try:
+        if method == 'vacuum':
+            source.execute('VACUUM INTO ?', (dest_path,))
+        else:
+            dest = sqlite3.connect(dest_path)
+            try:
+                source.backup(dest, pages=pages_per_step, sleep=step_pause)
+            finally:
+                dest.close()
+    except sqlite3.Error as e:
+        raise SnapshotError(f"Could not snapshot {source_path}: {e}")
+    finally:
+        source.close()
+
+    if verify:
+        verify_database(dest_path)
+
+
+def verify_database(db_path):
+    """Raise SnapshotError unless PRAGMA integrity_check reports the database as ok"""
+    conn = sqlite3.connect(db_path)
+    try:
+        problems = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    except sqlite3.Error as e:
+        raise SnapshotError(f"Integrity check of {db_path} failed: {e}")
+    finally:
+        conn.close()
+    if problems != ['ok']:
+        raise SnapshotError(f"Integrity check of {db_path} failed: {'; '.join(problems[:5])}")
+
+
+def table_row_counts(db_path):
+    """
+    Rows in each table of a database, {table: count}. Full-text search indexes and
+    their shadow tables are left out: they are derived from the other tables.
+    """
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        tables = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall()
+        virtual = [name for name, sql in tables if (sql or '').upper().startswith('CREATE VIRTUAL TABLE')]
+        counts = {}
+        for name, sql in tables:
+            if name in virtual or any(name.startswith(f'{parent}_') for parent in virtual):
+                continue
+            quoted = name.replace('"', '""')
+            counts[name] = conn.execute(f'SELECT COUNT(*) FROM "{quoted}"').fetchone()[0]
+        return counts
+    finally:
+        conn.close()
@@ -0,0 +1,147 @@
+import struct
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+# SQLite write-ahead log format (https://www.sqlite.org/fileformat.html#the_write_ahead_log):
+# a 32-byte header, then frames of a 24-byte frame header followed by one page image.
+# A frame whose "database size" field is non-zero is the last frame of a transaction.
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+WAL_MAGIC_LE = 0x377f0682  # Checksums computed on little-endian words
+WAL_MAGIC_BE = 0x377f0683  # Checksums computed on big-endian words
+
+
+class WalFormatError(ValueError):
+    """WAL data that doesn't follow the SQLite write-ahead log format"""
+
+
+class WalHeader(NamedTuple):
+    magic: int
+    page_size: int
+    checkpoint_seq: int
+    salt1: int
+    salt2: int
+    checksum: Tuple[int, int]
+    raw: bytes
+
+    @property
+    def big_endian(self) -> bool:
+        return self.magic == WAL_MAGIC_BE
+
+    @property
+    def frame_size(self) -> int:
+        return WAL_FRAME_HEADER_SIZE + self.page_size
+
+
+def wal_checksum(data: bytes, checksum: Tuple[int, int], big_endian: bool) -> Tuple[int, int]:
+    """SQLite's cumulative WAL checksum of data (a multiple of 8 bytes), continuing from checksum"""
+    words = struct.unpack(f"{'>' if big_endian else '<'}{len(data) // 4}I", data)
+    s1, s2 = checksum
+    for i in range(0, len(words), 2):
+        s1 = (s1 + words[i] + s2) & 0xffffffff
+        s2 = (s2 + words[i + 1] + s1) & 0xffffffff
+    return s1, s2
+
+
+def parse_wal_header(raw: bytes) -> Optional[WalHeader]:
+    """The header at the start of a WAL file, or None if it is missing or fails its checksum"""
+    if len(raw) < WAL_HEADER_SIZE:
+        return None
+    magic, version, page_size, checkpoint_seq, salt1, salt2, c1, c2 = struct.unpack('>8I', raw[:WAL_HEADER_SIZE])
+    if magic not in (WAL_MAGIC_LE, WAL_MAGIC_BE):
+        return None
+    if wal_checksum(raw[:24], (0, 0), magic == WAL_MAGIC_BE) != (c1, c2):
+        return None
+    return WalHeader(magic, page_size, checkpoint_seq, salt1, salt2, (c1, c2), bytes(raw[:WAL_HEADER_SIZE]))
+
+
+def read_wal_header(wal_path: str) -> Optional[WalHeader]:
+    try:
+        with open(wal_path, 'rb') as wal_file:
+            return parse_wal_header(wal_file.read(WAL_HEADER_SIZE))
+    except FileNotFoundError:
+        return None
+
+
+def read_committed_frames(wal_path: str, header: WalHeader, offset: int,
+                          checksum: Tuple[int, int]) -> Tuple[bytes, int, Tuple[int, int]]:
+    """
+    Read the frames of complete transactions written to the WAL after offset.
+
+    Frames are valid while their salts match the header and their checksums continue
+    the chain from checksum (the header's for the first frame, otherwise the last
+    frame's). Reading stops at the first invalid frame, which is where SQLite would
+    stop too; frames after the last commit frame belong to an unfinished transaction
+    and are left for the next read. Returns (frames, new offset, new checksum).
+    """
+    frame_size = header.frame_size
+    committed = bytearray()
+    pending = bytearray()
+    committed_offset, committed_checksum = offset, checksum
+    with open(wal_path, 'rb') as wal_file:
+        wal_file.seek(offset)
+        while True:
+            frame = wal_file.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            pgno, commit_size, salt1, salt2, c1, c2 = struct.unpack('>6I', frame[:WAL_FRAME_HEADER_SIZE])
+            if (salt1, salt2) != (header.salt1, header.salt2) or pgno == 0:
+                break
+            checksum = wal_checksum(frame[:8], checksum, header.big_endian)
+            checksum = wal_checksum(frame[WAL_FRAME_HEADER_SIZE:], checksum, header.big_endian)
+            if checksum != (c1, c2):
+                break
+            pending += frame
+            offset += frame_size
+            if commit_size:
+                committed += pending
+                pending.clear()
+                committed_offset, committed_checksum = offset, checksum
+    return bytes(committed), committed_offset, committed_checksum
+
+
+def iter_frames(frames: bytes, page_size: int) -> Iterator[Tuple[int, int, bytes]]:
+    """(page number, database size after commit or 0, page image) for each frame"""
+    frame_size = WAL_FRAME_HEADER_SIZE + page_size
+    if len(frames) % frame_size:
+        raise WalFormatError(f"WAL data of {len(frames)} bytes isn't a whole number of {frame_size}-byte frames")
+    for start in range(0, len(frames), frame_size):
+        pgno, commit_size = struct.unpack('>2I', frames[start:start + 8])
+        if pgno == 0:
+            raise WalFormatError(f"Frame at byte {start} has page number 0")
+        yield pgno, commit_size, frames[start + WAL_FRAME_HEADER_SIZE:start + frame_size]
+
+
+def apply_frames(db_file, frames: bytes, page_size: int) -> int:
+    """
+    Write WAL frames into an open database file the way a checkpoint would: each
+    page image goes to its page's offset and each commit sets the file length.
+    Frames after the last commit are ignored. Returns the number of transactions applied.
+    """
+    transactions = 0
+    pages = []
+    for pgno, commit_size, page in iter_frames(frames, page_size):
+        pages.append((pgno, page))
+        if not commit_size:
+            continue
+        for page_number, image in pages:
+            db_file.seek((page_number - 1) * page_size)
+            db_file.write(image)
+        db_file.truncate(commit_size * page_size)
+        pages.clear()
+        transactions += 1
+    return transactions
+
+
+def database_page_size(db_path: str) -> int:
+    """Page size from a database file's header (stored as 1 for 65536)"""
+    with open(db_path, 'rb') as db_file:
+        header = db_file.read(100)
+    if len(header) < 100 or not header.startswith(b'SQLite format 3\x00'):
+        raise WalFormatError(f"{db_path} is not an SQLite database")
+    page_size = struct.unpack('>H', header[16:18])[0]
+    return 65536 if page_size == 1 else page_size
+
+
+def wal_path_for(db_path: str) -> str:
+    return f'{db_path}-wal'
+
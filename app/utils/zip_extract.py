@@ -0,0 +1,115 @@
+import os
+import posixpath
+import zipfile
+import zlib
+
+from app.utils.zip_stream import CHUNK_SIZE, COMPRESSION_NAMES
+
+# Compression ratios are only checked for members at least this large; small files
+# of repeated bytes legitimately compress very well
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+
+class InvalidArchiveError(ValueError):
+    """A backup archive failed the checks made before or while extracting it"""
+
+
+class ExtractionLimits:
+    """
+    Caps on what a backup archive may unpack to, checked against the sizes in the
+    ZIP central directory before anything is extracted (zip bomb protection)
+    """
+
+    def __init__(self, max_entry_size=4 * 1024 ** 3, max_total_size=20 * 1024 ** 3,
+                 max_entries=100000, max_ratio=1000):
+        self.max_entry_size = max_entry_size
+        self.max_total_size = max_total_size
+        self.max_entries = max_entries
+        self.max_ratio = max_ratio
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_entry_size=config.get('BACKUP_MAX_ENTRY_SIZE', 4 * 1024 ** 3),
+            max_total_size=config.get('BACKUP_MAX_TOTAL_SIZE', 20 * 1024 ** 3),
+            max_entries=config.get('BACKUP_MAX_ENTRIES', 100000),
+            max_ratio=config.get('BACKUP_MAX_COMPRESSION_RATIO', 1000),
+        )
+
+
+def is_safe_member_name(name):
+    """True if extracting the member can't write outside the target directory"""
+    if not name or name.startswith('/') or '\\' in name or '\0' in name:
+        return False
+    if ':' in name.split('/', 1)[0]:
+        return False
+    return '..' not in posixpath.normpath(name).split('/')
+
+
+def check_archive(zipf, limits=None, required=()):
+    """
+    Validate an open ZipFile from its central directory alone: member names, count,
+    encryption, compression method, declared sizes and compression ratios. Nothing
+    is decompressed. Returns {name: ZipInfo} for the file members.
+    """
+    limits = limits or ExtractionLimits()
+    infos = zipf.infolist()
+    if len(infos) > limits.max_entries:
+        raise InvalidArchiveError(f"Archive has {len(infos)} entries (limit {limits.max_entries})")
+
+    members = {}
+    total_size = 0
+    for info in infos:
+        name = info.filename
+        if not is_safe_member_name(name):
+            raise InvalidArchiveError(f"Unsafe path in archive: {name!r}")
+        if info.is_dir():
+            continue
+        if name in members:
+            raise InvalidArchiveError(f"Duplicate entry in archive: {name}")
+        if info.flag_bits & 0x1:
+            raise InvalidArchiveError(f"Encrypted entries are not supported: {name}")
+        if info.compress_type not in COMPRESSION_NAMES:
+            raise InvalidArchiveError(f"Unsupported compression method {info.compress_type} for {name}")
+        if info.file_size > limits.max_entry_size:
+            raise InvalidArchiveError(f"{name} unpacks to {info.file_size} bytes (limit {limits.max_entry_size})")
+        if (info.file_size >= RATIO_CHECK_MIN_SIZE
+                and info.file_size > info.compress_size * limits.max_ratio):
+            raise InvalidArchiveError(f"{name} has a suspicious compression ratio "
+                                      f"({info.file_size} bytes from {info.compress_size})")
+        total_size += info.file_size
+        members[name] = info
+
+    if total_size > limits.max_total_size:
+        raise InvalidArchiveError(f"Archive unpacks to {total_size} bytes (limit {limits.max_total_size})")
+
+    missing = [name for name in required if name not in members]
+    if missing:
+        raise InvalidArchiveError(f"Archive is missing {', '.join(missing)}")
+    return members
+
+
+def extract_member(zipf, info, dest_path, chunk_size=CHUNK_SIZE):
+    """
+    Stream one checked member to dest_path in chunks. zipfile stops reading at the
+    size declared in the central directory and verifies the CRC at the end; on any
+    failure the partial file is removed and dest_path is left untouched.
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    partial_path = f'{dest_path}.part'
+    try:
+        with zipf.open(info) as src, open(partial_path, 'wb') as dest:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                dest.write(chunk)
+        os.replace(partial_path, dest_path)
+    except (zipfile.BadZipFile, EOFError, zlib.error) as e:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise InvalidArchiveError(f"{info.filename} is corrupt: {e}")
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
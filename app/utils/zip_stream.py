@@ -0,0 +1,163 @@
+import hashlib
+import os
+import time
+import zipfile
+
+# Bytes read from a source file per write into the archive, and the amount of
+# compressed output buffered before it is handed to the caller
+CHUNK_SIZE = 1024 * 1024
+
+COMPRESSION_METHODS = {
+    'stored': zipfile.ZIP_STORED,
+    'deflated': zipfile.ZIP_DEFLATED,
+    'bzip2': zipfile.ZIP_BZIP2,
+    'lzma': zipfile.ZIP_LZMA,
+}
+COMPRESSION_NAMES = {value: name for name, value in COMPRESSION_METHODS.items()}
+
+# Formats that are already compressed internally; deflating them again costs
+# CPU for next to no size reduction, so they are stored as-is
+ALREADY_COMPRESSED_EXTENSIONS = {
+    'pdf', 'docx', 'xlsx', 'pptx', 'odt', 'ods', 'odp', 'epub',
+    'zip', 'gz', 'tgz', 'bz2', 'xz', '7z', 'rar', 'zst',
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'heic',
+    'mp3', 'mp4', 'm4a', 'mov', 'webm',
+}
+
+
+class CompressionPolicy:
+    """Chooses the compression method and level for each archive entry"""
+
+    def __init__(self, method='deflated', level=None, stored_extensions=None):
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"Unknown compression method '{method}'. "
+                             f"Allowed methods are: {', '.join(COMPRESSION_METHODS)}")
+        self.method = method
+        self.level = level
+        self.stored_extensions = ALREADY_COMPRESSED_EXTENSIONS if stored_extensions is None else stored_extensions
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            method=config.get('BACKUP_COMPRESSION', 'deflated'),
+            level=config.get('BACKUP_COMPRESSION_LEVEL'),
+        )
+
+    def for_entry(self, arcname):
+        """Return (compress_type, compress_level) for an archive member name"""
+        extension = arcname.rsplit('.', 1)[-1].lower() if '.' in arcname else ''
+        if extension in self.stored_extensions:
+            return zipfile.ZIP_STORED, None
+        return COMPRESSION_METHODS[self.method], self.level
+
+
+class ZipStreamBuffer:
+    """
+    Write-only file object for zipfile.ZipFile. It has no tell()/seek(), so
+    ZipFile writes entries in streaming mode (sizes and CRC go in data
+    descriptors after each entry) and everything written can be drained.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Return and forget everything written since the last drain"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def stream_zip(entries, policy=None, chunk_size=CHUNK_SIZE, entry_stats=None):
+    """
+    Generate a ZIP archive as a sequence of byte chunks.
+
+    `entries` is an iterable of (arcname, source) pairs where source is either a
+    path to a file on disk or a bytes object. Entries are consumed lazily, so a
+    generator can produce (and clean up) temporary files one at a time. Memory
+    use is bounded by roughly chunk_size regardless of archive size.
+
+    Each entry is compressed as chosen by `policy` (a CompressionPolicy). If
+    `entry_stats` is a list, a dict with the size, compressed size, method,
+    ratio, SHA-256 and time taken is appended to it as each entry is finished.
+    The hash is computed from the chunks as they are written, so sources are
+    still read only once.
+    """
+    policy = policy or CompressionPolicy()
+    buffer = ZipStreamBuffer()
+
+    # ZipFile.open() has no compression level argument; the archive's method and level
+    # apply to entries opened by name
+    with zipfile.ZipFile(buffer, 'w', compression=COMPRESSION_METHODS[policy.method],
+                         compresslevel=policy.level, allowZip64=True) as zipf:
+        for arcname, source in entries:
+            compress_type, compress_level = policy.for_entry(arcname)
+            started = time.perf_counter()
+            hasher = hashlib.sha256()
+
+            if isinstance(source, bytes):
+                hasher.update(source)
+                zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+                zinfo.external_attr = 0o644 << 16
+                zipf.writestr(zinfo, source, compress_type=compress_type, compresslevel=compress_level)
+            else:
+                # Carries the file's timestamp and permission bits
+                file_info = zipfile.ZipInfo.from_file(source, arcname)
+                if compress_level is None:
+                    file_info.compress_type = compress_type
+                    member = file_info
+                else:
+                    # Opened by name so the archive's compression level applies
+                    member = arcname
+                force_zip64 = os.path.getsize(source) > zipfile.ZIP64_LIMIT
+                with open(source, 'rb') as src, zipf.open(member, 'w', force_zip64=force_zip64) as dest:
+                    while True:
+                        chunk = src.read(chunk_size)
+                        if not chunk:
+                            break
+                        hasher.update(chunk)
+                        dest.write(chunk)
+                        if buffer.size >= chunk_size:
+                            yield buffer.drain()
+                zinfo = zipf.getinfo(arcname)
+                # An entry opened by name gets the ZIP default timestamp (1980-01-01) and no
+                # permissions; copy the file's into the central directory, written on close,
+                # which is what unzip and zipfile read them from
+                zinfo.date_time = file_info.date_time
+                zinfo.external_attr = file_info.external_attr
+
+            if entry_stats is not None:
+                entry_stats.append({
+                    'name': arcname,
+                    'size': zinfo.file_size,
+                    'compressed_size': zinfo.compress_size,
+                    'compression': COMPRESSION_NAMES.get(zinfo.compress_type, str(zinfo.compress_type)),
+                    'ratio': round(zinfo.compress_size / zinfo.file_size, 4) if zinfo.file_size else 1.0,
+                    'sha256': hasher.hexdigest(),
+                    'seconds': round(time.perf_counter() - started, 4),
+                })
+
+            if buffer.size:
+                yield buffer.drain()
+
+    # Central directory, written when the ZipFile is closed
+    if buffer.size:
+        yield buffer.drain()
+
+
+def write_zip(entries, zip_path, policy=None, chunk_size=CHUNK_SIZE, entry_stats=None):
+    """Write a streamed ZIP archive to zip_path and return its size in bytes"""
+    with open(zip_path, 'wb') as zip_file:
+        for chunk in stream_zip(entries, policy=policy, chunk_size=chunk_size, entry_stats=entry_stats):
+            zip_file.write(chunk)
+    return os.path.getsize(zip_path)
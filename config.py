@@ -13,6 +13,27 @@ class Config:
     # Database configuration
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # SQLite connection tuning, applied to every connection (see app/utils/sqlite_utils.py)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')  # WAL lets readers and a writer run concurrently
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable enough in WAL mode
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))  # Wait for locks held by other workers
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # 256MB memory-mapped I/O
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -32000))  # Negative values are in KiB (~32MB)
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    # Online database snapshots for backups: 'vacuum' (VACUUM INTO, one consistent read)
+    # or 'backup' (backup API, SQLITE_SNAPSHOT_PAGES pages per step with a pause between)
+    SQLITE_SNAPSHOT_METHOD = os.environ.get('SQLITE_SNAPSHOT_METHOD', 'vacuum')
+    SQLITE_SNAPSHOT_PAGES = int(os.environ.get('SQLITE_SNAPSHOT_PAGES', 256))
+    SQLITE_SNAPSHOT_PAUSE_MS = int(os.environ.get('SQLITE_SNAPSHOT_PAUSE_MS', 5))
+    # Continuous replication of app.db's write-ahead log for point-in-time restores.
+    # Target is an absolute folder path or an rclone remote:path; unset turns it off.
+    SQLITE_REPLICA_TARGET = os.environ.get('SQLITE_REPLICA_TARGET')
+    SQLITE_REPLICA_SYNC_INTERVAL = float(os.environ.get('SQLITE_REPLICA_SYNC_INTERVAL', 1))  # Seconds between WAL copies
+    SQLITE_REPLICA_CHECKPOINT_PAGES = int(os.environ.get('SQLITE_REPLICA_CHECKPOINT_PAGES', 1000))
+    SQLITE_REPLICA_CHECKPOINT_INTERVAL = int(os.environ.get('SQLITE_REPLICA_CHECKPOINT_INTERVAL', 60))  # Seconds
+    SQLITE_REPLICA_SNAPSHOT_INTERVAL = int(os.environ.get('SQLITE_REPLICA_SNAPSHOT_INTERVAL', 86400))  # New snapshot (generation) every N seconds
+    SQLITE_REPLICA_RETENTION = int(os.environ.get('SQLITE_REPLICA_RETENTION', 7 * 86400))  # Seconds of history kept
+    
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
@@ -21,10 +42,62 @@ class Config:
     GITHUB_REPO = os.environ.get('GITHUB_REPO')  # Format: "username/repository"
     GITHUB_BASE_BRANCH = os.environ.get('GITHUB_BASE_BRANCH', 'main')
 
+    # Backup archive compression. Already-compressed attachments (PDF, DOCX, images...)
+    # are always stored; this codec applies to the database snapshot and text files.
+    BACKUP_COMPRESSION = os.environ.get('BACKUP_COMPRESSION', 'deflated')  # stored, deflated, bzip2 or lzma
+    BACKUP_COMPRESSION_LEVEL = int(os.environ['BACKUP_COMPRESSION_LEVEL']) if os.environ.get('BACKUP_COMPRESSION_LEVEL') else None
+
+    # Limits on what an imported or restored backup archive may unpack to, checked against
+    # the ZIP central directory before anything is extracted (zip bomb protection)
+    BACKUP_MAX_ENTRY_SIZE = int(os.environ.get('BACKUP_MAX_ENTRY_SIZE', 4 * 1024 ** 3))  # Bytes per archive member
+    BACKUP_MAX_TOTAL_SIZE = int(os.environ.get('BACKUP_MAX_TOTAL_SIZE', 20 * 1024 ** 3))  # Bytes per archive
+    BACKUP_MAX_ENTRIES = int(os.environ.get('BACKUP_MAX_ENTRIES', 100000))
+    BACKUP_MAX_COMPRESSION_RATIO = int(os.environ.get('BACKUP_MAX_COMPRESSION_RATIO', 1000))
+
+    # A restore moves the previous JobTrackerFiles tree to JobTrackerFiles.backup_<timestamp>;
+    # this many of those are kept (0 deletes the old tree once the new one is in place)
+    FILE_RESTORE_KEEP_BACKUPS = int(os.environ.get('FILE_RESTORE_KEEP_BACKUPS', 3))
+
+    # Incremental cloud backups: after this many increments the next backup is a full one
+    BACKUP_INCREMENTAL_MAX_CHAIN = int(os.environ.get('BACKUP_INCREMENTAL_MAX_CHAIN', 6))
+
+    # Threads used to hash files for incremental backups, verification and diffs (0 = one per CPU, up to 8)
+    BACKUP_HASH_WORKERS = int(os.environ.get('BACKUP_HASH_WORKERS', 0))
+
+    # Automatic backups every BACKUP_SCHEDULE_INTERVAL seconds (0 disables the in-process
+    # scheduler; `flask backup run` does the same from cron) to each of
+    # BACKUP_SCHEDULE_REMOTES (comma separated) and, if set, the BACKUP_LOCAL_PATH folder
+    BACKUP_SCHEDULE_INTERVAL = int(os.environ.get('BACKUP_SCHEDULE_INTERVAL', 0))
+    BACKUP_SCHEDULE_REMOTES = [name.strip() for name in os.environ.get(
+        'BACKUP_SCHEDULE_REMOTES', os.environ.get('RCLONE_DEFAULT_REMOTE', '')).split(',') if name.strip()]
+    BACKUP_SCHEDULE_TYPE = os.environ.get('BACKUP_SCHEDULE_TYPE', 'incremental')  # 'full' or 'incremental'
+    BACKUP_LOCAL_PATH = os.environ.get('BACKUP_LOCAL_PATH')  # Optional: folder for local scheduled backups
+    # Grandfather-father-son retention applied after each scheduled backup: the newest
+    # backup of each of the last N days, weeks and months is kept (all 0 keeps everything)
+    BACKUP_RETENTION_DAILY = int(os.environ.get('BACKUP_RETENTION_DAILY', 7))
+    BACKUP_RETENTION_WEEKLY = int(os.environ.get('BACKUP_RETENTION_WEEKLY', 4))
+    BACKUP_RETENTION_MONTHLY = int(os.environ.get('BACKUP_RETENTION_MONTHLY', 12))
+
     # rclone configuration for cloud backups
     RCLONE_CONFIG_PATH = os.environ.get('RCLONE_CONFIG_PATH')  # Optional: custom rclone config path
     RCLONE_DEFAULT_REMOTE = os.environ.get('RCLONE_DEFAULT_REMOTE')  # Optional: default remote to use
     RCLONE_BACKUP_PATH = os.environ.get('RCLONE_BACKUP_PATH', 'job-tracker-backups')  # Path on remote storage
+    RCLONE_BACKEND = os.environ.get('RCLONE_BACKEND', 'rcd')  # 'rcd' (persistent rclone daemon) or 'subprocess'
+    RCLONE_LIST_TIMEOUT = int(os.environ.get('RCLONE_LIST_TIMEOUT', 20))  # Seconds allowed per remote when listing backups
+    RCLONE_LIST_WORKERS = int(os.environ.get('RCLONE_LIST_WORKERS', 4))  # Remotes listed in parallel on the cloud page
+    # The cloud page reads backups from a local catalog. A background thread re-lists new
+    # date folders on each remote every RCLONE_CATALOG_REFRESH seconds (0 disables it) and
+    # the whole backup path every RCLONE_CATALOG_FULL_REFRESH seconds.
+    RCLONE_CATALOG_REFRESH = int(os.environ.get('RCLONE_CATALOG_REFRESH', 900))
+    RCLONE_CATALOG_FULL_REFRESH = int(os.environ.get('RCLONE_CATALOG_FULL_REFRESH', 86400))
+    RCLONE_TRANSFER_TIMEOUT = int(os.environ.get('RCLONE_TRANSFER_TIMEOUT', 3600))  # Seconds allowed for a background upload
+    # 'stream' pipes the archive into rclone as it is built (no temporary file);
+    # 'file' writes it to a temporary file first and reports upload percentage
+    RCLONE_UPLOAD_MODE = os.environ.get('RCLONE_UPLOAD_MODE', 'stream')
+
+    # Long-running work (cloud uploads) runs on a background task worker thread in each
+    # app process. Set to false to leave the queue to other processes.
+    TASK_WORKER_ENABLED = os.environ.get('TASK_WORKER_ENABLED', 'true').lower() in ('true', '1', 'yes')
     
     @property
     def SQLALCHEMY_DATABASE_URI(self):
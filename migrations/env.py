@@ -90,9 +90,18 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the FTS5 search table and its shadow tables are created by migrations and
+    # triggers rather than models, so keep autogenerate from dropping them
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'table' and reflected and name.startswith('jobs_fts'):
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -106,6 +115,11 @@ def run_migrations_online():
         with context.begin_transaction():
             context.run_migrations()
 
+    # Work a migration deferred until its changes were committed, such as deleting
+    # files it has copied elsewhere
+    for callback in config.attributes.pop('after_commit', []):
+        callback()
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,28 @@
+"""Add indexes for the unfiltered job list
+
+Revision ID: 4b8e2f7a1c93
+Revises: c3f81d6a2e57
+Create Date: 2025-08-12 08:57:31.204816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8e2f7a1c93'
+down_revision = 'c3f81d6a2e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The (is_draft, posting_status, ...) indexes can't order the "all" list because
+    # posting_status sits between is_draft and the sort column
+    op.create_index('ix_jobs_draft_created', 'jobs', ['is_draft', 'created_dt', 'id'], unique=False, if_not_exists=True)
+    op.create_index('ix_jobs_draft_last_activity', 'jobs', ['is_draft', 'last_activity_at', 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_draft_last_activity', table_name='jobs', if_exists=True)
+    op.drop_index('ix_jobs_draft_created', table_name='jobs', if_exists=True)
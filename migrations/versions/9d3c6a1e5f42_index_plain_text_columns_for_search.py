@@ -0,0 +1,134 @@
+"""Index plain text columns for full-text search instead of calling strip_html()
+
+Revision ID: 9d3c6a1e5f42
+Revises: 4b8e2f7a1c93
+Create Date: 2025-08-12 14:06:52.713408
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.html_utils import html_to_text
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3c6a1e5f42'
+down_revision = '4b8e2f7a1c93'
+branch_labels = None
+depends_on = None
+
+
+# Same as JOB_SEARCH_DDL in app/models.py. The triggers only use built-in SQL, so any
+# SQLite client can write to jobs and job_notes; the app fills in the plain text
+# columns on flush, and rows written without them are indexed with their markup.
+NOTES_TEXT_SQL = "(SELECT group_concat(COALESCE(content_text, content), ' ') FROM job_notes WHERE job_id = {job_id})"
+ACTIVITIES_TEXT_SQL = "(SELECT group_concat(activity_brief, ' ') FROM job_activities WHERE job_id = {job_id})"
+
+TRIGGERS = {
+    'jobs_fts_insert': """CREATE TRIGGER jobs_fts_insert AFTER INSERT ON jobs
+        BEGIN
+            INSERT INTO jobs_fts(rowid, company, title, location, description, notes, activities)
+            VALUES (NEW.id, NEW.company, NEW.title, NEW.location, COALESCE(NEW.description_text, NEW.description), '', '');
+        END""",
+    'jobs_fts_update': """CREATE TRIGGER jobs_fts_update AFTER UPDATE OF company, title, location, description, description_text ON jobs
+        BEGIN
+            UPDATE jobs_fts SET company = NEW.company, title = NEW.title, location = NEW.location,
+                description = COALESCE(NEW.description_text, NEW.description)
+            WHERE rowid = NEW.id;
+        END""",
+    'job_notes_fts_insert': f"""CREATE TRIGGER job_notes_fts_insert AFTER INSERT ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+    'job_notes_fts_update': f"""CREATE TRIGGER job_notes_fts_update AFTER UPDATE OF content, content_text ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+    'job_notes_fts_delete': f"""CREATE TRIGGER job_notes_fts_delete AFTER DELETE ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='OLD.job_id')} WHERE rowid = OLD.job_id;
+        END""",
+}
+
+# The triggers from e83f1a4b6d27 that are replaced, for downgrade()
+RAW_NOTES_TEXT_SQL = "(SELECT group_concat(content, ' ') FROM job_notes WHERE job_id = {job_id})"
+PREVIOUS_TRIGGERS = {
+    'jobs_fts_insert': """CREATE TRIGGER jobs_fts_insert AFTER INSERT ON jobs
+        BEGIN
+            INSERT INTO jobs_fts(rowid, company, title, location, description, notes, activities)
+            VALUES (NEW.id, NEW.company, NEW.title, NEW.location, NEW.description, '', '');
+        END""",
+    'jobs_fts_update': """CREATE TRIGGER jobs_fts_update AFTER UPDATE OF company, title, location, description ON jobs
+        BEGIN
+            UPDATE jobs_fts SET company = NEW.company, title = NEW.title, location = NEW.location,
+                description = NEW.description
+            WHERE rowid = NEW.id;
+        END""",
+    'job_notes_fts_insert': f"""CREATE TRIGGER job_notes_fts_insert AFTER INSERT ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {RAW_NOTES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+    'job_notes_fts_update': f"""CREATE TRIGGER job_notes_fts_update AFTER UPDATE OF content ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {RAW_NOTES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+    'job_notes_fts_delete': f"""CREATE TRIGGER job_notes_fts_delete AFTER DELETE ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {RAW_NOTES_TEXT_SQL.format(job_id='OLD.job_id')} WHERE rowid = OLD.job_id;
+        END""",
+}
+
+
+def upgrade():
+    # Older databases may have triggers calling strip_html(), which only exists on
+    # app connections; drop them before touching the tables
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    # Added outside batch mode so SQLite does not rebuild the tables (and drop their triggers)
+    op.add_column('jobs', sa.Column('description_text', sa.Text(), nullable=True))
+    op.add_column('job_notes', sa.Column('content_text', sa.Text(), nullable=True))
+
+    # Backfill the plain text in Python, where the HTML parser lives
+    connection = op.get_bind()
+    for table, column, text_column in (('jobs', 'description', 'description_text'),
+                                       ('job_notes', 'content', 'content_text')):
+        rows = connection.execute(sa.text(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL")).all()
+        if rows:
+            connection.execute(sa.text(f"UPDATE {table} SET {text_column} = :text WHERE id = :id"),
+                               [{'id': row_id, 'text': html_to_text(value)} for row_id, value in rows])
+
+    for trigger_sql in TRIGGERS.values():
+        op.execute(trigger_sql)
+
+    # Rebuild the index from the plain text
+    op.execute("DELETE FROM jobs_fts")
+    op.execute(f"""
+        INSERT INTO jobs_fts(rowid, company, title, location, description, notes, activities)
+        SELECT id, company, title, location, COALESCE(description_text, description),
+               {NOTES_TEXT_SQL.format(job_id='jobs.id')},
+               {ACTIVITIES_TEXT_SQL.format(job_id='jobs.id')}
+        FROM jobs
+    """)
+    op.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('optimize')")
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    # ALTER TABLE ... DROP COLUMN (SQLite 3.35+) keeps the other triggers
+    op.drop_column('job_notes', 'content_text')
+    op.drop_column('jobs', 'description_text')
+
+    for trigger_sql in PREVIOUS_TRIGGERS.values():
+        op.execute(trigger_sql)
+
+    op.execute("DELETE FROM jobs_fts")
+    op.execute(f"""
+        INSERT INTO jobs_fts(rowid, company, title, location, description, notes, activities)
+        SELECT id, company, title, location, description,
+               {RAW_NOTES_TEXT_SQL.format(job_id='jobs.id')},
+               {ACTIVITIES_TEXT_SQL.format(job_id='jobs.id')}
+        FROM jobs
+    """)
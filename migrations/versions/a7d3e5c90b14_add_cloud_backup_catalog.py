@@ -0,0 +1,55 @@
+"""Add cloud backup catalog
+
+Revision ID: a7d3e5c90b14
+Revises: f2c94b1e7a60
+Create Date: 2025-08-09 10:12:47.301954
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e5c90b14'
+down_revision = 'f2c94b1e7a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cloud_backups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('remote', sa.String(length=100), nullable=False),
+    sa.Column('path', sa.String(length=500), nullable=False),
+    sa.Column('relative_path', sa.String(length=500), nullable=True),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('modified', sa.String(length=40), nullable=True),
+    sa.Column('sha256', sa.String(length=64), nullable=True),
+    sa.Column('backup_type', sa.String(length=20), nullable=False),
+    sa.Column('detection_method', sa.String(length=30), nullable=True),
+    sa.Column('manifest_summary', sa.JSON(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_cloud_backups_remote_path', 'cloud_backups', ['remote', 'path'], unique=True, if_not_exists=True)
+    op.create_index('ix_cloud_backups_remote_modified', 'cloud_backups', ['remote', 'modified'], unique=False, if_not_exists=True)
+
+    op.create_table('cloud_backup_remotes',
+    sa.Column('remote', sa.String(length=100), nullable=False),
+    sa.Column('synced_at', sa.DateTime(), nullable=True),
+    sa.Column('full_synced_at', sa.DateTime(), nullable=True),
+    sa.Column('sync_started_at', sa.DateTime(), nullable=True),
+    sa.Column('attempted_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.PrimaryKeyConstraint('remote'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('cloud_backup_remotes', if_exists=True)
+    op.drop_index('ix_cloud_backups_remote_modified', table_name='cloud_backups', if_exists=True)
+    op.drop_index('ix_cloud_backups_remote_path', table_name='cloud_backups', if_exists=True)
+    op.drop_table('cloud_backups', if_exists=True)
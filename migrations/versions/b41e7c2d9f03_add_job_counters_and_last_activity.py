@@ -0,0 +1,85 @@
+"""Add notes/activities counters and last_activity_at to jobs
+
+Revision ID: b41e7c2d9f03
+Revises: 7af3e743a8b1
+Create Date: 2025-08-02 10:14:27.402918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41e7c2d9f03'
+down_revision = '7af3e743a8b1'
+branch_labels = None
+depends_on = None
+
+
+LAST_ACTIVITY_SQL = """NULLIF(MAX(
+        COALESCE(jobs.created_dt, ''),
+        COALESCE((SELECT MAX(created_at) FROM job_notes WHERE job_id = jobs.id), ''),
+        COALESCE((SELECT MAX(activity_date) FROM job_activities WHERE job_id = jobs.id), '')
+    ), '')"""
+
+TRIGGERS = {
+    'jobs_last_activity_insert': """CREATE TRIGGER jobs_last_activity_insert AFTER INSERT ON jobs
+        WHEN NEW.last_activity_at IS NULL
+        BEGIN
+            UPDATE jobs SET last_activity_at = NEW.created_dt WHERE id = NEW.id;
+        END""",
+    'job_notes_counter_insert': """CREATE TRIGGER job_notes_counter_insert AFTER INSERT ON job_notes
+        BEGIN
+            UPDATE jobs SET notes_count = notes_count + 1,
+                last_activity_at = NULLIF(MAX(COALESCE(last_activity_at, ''), COALESCE(NEW.created_at, '')), '')
+            WHERE id = NEW.job_id;
+        END""",
+    'job_notes_counter_delete': f"""CREATE TRIGGER job_notes_counter_delete AFTER DELETE ON job_notes
+        BEGIN
+            UPDATE jobs SET notes_count = notes_count - 1,
+                last_activity_at = {LAST_ACTIVITY_SQL}
+            WHERE id = OLD.job_id;
+        END""",
+    'job_activities_counter_insert': """CREATE TRIGGER job_activities_counter_insert AFTER INSERT ON job_activities
+        BEGIN
+            UPDATE jobs SET activities_count = activities_count + 1,
+                last_activity_at = NULLIF(MAX(COALESCE(last_activity_at, ''), COALESCE(NEW.activity_date, '')), '')
+            WHERE id = NEW.job_id;
+        END""",
+    'job_activities_counter_delete': f"""CREATE TRIGGER job_activities_counter_delete AFTER DELETE ON job_activities
+        BEGIN
+            UPDATE jobs SET activities_count = activities_count - 1,
+                last_activity_at = {LAST_ACTIVITY_SQL}
+            WHERE id = OLD.job_id;
+        END""",
+}
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('notes_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('activities_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+
+    # Backfill counters for existing jobs
+    op.execute(f"""
+        UPDATE jobs SET
+            notes_count = (SELECT COUNT(*) FROM job_notes WHERE job_id = jobs.id),
+            activities_count = (SELECT COUNT(*) FROM job_activities WHERE job_id = jobs.id),
+            last_activity_at = {LAST_ACTIVITY_SQL}
+    """)
+
+    # Databases created by db.create_all already have the triggers
+    for name, trigger_sql in TRIGGERS.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute(trigger_sql)
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_column('last_activity_at')
+        batch_op.drop_column('activities_count')
+        batch_op.drop_column('notes_count')
@@ -0,0 +1,41 @@
+"""Add background task queue
+
+Revision ID: c3f81d6a2e57
+Revises: a7d3e5c90b14
+Create Date: 2025-08-10 16:35:02.884120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f81d6a2e57'
+down_revision = 'a7d3e5c90b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('background_tasks',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('progress', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('worker', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_background_tasks_status_created', 'background_tasks', ['status', 'created_at'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_background_tasks_status_created', table_name='background_tasks', if_exists=True)
+    op.drop_table('background_tasks', if_exists=True)
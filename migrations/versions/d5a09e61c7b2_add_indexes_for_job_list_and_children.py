@@ -0,0 +1,33 @@
+"""Add indexes for job list filtering and child lookups
+
+Revision ID: d5a09e61c7b2
+Revises: b41e7c2d9f03
+Create Date: 2025-08-03 09:41:05.117632
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a09e61c7b2'
+down_revision = 'b41e7c2d9f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Created outside batch mode so SQLite does not rebuild the tables (and drop their triggers)
+    op.create_index('ix_jobs_draft_status_created', 'jobs', ['is_draft', 'posting_status', 'created_dt'], unique=False, if_not_exists=True)
+    op.create_index('ix_jobs_draft_status_last_activity', 'jobs', ['is_draft', 'posting_status', 'last_activity_at'], unique=False, if_not_exists=True)
+    op.create_index('ix_jobs_posting_id', 'jobs', ['posting_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_job_notes_job_id_created_at', 'job_notes', ['job_id', 'created_at'], unique=False, if_not_exists=True)
+    op.create_index('ix_job_activities_job_id_activity_date', 'job_activities', ['job_id', 'activity_date'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_job_activities_job_id_activity_date', table_name='job_activities', if_exists=True)
+    op.drop_index('ix_job_notes_job_id_created_at', table_name='job_notes', if_exists=True)
+    op.drop_index('ix_jobs_posting_id', table_name='jobs', if_exists=True)
+    op.drop_index('ix_jobs_draft_status_last_activity', table_name='jobs', if_exists=True)
+    op.drop_index('ix_jobs_draft_status_created', table_name='jobs', if_exists=True)
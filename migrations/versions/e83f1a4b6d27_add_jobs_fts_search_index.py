@@ -0,0 +1,93 @@
+"""Add FTS5 full-text search index over jobs, notes and activities
+
+Revision ID: e83f1a4b6d27
+Revises: d5a09e61c7b2
+Create Date: 2025-08-05 19:22:48.630571
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83f1a4b6d27'
+down_revision = 'd5a09e61c7b2'
+branch_labels = None
+depends_on = None
+
+
+# Indexes the raw HTML; revision 9d3c6a1e5f42 switches the index to plain text columns
+NOTES_TEXT_SQL = "(SELECT group_concat(content, ' ') FROM job_notes WHERE job_id = {job_id})"
+ACTIVITIES_TEXT_SQL = "(SELECT group_concat(activity_brief, ' ') FROM job_activities WHERE job_id = {job_id})"
+
+TRIGGERS = {
+    'jobs_fts_insert': """CREATE TRIGGER jobs_fts_insert AFTER INSERT ON jobs
+        BEGIN
+            INSERT INTO jobs_fts(rowid, company, title, location, description, notes, activities)
+            VALUES (NEW.id, NEW.company, NEW.title, NEW.location, NEW.description, '', '');
+        END""",
+    'jobs_fts_update': """CREATE TRIGGER jobs_fts_update AFTER UPDATE OF company, title, location, description ON jobs
+        BEGIN
+            UPDATE jobs_fts SET company = NEW.company, title = NEW.title, location = NEW.location,
+                description = NEW.description
+            WHERE rowid = NEW.id;
+        END""",
+    'jobs_fts_delete': """CREATE TRIGGER jobs_fts_delete AFTER DELETE ON jobs
+        BEGIN
+            DELETE FROM jobs_fts WHERE rowid = OLD.id;
+        END""",
+    'job_notes_fts_insert': f"""CREATE TRIGGER job_notes_fts_insert AFTER INSERT ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+    'job_notes_fts_update': f"""CREATE TRIGGER job_notes_fts_update AFTER UPDATE OF content ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+    'job_notes_fts_delete': f"""CREATE TRIGGER job_notes_fts_delete AFTER DELETE ON job_notes
+        BEGIN
+            UPDATE jobs_fts SET notes = {NOTES_TEXT_SQL.format(job_id='OLD.job_id')} WHERE rowid = OLD.job_id;
+        END""",
+    'job_activities_fts_insert': f"""CREATE TRIGGER job_activities_fts_insert AFTER INSERT ON job_activities
+        BEGIN
+            UPDATE jobs_fts SET activities = {ACTIVITIES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+    'job_activities_fts_update': f"""CREATE TRIGGER job_activities_fts_update AFTER UPDATE OF activity_brief ON job_activities
+        BEGIN
+            UPDATE jobs_fts SET activities = {ACTIVITIES_TEXT_SQL.format(job_id='NEW.job_id')} WHERE rowid = NEW.job_id;
+        END""",
+    'job_activities_fts_delete': f"""CREATE TRIGGER job_activities_fts_delete AFTER DELETE ON job_activities
+        BEGIN
+            UPDATE jobs_fts SET activities = {ACTIVITIES_TEXT_SQL.format(job_id='OLD.job_id')} WHERE rowid = OLD.job_id;
+        END""",
+}
+
+
+def upgrade():
+    op.execute("DROP TABLE IF EXISTS jobs_fts")
+    op.execute("""CREATE VIRTUAL TABLE jobs_fts USING fts5(
+            company, title, location, description, notes, activities,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )""")
+
+    # Index existing jobs
+    op.execute(f"""
+        INSERT INTO jobs_fts(rowid, company, title, location, description, notes, activities)
+        SELECT id, company, title, location, description,
+               {NOTES_TEXT_SQL.format(job_id='jobs.id')},
+               {ACTIVITIES_TEXT_SQL.format(job_id='jobs.id')}
+        FROM jobs
+    """)
+    op.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('optimize')")
+
+    # Databases created by db.create_all already have the triggers
+    for name, trigger_sql in TRIGGERS.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute(trigger_sql)
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS jobs_fts")
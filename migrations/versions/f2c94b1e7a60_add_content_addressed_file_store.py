@@ -0,0 +1,173 @@
+"""Add content-addressed file store and deduplicate existing job files
+
+Revision ID: f2c94b1e7a60
+Revises: e83f1a4b6d27
+Create Date: 2025-08-07 21:04:13.518220
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+import hashlib
+import os
+import shutil
+from datetime import datetime
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c94b1e7a60'
+down_revision = 'e83f1a4b6d27'
+branch_labels = None
+depends_on = None
+
+
+# Job file column -> legacy folder under FILE_STORAGE_PATH
+FILE_COLUMNS = {
+    'resume_file': 'Resumes',
+    'job_description_file': 'Job_Descriptions',
+    'cover_letter_file': 'Cover_Letters',
+}
+STORE_FOLDER = 'Store'
+
+
+def get_file_storage_path():
+    """FILE_STORAGE_PATH of the app running the migration, or None outside an app context"""
+    try:
+        from flask import current_app
+        return current_app.config['FILE_STORAGE_PATH']
+    except (ImportError, RuntimeError, KeyError):
+        return None
+
+
+def blob_path(storage_path, sha256):
+    return os.path.join(storage_path, STORE_FOLDER, sha256[:2], sha256)
+
+
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def copy_into_store(bind, storage_path, legacy_path):
+    """
+    Copy a legacy file into the store (unless the content is already there) and return
+    its key. The legacy file stays until the migration has committed, so a failed run
+    leaves it in place for the next attempt; a blob copied by a failed run is reused.
+    """
+    sha256 = hash_file(legacy_path)
+    size = os.path.getsize(legacy_path)
+    target = blob_path(storage_path, sha256)
+
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Copy under a temporary name so an interrupted copy never looks like a complete blob
+        shutil.copy2(legacy_path, target + '.partial')
+        os.replace(target + '.partial', target)
+
+    bind.execute(sa.text("""
+        INSERT INTO stored_files (sha256, size, ref_count, created_at)
+        VALUES (:sha256, :size, 1, :created_at)
+        ON CONFLICT(sha256) DO UPDATE SET ref_count = ref_count + 1
+    """), {'sha256': sha256, 'size': size, 'created_at': datetime.now()})
+
+    _, ext = os.path.splitext(legacy_path)
+    return sha256 + ext.lower()
+
+
+def remove_legacy_files(paths):
+    removed = 0
+    for path in sorted(paths):
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            print(f"Could not remove {path} after moving it into the file store: {e}")
+    print(f"Removed {removed} legacy files now kept in the file store")
+
+
+def upgrade():
+    op.create_table('stored_files',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256'),
+    if_not_exists=True
+    )
+
+    # The file columns grow from String(50) to String(80) to hold "<sha256><ext>".
+    # SQLite does not enforce VARCHAR lengths, and rebuilding jobs in batch mode
+    # would drop its counter and search triggers, so only other databases are altered.
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        for column in FILE_COLUMNS:
+            op.alter_column('jobs', column, existing_type=sa.String(length=50), type_=sa.String(length=80))
+
+    storage_path = get_file_storage_path()
+    if not storage_path:
+        print("FILE_STORAGE_PATH not available; existing files were not moved into the file store")
+        return
+
+    # Each legacy file is hashed and copied into the store once. Identical copies
+    # (e.g. the default resume copied for every job) collapse into one blob.
+    moved = {}
+    for column, folder in FILE_COLUMNS.items():
+        rows = bind.execute(sa.text(f"SELECT id, {column} FROM jobs WHERE {column} IS NOT NULL AND {column} != ''")).fetchall()
+        for job_id, filename in rows:
+            legacy_path = os.path.join(storage_path, folder, filename)
+            if legacy_path in moved:
+                key = moved[legacy_path]
+                bind.execute(sa.text("UPDATE stored_files SET ref_count = ref_count + 1 WHERE sha256 = :sha256"),
+                             {'sha256': key[:64]})
+            elif os.path.isfile(legacy_path):
+                key = copy_into_store(bind, storage_path, legacy_path)
+                moved[legacy_path] = key
+            else:
+                print(f"Job {job_id}: {column} '{filename}' not found, leaving as is")
+                continue
+            bind.execute(sa.text(f"UPDATE jobs SET {column} = :key WHERE id = :id"), {'key': key, 'id': job_id})
+
+    setting = bind.execute(sa.text("SELECT id, value FROM settings WHERE key = 'default_resume'")).fetchone()
+    if setting:
+        legacy_path = os.path.join(storage_path, 'Resumes', setting.value)
+        if os.path.isfile(legacy_path):
+            key = copy_into_store(bind, storage_path, legacy_path)
+            moved[legacy_path] = key
+            bind.execute(sa.text("UPDATE settings SET value = :key WHERE id = :id"), {'key': key, 'id': setting.id})
+
+    print(f"Copied {len(moved)} files into the file store")
+    # The legacy copies are only deleted once the new keys are committed (see env.py);
+    # if the migration fails, they are all still in place for the next run
+    legacy_paths = set(moved)
+    context.config.attributes.setdefault('after_commit', []).append(lambda: remove_legacy_files(legacy_paths))
+
+
+def downgrade():
+    storage_path = get_file_storage_path()
+    bind = op.get_bind()
+
+    # Copy stored blobs back to the legacy folders under their key as filename
+    if storage_path:
+        for column, folder in FILE_COLUMNS.items():
+            rows = bind.execute(sa.text(f"SELECT {column} FROM jobs WHERE {column} IS NOT NULL AND length({column}) >= 64")).fetchall()
+            for (key,) in rows:
+                source = blob_path(storage_path, key[:64])
+                target = os.path.join(storage_path, folder, key)
+                if os.path.isfile(source) and not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copy2(source, target)
+
+        setting = bind.execute(sa.text("SELECT value FROM settings WHERE key = 'default_resume'")).fetchone()
+        if setting and len(setting.value) >= 64:
+            source = blob_path(storage_path, setting.value[:64])
+            target = os.path.join(storage_path, 'Resumes', setting.value)
+            if os.path.isfile(source) and not os.path.exists(target):
+                shutil.copy2(source, target)
+
+    if bind.dialect.name != 'sqlite':
+        for column in FILE_COLUMNS:
+            op.alter_column('jobs', column, existing_type=sa.String(length=80), type_=sa.String(length=50))
+
+    op.drop_table('stored_files', if_exists=True)
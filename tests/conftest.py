@@ -0,0 +1,129 @@
+import os
+import sys
+
+# config.py reads the environment when it is imported, and ProductionConfig refuses
+# to load without a SECRET_KEY, so these have to be set before the app is imported
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ['TASK_WORKER_ENABLED'] = 'false'
+os.environ['RCLONE_CATALOG_REFRESH'] = '0'
+os.environ['BACKUP_SCHEDULE_INTERVAL'] = '0'
+os.environ.pop('SQLITE_REPLICA_TARGET', None)
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import config
+from app import create_app, db as _db
+from app.blueprints.main import job_count_cache
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app with its own APP_FOLDER (database and file store) under tmp_path"""
+    monkeypatch.setattr(config.Config, 'APP_FOLDER', str(tmp_path / 'JobTracker'))
+    app = create_app('development')
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    # Job totals are cached per process; don't let one test's counts leak into the next
+    job_count_cache.clear()
+    with app.app_context():
+        yield app
+        _db.session.remove()
+        _db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def make_jobs(db):
+    """Insert count jobs (with notes and activities) and return them, oldest first"""
+    from app.models import Job, JobActivities, JobNotes
+
+    def make(count, status='Open', is_draft=False, notes=1, activities=1, start=None):
+        start = start or datetime(2025, 1, 1, 9, 0)
+        jobs = []
+        for i in range(count):
+            created = start + timedelta(hours=i)
+            job = Job(company=f'Company {i}', title=f'Engineer {i}', location='Remote',
+                      description=f'<p>Python &amp; SQL role number {i}</p>',
+                      posting_status=status, is_draft=is_draft, created_dt=created)
+            for n in range(notes):
+                job.notes.append(JobNotes(content=f'<p>Note {n} for job {i}</p>',
+                                          created_at=created + timedelta(minutes=n + 1)))
+            for a in range(activities):
+                job.activities.append(JobActivities(activity_type='Application Submitted',
+                                                    activity_brief=f'Applied {a}',
+                                                    activity_json_data={},
+                                                    activity_date=created + timedelta(minutes=30 + a)))
+            jobs.append(job)
+        db.session.add_all(jobs)
+        db.session.commit()
+        return jobs
+
+    return make
+
+
+class StatementRecorder:
+    """Records the SQL statements (and their parameters) an engine executes"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self.record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self.record)
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    @property
+    def selects(self):
+        return [(sql, params) for sql, params in self.statements if sql.lstrip().upper().startswith('SELECT')]
+
+
+@pytest.fixture
+def record_statements(db):
+    return lambda: StatementRecorder(db.engine)
+
+
+FAKE_RCLONE = os.path.join(os.path.dirname(__file__), 'fake_rclone.py')
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """A remote named "remote" backed by tmp_path/remotes/remote"""
+    root = tmp_path / 'remotes'
+    (root / 'remote').mkdir(parents=True)
+    monkeypatch.setenv('FAKE_RCLONE_ROOT', str(root))
+    monkeypatch.setenv('FAKE_RCLONE_LOG', str(tmp_path / 'rclone.log'))
+    return root / 'remote'
+
+
+@pytest.fixture
+def rclone_exe(tmp_path, remote):
+    """tests/fake_rclone.py behind an executable named rclone"""
+    exe = tmp_path / 'bin' / 'rclone'
+    exe.parent.mkdir()
+    exe.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_RCLONE}" "$@"\n')
+    exe.chmod(0o755)
+    return str(exe)
+
+
+@pytest.fixture
+def rclone_conf(tmp_path):
+    conf = tmp_path / 'rclone.conf'
+    conf.write_text('[remote]\ntype = local\n')
+    return str(conf)
@@ -0,0 +1,238 @@
+"""
+Stand-in for the rclone executable, covering the commands and rc API calls the
+backends in app/services/rclone_backend.py use. Remote "name:" maps to the
+directory $FAKE_RCLONE_ROOT/name. Each invocation appends its argv to
+$FAKE_RCLONE_LOG as a JSON line, so tests can check what was passed.
+"""
+import datetime
+import itertools
+import json
+import os
+import shutil
+import sys
+import threading
+from base64 import b64encode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+ROOT = os.environ.get('FAKE_RCLONE_ROOT', '')
+
+
+def resolve(fs: str, remote: str = '') -> str:
+    """Local path for an rclone fs ("name:path" or a local directory) and a path within it"""
+    if ':' in fs and not fs.startswith('/'):
+        name, path = fs.split(':', 1)
+        return os.path.join(ROOT, name, path, remote).rstrip('/')
+    return os.path.join(fs, remote).rstrip('/')
+
+
+def lsjson_item(path: str, rel: str) -> dict:
+    is_dir = os.path.isdir(path)
+    modified = datetime.datetime.fromtimestamp(os.path.getmtime(path), datetime.timezone.utc)
+    return {'Path': rel, 'Name': os.path.basename(path), 'Size': -1 if is_dir else os.path.getsize(path),
+            'ModTime': modified.isoformat().replace('+00:00', 'Z'), 'IsDir': is_dir}
+
+
+def list_items(base: str, recursive: bool, dirs_only: bool) -> list:
+    if not os.path.isdir(base):
+        raise FileNotFoundError('directory not found')
+    items = []
+    for directory, dirs, files in os.walk(base):
+        for name in sorted(dirs + files):
+            full = os.path.join(directory, name)
+            if dirs_only and not os.path.isdir(full):
+                continue
+            items.append(lsjson_item(full, os.path.relpath(full, base)))
+        if not recursive:
+            break
+    return items
+
+
+def copy(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    shutil.copyfile(src, dst)
+
+
+def stream_file(path: str, write):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            write(chunk)
+
+
+class RcApi:
+    """The rc commands, as called over HTTP by RcloneDaemon"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+
+    def handle(self, command: str, params: dict) -> dict:
+        if params.pop('_async', False):
+            job_id = next(self.job_ids)
+            self.jobs[job_id] = {'finished': False, 'success': False, 'error': '', 'bytes': 0}
+            threading.Thread(target=self._run_job, args=(job_id, command, params), daemon=True).start()
+            return {'jobid': job_id}
+
+        if command in ('rc/noop', 'core/version'):
+            return {'version': 'v1.66.0-fake'}
+        if command == 'config/listremotes':
+            return {'remotes': sorted(os.listdir(ROOT))}
+        if command == 'config/get':
+            return {'type': 'local'}
+        if command == 'operations/list':
+            opt = params.get('opt') or {}
+            return {'list': list_items(resolve(params['fs'], params.get('remote', '')),
+                                       opt.get('recurse'), opt.get('dirsOnly'))}
+        if command == 'operations/stat':
+            path = resolve(params['fs'], params['remote'])
+            return {'item': lsjson_item(path, params['remote']) if os.path.exists(path) else None}
+        if command == 'operations/copyfile':
+            copy(resolve(params['srcFs'], params['srcRemote']), resolve(params['dstFs'], params['dstRemote']))
+            return {}
+        if command == 'operations/deletefile':
+            os.remove(resolve(params['fs'], params['remote']))
+            return {}
+        if command == 'job/status':
+            job = self.jobs[params['jobid']]
+            return {'finished': job['finished'], 'success': job['success'], 'error': job['error'], 'output': {}}
+        if command == 'core/stats':
+            job = self.jobs[int(params['group'].split('/')[1])]
+            return {'bytes': job['bytes'], 'totalBytes': job['bytes'], 'speed': 0, 'eta': 0}
+        if command == 'job/stop':
+            return {}
+        raise ValueError(f'unknown command {command}')
+
+    def _run_job(self, job_id: int, command: str, params: dict):
+        job = self.jobs[job_id]
+        try:
+            self.handle(command, params)
+            job.update(bytes=os.path.getsize(resolve(params['dstFs'], params['dstRemote'])), success=True)
+        except Exception as e:
+            job['error'] = str(e)
+        job['finished'] = True
+
+
+def serve_rc(args: list):
+    host, port = args[args.index('--rc-addr') + 1].split(':')
+    credentials = f"{os.environ['RCLONE_RC_USER']}:{os.environ['RCLONE_RC_PASS']}"
+    expected_auth = 'Basic ' + b64encode(credentials.encode()).decode()
+    api = RcApi()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, code: int, body: bytes, content_type: str = 'application/json'):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_body(self) -> bytes:
+            if self.headers.get('Transfer-Encoding') != 'chunked':
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            body = b''
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+
+        def do_GET(self):
+            if self.headers.get('Authorization') != expected_auth:
+                return self.reply(401, b'{}')
+            # --rc-serve: GET /[remote:]/path
+            fs, path = unquote(self.path)[2:].split(']', 1)
+            local = resolve(fs, path.lstrip('/'))
+            if not os.path.isfile(local):
+                return self.reply(404, b'not found', 'text/plain')
+            self.send_response(200)
+            self.send_header('Content-Length', str(os.path.getsize(local)))
+            self.end_headers()
+            stream_file(local, self.wfile.write)
+
+        def do_POST(self):
+            body = self.read_body()
+            if self.headers.get('Authorization') != expected_auth:
+                return self.reply(401, b'{}')
+            url = urlparse(self.path)
+            try:
+                if url.path == '/operations/uploadfile':
+                    query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                    boundary = self.headers['Content-Type'].split('boundary=')[1].encode()
+                    head, data = body.split(b'--' + boundary)[1].split(b'\r\n\r\n', 1)
+                    filename = head.decode().split('filename="')[1].split('"')[0]
+                    dst = resolve(query['fs'], os.path.join(query.get('remote', ''), filename))
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    with open(dst, 'wb') as f:
+                        f.write(data[:-2])
+                    result = {}
+                else:
+                    result = api.handle(url.path.lstrip('/'), json.loads(body or b'{}'))
+            except Exception as e:
+                return self.reply(500, json.dumps({'error': str(e)}).encode())
+            self.reply(200, json.dumps(result).encode())
+
+    ThreadingHTTPServer((host, int(port)), Handler).serve_forever()
+
+
+def fail(message: str, code: int = 1):
+    print(f'ERROR : {message}', file=sys.stderr)
+    sys.exit(code)
+
+
+def main(args: list):
+    if os.environ.get('FAKE_RCLONE_LOG'):
+        with open(os.environ['FAKE_RCLONE_LOG'], 'a') as log:
+            log.write(json.dumps(args) + '\n')
+    if '--config' in args:
+        index = args.index('--config')
+        del args[index:index + 2]
+    command, rest = args[0], args[1:]
+    flags = [arg for arg in rest if arg.startswith('--')]
+    positional = [arg for arg in rest if not arg.startswith('--')]
+
+    if command == 'version':
+        print('rclone v1.66.0-fake')
+    elif command == 'rcd':
+        serve_rc(rest)
+    elif command == 'listremotes':
+        for name in sorted(os.listdir(ROOT)):
+            print(f'{name}:')
+    elif command == 'lsjson':
+        path = resolve(positional[0])
+        if '--stat' in flags:
+            if not os.path.exists(path):
+                fail(f'{positional[0]}: object not found', 3)
+            print(json.dumps(lsjson_item(path, os.path.basename(path))))
+        else:
+            print(json.dumps(list_items(path, '--recursive' in flags, '--dirs-only' in flags)))
+    elif command == 'copyto':
+        src, dst = resolve(positional[0]), resolve(positional[1])
+        copy(src, dst)
+        if '--use-json-log' in flags:
+            size = os.path.getsize(dst)
+            stats = {'bytes': size, 'totalBytes': size, 'speed': 0, 'eta': 0}
+            print(json.dumps({'level': 'notice', 'msg': 'stats', 'stats': stats}), file=sys.stderr)
+    elif command == 'rcat':
+        dst = resolve(positional[0])
+        data = sys.stdin.buffer.read()
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst, 'wb') as f:
+            f.write(data)
+    elif command == 'cat':
+        src = resolve(positional[0])
+        if not os.path.isfile(src):
+            fail(f'{positional[0]}: object not found', 3)
+        stream_file(src, sys.stdout.buffer.write)
+    elif command == 'delete':
+        os.remove(resolve(positional[0]))
+    else:
+        fail(f'unsupported command {command}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
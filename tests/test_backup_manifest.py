@@ -0,0 +1,168 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+from app.blueprints.backup import write_backup_archive
+from app.services.backup_manifest_service import BackupManifestService
+
+
+def write_files(app, files):
+    files_dir = app.config['FILE_STORAGE_PATH']
+    for name, content in files.items():
+        path = os.path.join(files_dir, name)
+        if content is None:
+            os.remove(path)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+
+def rewrite(archive, dest, replace=None, drop=(), manifest=None):
+    """Copy of archive with members replaced, added or dropped, and the manifest edited by manifest(dict)"""
+    replace = dict(replace or {})
+    with zipfile.ZipFile(archive) as source, zipfile.ZipFile(dest, 'w') as target:
+        for info in source.infolist():
+            if info.filename in drop:
+                continue
+            data = replace.pop(info.filename, None)
+            if data is None:
+                data = source.read(info)
+            if info.filename == 'manifest.json' and manifest:
+                edited = json.loads(data)
+                manifest(edited)
+                data = json.dumps(edited).encode()
+            target.writestr(info, data, compress_type=info.compress_type)
+        for name, data in replace.items():
+            target.writestr(name, data)
+    return str(dest)
+
+
+@pytest.fixture
+def archive(app, make_jobs, tmp_path):
+    """A full backup of three jobs and three files"""
+    make_jobs(3)
+    write_files(app, {'resume.pdf': b'%PDF resume', 'letters/cover.txt': b'Dear hiring manager',
+                      'same.txt': b'unchanged'})
+    path = tmp_path / 'backup.zip'
+    write_backup_archive(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def service(app):
+    return BackupManifestService()
+
+
+def strip_to_version_1_0(manifest):
+    for key in ('entries', 'files', 'tables'):
+        manifest.pop(key, None)
+    manifest['backup_version'] = '1.0'
+
+
+def test_fresh_archive_verifies_with_a_checksum_for_every_entry(service, archive):
+    report = service.verify_archive(archive)
+    assert report['ok'], report['errors']
+    assert report['errors'] == [] and report['warnings'] == []
+    # Every member but the manifest itself
+    assert report['entries'] == 4
+    assert report['checksums'] == report['entries']
+    assert report['tables']['jobs'] == 3
+
+
+def test_tampered_member_fails_its_checksum(service, archive, tmp_path):
+    # Same size, valid CRC: only the SHA-256 in the manifest catches it
+    tampered = rewrite(archive, tmp_path / 'tampered.zip', replace={'JobTrackerFiles/same.txt': b'UNCHANGED'})
+    report = service.verify_archive(tampered)
+    assert not report['ok']
+    assert 'JobTrackerFiles/same.txt does not match the SHA-256 in the manifest' in report['errors']
+
+
+def test_members_must_match_the_manifest_listing(service, archive, tmp_path):
+    extra = rewrite(archive, tmp_path / 'extra.zip', replace={'JobTrackerFiles/extra.txt': b'added later'})
+    report = service.verify_archive(extra)
+    assert report['errors'] == ['JobTrackerFiles/extra.txt is in the archive but not in the manifest']
+
+    missing = rewrite(archive, tmp_path / 'missing.zip', drop={'JobTrackerFiles/resume.pdf'})
+    report = service.verify_archive(missing)
+    assert report['errors'] == ['JobTrackerFiles/resume.pdf is listed in the manifest but missing from the archive']
+
+
+def test_changed_table_row_counts_are_reported(service, archive, tmp_path):
+    def inflate(manifest):
+        manifest['tables']['jobs'] = 4
+    report = service.verify_archive(rewrite(archive, tmp_path / 'counts.zip', manifest=inflate))
+    assert report['errors'] == ['Table jobs has 3 rows but the manifest records 4']
+
+
+def test_pre_1_1_manifest_gives_warnings_only(service, archive, tmp_path):
+    report = service.verify_archive(rewrite(archive, tmp_path / 'old.zip', manifest=strip_to_version_1_0))
+    assert report['ok'] and report['errors'] == []
+    assert report['checksums'] == 0
+    assert len(report['warnings']) == 2
+    assert report['backup_version'] == '1.0'
+
+
+def test_corrupt_archive_is_not_ok(service, tmp_path):
+    path = tmp_path / 'broken.zip'
+    path.write_bytes(b'not a zip file')
+    report = service.verify_archive(str(path))
+    assert not report['ok']
+    assert report['errors'][0].startswith('Invalid backup archive')
+
+
+def test_verify_command_exit_status(app, archive, tmp_path):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['backup', 'verify', archive])
+    assert result.exit_code == 0, result.output
+    assert '4 entries match the manifest' in result.output
+
+    tampered = rewrite(archive, tmp_path / 'tampered.zip', replace={'JobTrackerFiles/same.txt': b'UNCHANGED'})
+    result = runner.invoke(args=['backup', 'verify', tampered])
+    assert result.exit_code == 1
+    assert 'does not match the SHA-256' in result.output
+
+
+@pytest.fixture
+def later_archive(app, make_jobs, archive, tmp_path):
+    """Two more jobs, resume.pdf deleted, cover letter edited (same size) and new.txt added"""
+    make_jobs(2)
+    write_files(app, {'resume.pdf': None, 'letters/cover.txt': b'Dear HIRING manager', 'new.txt': b'brand new'})
+    path = tmp_path / 'later.zip'
+    write_backup_archive(str(path))
+    return str(path)
+
+
+def test_compare_two_archives(service, archive, later_archive):
+    result = service.compare(later_archive, base_path=archive)
+    assert result['files'] == {'added': ['new.txt'], 'removed': ['resume.pdf'],
+                               'changed': ['letters/cover.txt'], 'unchanged': 1}
+    assert result['bytes'] == {'added': len(b'brand new'), 'removed': len(b'%PDF resume')}
+    assert result['tables']['jobs'] == {'base': 3, 'target': 5, 'delta': 2}
+    assert result['base']['label'] == 'backup.zip' and result['target']['label'] == 'later.zip'
+
+
+def test_compare_archive_with_live_data(service, archive, later_archive):
+    # Restoring the first backup now would undo the later changes
+    result = service.compare(archive)
+    assert result['files'] == {'added': ['resume.pdf'], 'removed': ['new.txt'],
+                               'changed': ['letters/cover.txt'], 'unchanged': 1}
+    assert result['tables']['jobs'] == {'base': 5, 'target': 3, 'delta': -2}
+    assert all(rows['delta'] < 0 for rows in result['tables'].values())
+    assert result['base']['label'] == 'live'
+
+
+def test_compare_pre_1_1_archive_hashes_its_members(service, archive, later_archive, tmp_path):
+    old = rewrite(archive, tmp_path / 'old.zip', manifest=strip_to_version_1_0)
+    result = service.compare(old)
+    assert result['files'] == {'added': ['resume.pdf'], 'removed': ['new.txt'],
+                               'changed': ['letters/cover.txt'], 'unchanged': 1}
+    assert result['tables']['jobs'] == {'base': 5, 'target': 3, 'delta': -2}
+
+
+def test_identical_states_have_no_differences(service, archive):
+    result = service.compare(archive)
+    assert result['files'] == {'added': [], 'removed': [], 'changed': [], 'unchanged': 3}
+    assert result['tables'] == {}
@@ -0,0 +1,216 @@
+import glob
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+from app.blueprints.backup import backup_database_sqlite, restore_database_sqlite
+from app.utils.zip_extract import ExtractionLimits, InvalidArchiveError, check_archive, extract_member
+
+
+def job_titles(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        return sorted(row[0] for row in connection.execute('SELECT title FROM jobs'))
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def live_db(app, make_jobs):
+    make_jobs(3)
+    path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+    # The app's pooled connection keeps the new rows in app.db-wal, not app.db itself
+    assert os.path.getsize(f'{path}-wal') > 0
+    return path
+
+
+def test_restore_keeps_a_snapshot_of_the_current_database(app, db, make_jobs, live_db, tmp_path):
+    extract_dir = tmp_path / 'extract'
+    extract_dir.mkdir()
+    backup_database_sqlite(live_db, str(extract_dir / 'app.db'))
+    make_jobs(2, start=None)
+
+    # Another gunicorn worker still has the database open, so closing this process's
+    # connections doesn't checkpoint the WAL into app.db
+    other_worker = sqlite3.connect(live_db)
+    other_worker.execute('SELECT COUNT(*) FROM jobs').fetchall()
+    db.session.close()
+    db.engine.dispose()
+    try:
+        restore_database_sqlite(str(extract_dir))
+    finally:
+        other_worker.close()
+
+    assert len(job_titles(live_db)) == 3
+    safety_copies = glob.glob(f'{live_db}.backup_*')
+    assert len(safety_copies) == 1
+    # The safety copy has everything committed, including what was still in the WAL
+    assert len(job_titles(safety_copies[0])) == 5
+
+
+def test_failed_restore_leaves_the_database_alone(app, db, live_db, tmp_path):
+    extract_dir = tmp_path / 'extract'
+    extract_dir.mkdir()
+    (extract_dir / 'app.db').write_bytes(b'not a database' * 512)
+    before = job_titles(live_db)
+
+    db.session.close()
+    db.engine.dispose()
+    with pytest.raises(RuntimeError, match='left unchanged'):
+        restore_database_sqlite(str(extract_dir))
+
+    assert job_titles(live_db) == before
+
+
+@pytest.fixture
+def backup_archive(app, make_jobs, tmp_path):
+    """A full backup holding three jobs and one attachment"""
+    from app.blueprints.backup import write_backup_archive
+    make_jobs(3)
+    files_dir = app.config['FILE_STORAGE_PATH']
+    os.makedirs(files_dir, exist_ok=True)
+    with open(os.path.join(files_dir, 'resume.pdf'), 'wb') as f:
+        f.write(b'backed up')
+    archive = tmp_path / 'backup.zip'
+    write_backup_archive(str(archive))
+    with open(os.path.join(files_dir, 'resume.pdf'), 'wb') as f:
+        f.write(b'current')
+    return archive
+
+
+def post_import(client, archive):
+    with open(archive, 'rb') as f:
+        return client.post('/backup/import', data={'backup_file': (f, 'backup.zip')},
+                           content_type='multipart/form-data')
+
+
+def test_import_replaces_database_and_files(app, client, backup_archive):
+    response = post_import(client, backup_archive)
+    assert response.status_code == 200, response.get_json()
+    with open(os.path.join(app.config['FILE_STORAGE_PATH'], 'resume.pdf'), 'rb') as f:
+        assert f.read() == b'backed up'
+
+
+def test_failed_database_import_leaves_the_files_alone(app, client, backup_archive, monkeypatch):
+    def fail(extract_dir):
+        raise RuntimeError('Could not restore the database, the current database was left unchanged')
+    monkeypatch.setattr('app.blueprints.backup.restore_database_sqlite', fail)
+
+    response = post_import(client, backup_archive)
+    assert response.status_code == 500
+    files_dir = app.config['FILE_STORAGE_PATH']
+    with open(os.path.join(files_dir, 'resume.pdf'), 'rb') as f:
+        assert f.read() == b'current'
+    # Neither a staged tree nor a retired one is left behind
+    assert glob.glob(f'{files_dir}.*') == []
+
+
+def with_extra_members(archive, dest, members):
+    """Copy of a backup archive with extra (ZipInfo or name, data, compress_type) members"""
+    with zipfile.ZipFile(archive) as source, zipfile.ZipFile(dest, 'w') as target:
+        for info in source.infolist():
+            target.writestr(info, source.read(info), compress_type=info.compress_type)
+        for name, data, compress_type in members:
+            target.writestr(name, data, compress_type=compress_type)
+    return dest
+
+
+def corrupt_member_data(archive, original, replacement):
+    data = archive.read_bytes()
+    assert data.count(original) == 1
+    archive.write_bytes(data.replace(original, replacement))
+
+
+def live_state(app):
+    """The database rows, attachment tree and any restore leftovers beside them"""
+    files_dir = app.config['FILE_STORAGE_PATH']
+    db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+    files = {}
+    for root, _, names in os.walk(files_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, files_dir)] = f.read()
+    return job_titles(db_path), files, glob.glob(f'{files_dir}.*') + glob.glob(f'{db_path}.backup_*')
+
+
+UNSAFE_NAMES = ['JobTrackerFiles/../../evil.txt', '../evil.txt', '/etc/evil.txt',
+                'JobTrackerFiles\\..\\evil.txt', 'C:/evil.txt', 'c:evil.txt']
+
+
+@pytest.mark.parametrize('name', UNSAFE_NAMES)
+def test_import_rejects_unsafe_member_names(app, client, backup_archive, tmp_path, name):
+    archive = with_extra_members(backup_archive, tmp_path / 'unsafe.zip', [(zipfile.ZipInfo(name), b'x', zipfile.ZIP_STORED)])
+    before = live_state(app)
+
+    response = post_import(client, archive)
+    assert response.status_code == 400
+    assert 'Unsafe path' in response.get_json()['error']
+    assert live_state(app) == before
+    assert not os.path.exists(tmp_path / 'evil.txt')
+
+
+@pytest.mark.parametrize('config, members, message', [
+    ({'BACKUP_MAX_ENTRIES': 3},
+     [(f'JobTrackerFiles/{i}.txt', b'x', zipfile.ZIP_STORED) for i in range(3)], 'entries'),
+    ({'BACKUP_MAX_ENTRY_SIZE': 64 * 1024},
+     [('JobTrackerFiles/big.txt', os.urandom(128 * 1024), zipfile.ZIP_STORED)], 'unpacks to'),
+    ({'BACKUP_MAX_COMPRESSION_RATIO': 100},
+     [('JobTrackerFiles/zeros.txt', bytes(2 * 1024 * 1024), zipfile.ZIP_DEFLATED)], 'suspicious compression ratio'),
+])
+def test_import_rejects_archives_over_the_limits(app, client, backup_archive, tmp_path, config, members, message):
+    app.config.update(config)
+    archive = with_extra_members(backup_archive, tmp_path / 'over.zip', members)
+    before = live_state(app)
+
+    response = post_import(client, archive)
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+    assert live_state(app) == before
+
+
+def test_import_rejects_a_corrupted_member(app, client, backup_archive, tmp_path):
+    content = b'cover letter ' * 64
+    archive = with_extra_members(backup_archive, tmp_path / 'corrupt.zip',
+                                 [('JobTrackerFiles/cover.txt', content, zipfile.ZIP_STORED)])
+    corrupt_member_data(archive, content, content[:-1] + b'!')
+    before = live_state(app)
+
+    response = post_import(client, archive)
+    assert response.status_code == 400
+    assert 'cover.txt is corrupt' in response.get_json()['error']
+    assert live_state(app) == before
+
+
+def test_check_archive_reads_only_the_central_directory(tmp_path):
+    archive = tmp_path / 'bomb.zip'
+    with zipfile.ZipFile(archive, 'w') as zipf:
+        zipf.writestr('zeros.bin', bytes(8 * 1024 * 1024), compress_type=zipfile.ZIP_DEFLATED)
+    with zipfile.ZipFile(archive) as zipf:
+        # 8 MB of zeros deflates about 1000:1
+        assert set(check_archive(zipf, ExtractionLimits(max_ratio=2000))) == {'zeros.bin'}
+        with pytest.raises(InvalidArchiveError, match='suspicious compression ratio'):
+            check_archive(zipf, ExtractionLimits(max_ratio=100))
+        with pytest.raises(InvalidArchiveError, match='limit'):
+            check_archive(zipf, ExtractionLimits(max_total_size=1024 * 1024, max_ratio=2000))
+        with pytest.raises(InvalidArchiveError, match='missing app.db'):
+            check_archive(zipf, ExtractionLimits(max_ratio=2000), required=('app.db',))
+
+
+def test_extract_member_leaves_the_destination_alone_on_a_bad_crc(tmp_path):
+    content = b'attachment ' * 100
+    archive = tmp_path / 'crc.zip'
+    with zipfile.ZipFile(archive, 'w') as zipf:
+        zipf.writestr('cover.txt', content, compress_type=zipfile.ZIP_STORED)
+    corrupt_member_data(archive, content, content[:-1] + b'!')
+    dest = tmp_path / 'out' / 'cover.txt'
+    dest.parent.mkdir()
+    dest.write_bytes(b'existing')
+
+    with zipfile.ZipFile(archive) as zipf:
+        with pytest.raises(InvalidArchiveError, match='corrupt'):
+            extract_member(zipf, zipf.getinfo('cover.txt'), str(dest))
+    assert dest.read_bytes() == b'existing'
+    assert os.listdir(dest.parent) == ['cover.txt']
@@ -0,0 +1,71 @@
+import os
+import zipfile
+
+import pytest
+
+from app.blueprints.backup import run_cloud_upload, upload_archive_streaming
+from app.services import rclone_backend
+from app.services.backup_manifest_service import BackupManifestService
+from app.services.cloud_backup_service import CloudBackupService
+
+
+@pytest.fixture(params=['subprocess', 'rcd'])
+def cloud(request, app, rclone_exe, rclone_conf, monkeypatch):
+    """CloudBackupService finding the fake rclone on PATH, with each backend"""
+    monkeypatch.setenv('PATH', os.path.dirname(rclone_exe) + os.pathsep + os.environ.get('PATH', ''))
+    app.config.update(RCLONE_CONFIG_PATH=rclone_conf, RCLONE_BACKEND=request.param, RCLONE_UPLOAD_MODE='stream')
+    CloudBackupService.invalidate_cache()
+    yield CloudBackupService()
+    CloudBackupService.invalidate_cache()
+    daemon = rclone_backend._daemons.pop((rclone_exe, rclone_conf), None)
+    if daemon:
+        daemon.stop()
+
+
+def remote_files(remote):
+    return sorted(str(path.relative_to(remote)) for path in remote.rglob('*') if path.is_file())
+
+
+def test_streamed_upload_is_a_valid_backup(app, make_jobs, cloud, remote):
+    make_jobs(3)
+    files_dir = app.config['FILE_STORAGE_PATH']
+    os.makedirs(os.path.join(files_dir, 'letters'), exist_ok=True)
+    with open(os.path.join(files_dir, 'resume.pdf'), 'wb') as f:
+        f.write(os.urandom(2 * 1024 * 1024))
+    with open(os.path.join(files_dir, 'letters', 'cover.txt'), 'wb') as f:
+        f.write(b'Dear hiring manager')
+
+    result = run_cloud_upload({'remote_name': 'remote', 'custom_path': 'backups'}, lambda **progress: None)
+    name = result['backup_filename']
+    assert remote_files(remote) == [f'backups/{name}']
+    assert result['file_info']['path'] == f'remote:backups/{name}'
+
+    uploaded = str(remote / 'backups' / name)
+    with zipfile.ZipFile(uploaded) as zipf:
+        assert zipf.testzip() is None
+        assert sorted(zipf.namelist()) == ['JobTrackerFiles/letters/cover.txt', 'JobTrackerFiles/resume.pdf',
+                                           'app.db', 'manifest.json']
+    report = BackupManifestService().verify_archive(uploaded)
+    assert report['ok'], report['errors']
+    assert report['checksums'] == report['entries'] == 3
+    assert report['tables']['jobs'] == 3
+
+
+def test_failure_mid_archive_leaves_nothing_on_the_remote(app, cloud, remote, tmp_path):
+    source = tmp_path / 'large.bin'
+    source.write_bytes(os.urandom(3 * 1024 * 1024))
+
+    def file_entries():
+        yield 'JobTrackerFiles/large.bin', str(source)
+        raise OSError('disk went away')
+
+    progress = []
+    success, message, file_info, _ = upload_archive_streaming(
+        cloud, 'remote', 'backups', 'job_tracker_backup_20250301_020000.zip',
+        file_entries(), None, 60, lambda **fields: progress.append(fields)
+    )
+    assert not success and 'disk went away' in message
+    assert file_info == {}
+    # Part of the archive had already been handed to rclone
+    assert max(fields.get('bytes') or 0 for fields in progress) > 1024 * 1024
+    assert remote_files(remote) == []
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.db_replication_service import (DatabaseReplicaService, DatabaseReplicator, LocalReplicaTarget,
+                                                 ReplicationError)
+
+
+def job_count(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        return connection.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def replica(app, tmp_path):
+    # Low enough that the replicator checkpoints every few batches
+    app.config.update(SQLITE_REPLICA_CHECKPOINT_PAGES=20, SQLITE_REPLICA_CHECKPOINT_INTERVAL=3600)
+    target = LocalReplicaTarget(str(tmp_path / 'replica'))
+    replicator = DatabaseReplicator(app, target)
+    checkpoints = []
+    real_checkpoint = replicator.checkpoint
+
+    def checkpoint():
+        checkpoints.append(replicator.seq)
+        real_checkpoint()
+
+    replicator.checkpoint = checkpoint
+    replicator.checkpoints = checkpoints
+    yield replicator, DatabaseReplicaService(target)
+    replicator.close()
+    if replicator.lock_file:
+        replicator.lock_file.close()
+    if replicator.db_fd is not None:
+        os.close(replicator.db_fd)
+
+
+@pytest.fixture
+def replicated_batches(app, make_jobs, replica):
+    """
+    Three jobs before replication starts, then ten batches of two, each followed by a
+    replication pass. Returns [(time after the pass, jobs in the database)].
+    """
+    replicator, _ = replica
+    make_jobs(3)
+    replicator.step()
+    assert replicator.generation is not None
+
+    history = []
+    total = 3
+    for batch in range(10):
+        make_jobs(2, start=datetime(2025, 2, 1) + timedelta(days=batch))
+        total += 2
+        replicator.step()
+        history.append((datetime.now(timezone.utc), total))
+        # Segment times have microsecond precision; keep each batch on its own side of a target time
+        time.sleep(0.01)
+    return history
+
+
+def test_restore_latest_and_point_in_time(replica, replicated_batches, tmp_path):
+    replicator, service = replica
+    assert replicator.seq == 10
+    # Checkpoints ran between batches and SQLite restarted the WAL after them; frames
+    # written on either side of a restart still replay
+    assert len(replicator.checkpoints) >= 2 and replicator.checkpoints[0] < 10
+    assert replicator.header.checkpoint_seq > 0
+
+    latest = tmp_path / 'latest.db'
+    recovery = service.restore(str(latest))
+    assert recovery['segments'] == 10
+    assert job_count(latest) == 23
+
+    mid_time, mid_count = replicated_batches[4]
+    point_in_time = tmp_path / 'mid.db'
+    recovery = service.restore(str(point_in_time), target_time=mid_time)
+    assert recovery['segments'] == 5
+    assert job_count(point_in_time) == mid_count == 13
+
+
+def test_restore_stops_at_a_gap_in_the_segments(replica, replicated_batches, tmp_path):
+    replicator, service = replica
+    (generation,) = service.list_generations()
+    missing = [s for s in generation['segments'] if s['seq'] == 6][0]
+    os.remove(tmp_path / 'replica' / missing['name'])
+
+    (generation,) = service.list_generations()
+    assert [s['seq'] for s in generation['segments']] == list(range(6))
+
+    restored = tmp_path / 'restored.db'
+    recovery = service.restore(str(restored))
+    assert recovery['segments'] == 6
+    assert job_count(restored) == replicated_batches[5][1] == 15
+
+
+def test_restore_before_the_first_generation_fails(replica, replicated_batches, tmp_path):
+    _, service = replica
+    with pytest.raises(ReplicationError, match='No database replica covers that time'):
+        service.restore(str(tmp_path / 'early.db'), target_time=datetime(2000, 1, 1, tzinfo=timezone.utc))
+    assert not os.path.exists(tmp_path / 'early.db')
@@ -0,0 +1,69 @@
+"""
+The streaming ZIP export keeps memory flat however large JobTrackerFiles is.
+Each export runs in a fresh interpreter so its peak RSS (ru_maxrss) covers
+only that export; a small tree gives the baseline.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+MB = 1024 * 1024
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EXPORT_SCRIPT = textwrap.dedent('''
+    import resource, sys
+    from app import create_app
+    app = create_app('development')
+    app.config['TESTING'] = True
+    response = app.test_client().get('/backup/export-stream', buffered=False)
+    assert response.status_code == 200, response.status_code
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    print(size, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+''')
+
+
+def make_tree(app_folder, total_bytes, file_size=8 * MB):
+    """Half incompressible .pdf files (stored) and half compressible .txt files (deflated)"""
+    folder = os.path.join(app_folder, 'JobTrackerFiles', 'Job_Descriptions')
+    os.makedirs(folder, exist_ok=True)
+    line = b'Senior engineer, distributed systems, Python and SQL. ' * 16 + b'\n'
+    for i in range(max(1, total_bytes // file_size)):
+        extension = 'pdf' if i % 2 == 0 else 'txt'
+        with open(os.path.join(folder, f'synthetic_{i:04d}.{extension}'), 'wb') as f:
+            for _ in range(file_size // MB):
+                f.write(os.urandom(MB) if extension == 'pdf' else line * (MB // len(line) + 1))
+
+
+def export_peak_rss(app_folder):
+    env = dict(os.environ, APP_FOLDER=app_folder, SECRET_KEY='test-secret-key', TASK_WORKER_ENABLED='false',
+               BACKUP_SCHEDULE_INTERVAL='0', RCLONE_CATALOG_REFRESH='0')
+    env.pop('SQLITE_REPLICA_TARGET', None)
+    output = subprocess.run([sys.executable, '-c', EXPORT_SCRIPT], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, timeout=1800)
+    assert output.returncode == 0, output.stderr
+    archive_size, peak_rss = map(int, output.stdout.split()[-2:])
+    return archive_size, peak_rss
+
+
+@pytest.mark.parametrize('tree_size', [
+    pytest.param(256 * MB, id='256MB'),
+    pytest.param(1024 * MB, id='1GB', marks=pytest.mark.benchmark),
+])
+def test_export_memory_does_not_grow_with_tree_size(tmp_path, tree_size):
+    small, large = str(tmp_path / 'small'), str(tmp_path / 'large')
+    make_tree(small, 1 * MB, file_size=1 * MB)
+    make_tree(large, tree_size)
+
+    _, baseline_rss = export_peak_rss(small)
+    archive_size, peak_rss = export_peak_rss(large)
+
+    # Building the archive in memory would need at least the archive size again
+    assert archive_size > tree_size // 3
+    growth = peak_rss - baseline_rss
+    print(f'\n{tree_size // MB} MB tree -> {archive_size // MB} MB archive: '
+          f'peak RSS {peak_rss // MB} MB, {growth // MB} MB over a 1 MB tree')
+    assert growth < 32 * MB, f'peak RSS grew by {growth // MB} MB exporting {tree_size // MB} MB'
@@ -0,0 +1,80 @@
+import io
+import os
+import sqlite3
+
+import pytest
+
+from app.models import StoredFile
+from app.services.file_store_service import FileStoreService
+
+
+@pytest.fixture
+def store(app):
+    return FileStoreService()
+
+
+def test_identical_content_is_stored_once(store, db):
+    first = store.save(io.BytesIO(b'resume'), 'resume.pdf')
+    second = store.save(io.BytesIO(b'resume'), 'other.PDF')
+    db.session.commit()
+
+    assert first == second and first.endswith('.pdf')
+    assert db.session.get(StoredFile, store.parse_key(first)).ref_count == 2
+    assert os.path.isfile(store.resolve_path(first))
+
+
+def test_purge_removes_unreferenced_blobs(store, db):
+    kept = store.save(io.BytesIO(b'kept'), 'kept.pdf')
+    dropped = store.save(io.BytesIO(b'dropped'), 'dropped.pdf')
+    db.session.commit()
+    store.release(dropped)
+    db.session.commit()
+
+    assert store.purge_unreferenced() == 1
+    assert not os.path.exists(store.resolve_path(dropped))
+    assert db.session.get(StoredFile, store.parse_key(dropped)) is None
+    assert os.path.isfile(store.resolve_path(kept))
+
+
+def test_purge_removes_the_blob_while_holding_the_write_lock(store, db, app, monkeypatch):
+    """Another worker saving the same content must wait until the blob is gone, then re-add it"""
+    key = store.save(io.BytesIO(b'resume'), 'resume.pdf')
+    db.session.commit()
+    store.release(key)
+    db.session.commit()
+
+    db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+    writes_blocked = []
+    real_remove = os.remove
+
+    def remove(path):
+        other_worker = sqlite3.connect(db_path, timeout=0)
+        try:
+            other_worker.execute('UPDATE stored_files SET ref_count = ref_count + 1')
+            writes_blocked.append(False)
+        except sqlite3.OperationalError as e:
+            writes_blocked.append('locked' in str(e))
+        finally:
+            other_worker.close()
+        real_remove(path)
+
+    monkeypatch.setattr('app.services.file_store_service.os.remove', remove)
+    assert store.purge_unreferenced() == 1
+    assert writes_blocked == [True]
+
+
+def test_purge_sweeps_blobs_left_by_a_rolled_back_save(store, db):
+    kept = store.save(io.BytesIO(b'kept'), 'kept.pdf')
+    db.session.commit()
+    orphan = store.save(io.BytesIO(b'orphan'), 'orphan.pdf')
+    db.session.rollback()
+    assert os.path.isfile(store.resolve_path(orphan))
+
+    assert store.purge_unreferenced() == 1
+    assert not os.path.exists(store.resolve_path(orphan))
+    assert os.path.isfile(store.resolve_path(kept))
+
+    # Saving the same content again stores it afresh
+    again = store.save(io.BytesIO(b'orphan'), 'orphan.pdf')
+    db.session.commit()
+    assert os.path.isfile(store.resolve_path(again))
@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.mark.parametrize('url', ['/?status=open', '/?status=all&sort=activity', '/all'])
+def test_query_count_does_not_grow_with_page_size(client, make_jobs, record_statements, url):
+    make_jobs(30, notes=2, activities=3)
+    separator = '&' if '?' in url else '?'
+    # Warm the job count cache so both requests run the same statements
+    client.get(f'{url}{separator}per_page=5')
+
+    counts = {}
+    for per_page in (5, 25):
+        with record_statements() as recorder:
+            response = client.get(f'{url}{separator}per_page={per_page}')
+        assert response.status_code == 200
+        assert response.data.count(b'Engineer ') >= per_page
+        counts[per_page] = len(recorder.statements)
+
+    # One query for the page, plus one each for the notes and activities of all its jobs
+    assert counts[5] == counts[25], counts
+    assert counts[25] <= 3, counts
+
+
+def test_api_list_does_not_load_children(client, make_jobs, record_statements):
+    make_jobs(12, notes=2, activities=2)
+    client.get('/api/jobs?status=all&per_page=10')
+
+    with record_statements() as recorder:
+        response = client.get('/api/jobs?status=all&per_page=10')
+    assert len(response.get_json()['jobs']) == 10
+    assert len(recorder.statements) == 1
+    assert all('job_notes' not in sql and 'job_activities' not in sql for sql, _ in recorder.statements)
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+
+from app.blueprints.main import job_list_query
+from app.models import Job
+from app.utils.pagination import KeysetPagination, decode_cursor, encode_cursor
+
+
+def page(sort_column=Job.created_dt, **kwargs):
+    return KeysetPagination(job_list_query(eager_load_children=False), sort_column, Job.id, **kwargs)
+
+
+def test_cursor_round_trip():
+    created = datetime(2025, 3, 4, 5, 6, 7)
+    assert decode_cursor(encode_cursor(created, 42)) == (created, 42)
+    assert decode_cursor('not-a-cursor') is None
+    assert decode_cursor(None) is None
+
+
+@pytest.mark.parametrize('sort_column', [Job.created_dt, Job.last_activity_at])
+def test_walks_every_job_once_in_both_directions(app, db, make_jobs, sort_column):
+    # Two batches with the same timestamps, so half the rows tie on the sort column
+    start = datetime(2025, 2, 1, 8, 0)
+    make_jobs(9, notes=0, activities=0, start=start)
+    make_jobs(9, status='Closed', notes=0, activities=0, start=start)
+    make_jobs(2, is_draft=True, notes=0, activities=0, start=start)
+    expected = [job.id for job in Job.query.filter(Job.is_draft == False)
+                .order_by(sort_column.desc(), Job.id.desc())]
+
+    pages, cursor = [], None
+    while True:
+        current = page(sort_column, per_page=4, after=cursor)
+        pages.append([job.id for job in current.items])
+        cursor = current.next_cursor
+        if not cursor:
+            break
+    assert [job_id for ids in pages for job_id in ids] == expected
+    assert [len(ids) for ids in pages] == [4, 4, 4, 4, 2]
+
+    # And back again from the last page using the before cursors
+    backwards, current = [], page(sort_column, per_page=4, after=None)
+    for _ in range(len(pages) - 1):
+        current = page(sort_column, per_page=4, after=current.next_cursor)
+    while current.prev_cursor:
+        current = page(sort_column, per_page=4, before=current.prev_cursor)
+        backwards.append([job.id for job in current.items])
+    assert backwards == list(reversed(pages[:-1]))
+    assert not current.has_prev
+
+
+def vm_steps(db, fetch):
+    """SQLite virtual machine instructions executed by fetch(), a rough measure of rows visited"""
+    steps = 0
+
+    def count():
+        nonlocal steps
+        steps += 1
+        return 0
+
+    connection = db.session.connection().connection.driver_connection
+    connection.set_progress_handler(count, 1)
+    try:
+        fetch()
+    finally:
+        connection.set_progress_handler(None, 1)
+    return steps
+
+
+@pytest.mark.parametrize('sort_column', [Job.created_dt, Job.last_activity_at])
+def test_unfiltered_page_cost_does_not_grow_with_job_count(app, db, make_jobs, sort_column):
+    make_jobs(100, notes=0, activities=0, start=datetime(2024, 1, 1))
+    middle = Job.query.order_by(Job.id).offset(50).first()
+    cursor = encode_cursor(getattr(middle, sort_column.key), middle.id)
+    small = vm_steps(db, lambda: page(sort_column, per_page=10, after=cursor))
+
+    # Ten times as many jobs, all newer than the cursor: a keyset page read off an
+    # index is the same work; sorting every non-draft job per page would be ~10x
+    make_jobs(900, notes=0, activities=0, start=datetime(2025, 1, 1))
+    large = vm_steps(db, lambda: page(sort_column, per_page=10, after=cursor))
+
+    assert large < small * 2, f'page cost grew from {small} to {large} VM steps'
@@ -0,0 +1,89 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot queries. Each request is run against a
+small database, every SELECT it issues is recorded, and its plan must not scan
+a whole table or sort the results in a temporary B-tree.
+"""
+import pytest
+
+
+def query_plan(db, sql, params):
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', tuple(params or ())).all()
+    return [row[-1] for row in rows]
+
+
+def plan_problems(plan, allow_sort=False):
+    problems = []
+    for detail in plan:
+        # FTS5 tables report "SCAN <table> VIRTUAL TABLE INDEX ..." for a MATCH lookup
+        if detail.startswith('SCAN ') and 'VIRTUAL TABLE' not in detail:
+            problems.append(detail)
+        if 'USE TEMP B-TREE' in detail and not allow_sort:
+            problems.append(detail)
+    return problems
+
+
+def assert_indexed(db, recorder, allow_sort=False):
+    assert recorder.selects, 'no SELECT statements were recorded'
+    for sql, params in recorder.selects:
+        plan = query_plan(db, sql, params)
+        problems = plan_problems(plan, allow_sort=allow_sort)
+        assert not problems, f'{problems} in the plan for:\n{sql}\nFull plan: {plan}'
+
+
+@pytest.fixture
+def jobs(make_jobs):
+    make_jobs(15, status='Open')
+    make_jobs(10, status='Closed')
+    make_jobs(3, is_draft=True)
+
+
+@pytest.mark.parametrize('url', [
+    '/?status=open&sort=created',
+    '/?status=open&sort=activity',
+    '/?status=closed&sort=created',
+    '/?status=all&sort=created',
+    '/?status=all&sort=activity',
+    '/all',
+])
+def test_job_list_pages_use_indexes(client, db, jobs, record_statements, url):
+    with record_statements() as recorder:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert_indexed(db, recorder)
+
+
+@pytest.mark.parametrize('status', ['open', 'closed', 'all'])
+@pytest.mark.parametrize('sort', ['created', 'activity'])
+def test_job_list_api_pages_use_indexes(client, db, jobs, record_statements, status, sort):
+    # First page, then the next and previous pages from its cursors
+    first = client.get(f'/api/jobs?status={status}&sort={sort}&per_page=4').get_json()
+    with record_statements() as recorder:
+        second = client.get(f'/api/jobs?status={status}&sort={sort}&per_page=4&after={first["next_cursor"]}')
+        back = client.get(f'/api/jobs?status={status}&sort={sort}&per_page=4'
+                          f'&before={second.get_json()["prev_cursor"]}')
+    assert second.status_code == 200 and back.status_code == 200
+    assert [job['id'] for job in back.get_json()['jobs']] == [job['id'] for job in first['jobs']]
+    assert_indexed(db, recorder)
+
+
+def test_job_view_uses_indexes(client, db, jobs, record_statements):
+    with record_statements() as recorder:
+        response = client.get('/jobs/1/view')
+    assert response.status_code == 200
+    assert_indexed(db, recorder)
+
+
+def test_search_uses_indexes(client, db, jobs, record_statements):
+    with record_statements() as recorder:
+        response = client.get('/jobs/search?q=python&format=json')
+    assert response.status_code == 200
+    assert response.get_json()['count'] > 0
+    # Results are ranked by bm25, which SQLite can only sort after matching
+    assert_indexed(db, recorder, allow_sort=True)
+
+
+def test_plan_problems_flags_scans_and_sorts():
+    assert plan_problems(['SCAN jobs']) == ['SCAN jobs']
+    assert plan_problems(['SEARCH jobs USING INDEX ix_jobs_draft_created (is_draft=?)',
+                          'USE TEMP B-TREE FOR ORDER BY']) == ['USE TEMP B-TREE FOR ORDER BY']
+    assert plan_problems(['SCAN jobs_fts VIRTUAL TABLE INDEX 0:M1']) == []
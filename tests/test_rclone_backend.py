@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+
+import pytest
+
+from app.services.rclone_backend import RcloneDaemon, RcloneError, RcRcloneBackend, SubprocessRcloneBackend
+
+
+@pytest.fixture
+def daemon(rclone_exe, rclone_conf):
+    daemon = RcloneDaemon(rclone_exe, rclone_conf, rclone_conf)
+    yield daemon
+    daemon.stop()
+
+
+@pytest.fixture(params=['subprocess', 'rcd'])
+def backend(request, rclone_exe, rclone_conf):
+    if request.param == 'subprocess':
+        return SubprocessRcloneBackend(rclone_exe, rclone_conf)
+    return RcRcloneBackend(request.getfixturevalue('daemon'))
+
+
+def invocations(tmp_path):
+    with open(tmp_path / 'rclone.log') as log:
+        return [json.loads(line) for line in log]
+
+
+def test_is_available_and_list_remotes(backend):
+    assert backend.is_available()
+    assert backend.list_remotes() == ['remote']
+
+
+def test_list(backend, remote):
+    (remote / 'backups' / '2024').mkdir(parents=True)
+    (remote / 'backups' / 'a.zip').write_bytes(b'a' * 10)
+    (remote / 'backups' / '2024' / 'b.zip').write_bytes(b'b' * 20)
+
+    items = {item['Path']: item for item in backend.list('remote', 'backups')}
+    assert set(items) == {'2024', 'a.zip'}
+    assert items['a.zip']['Size'] == 10 and not items['a.zip']['IsDir']
+    assert items['2024']['IsDir']
+
+    assert {item['Path'] for item in backend.list('remote', 'backups', recursive=True)} == \
+        {'2024', 'a.zip', os.path.join('2024', 'b.zip')}
+    assert [item['Path'] for item in backend.list('remote', 'backups', dirs_only=True)] == ['2024']
+
+
+def test_list_missing_directory_raises(backend):
+    with pytest.raises(RcloneError):
+        backend.list('remote', 'missing')
+
+
+def test_upload_file_and_cat(backend, remote, tmp_path):
+    source = tmp_path / 'backup.zip'
+    source.write_bytes(os.urandom(300 * 1024))
+
+    backend.upload_file(str(source), 'remote', 'backups/backup.zip')
+    assert (remote / 'backups' / 'backup.zip').read_bytes() == source.read_bytes()
+    assert backend.stat('remote', 'backups/backup.zip')['Size'] == source.stat().st_size
+    assert backend.stat('remote', 'backups/missing.zip') is None
+
+    assert b''.join(backend.cat('remote', 'backups/backup.zip')) == source.read_bytes()
+
+
+def test_upload_file_reports_progress(backend, remote, tmp_path):
+    source = tmp_path / 'backup.zip'
+    source.write_bytes(b'x' * 4096)
+    reports = []
+
+    backend.upload_file(str(source), 'remote', 'backup.zip', progress=reports.append)
+    assert (remote / 'backup.zip').read_bytes() == source.read_bytes()
+    assert reports and reports[-1]['bytes'] == 4096
+
+
+def test_upload_stream(backend, remote):
+    chunks = [os.urandom(64 * 1024) for _ in range(5)]
+    backend.upload_stream(iter(chunks), 'remote', 'backups/streamed.zip')
+    assert (remote / 'backups' / 'streamed.zip').read_bytes() == b''.join(chunks)
+
+
+def test_cat_missing_file_raises(backend):
+    with pytest.raises(RcloneError):
+        b''.join(backend.cat('remote', 'missing.zip'))
+
+
+def test_rc_password_is_not_on_the_command_line(daemon, tmp_path):
+    RcRcloneBackend(daemon).list_remotes()
+    _, password = daemon.auth
+    (rcd_args,) = [args for args in invocations(tmp_path) if args[0] == 'rcd']
+    assert not any(password in arg for arg in rcd_args)
+    assert '--rc-pass' not in rcd_args
+
+
+def test_config_change_restart_waits_for_open_transfers(daemon, remote, rclone_conf):
+    (remote / 'backup.zip').write_bytes(os.urandom(1024 * 1024))
+    backend = RcRcloneBackend(daemon)
+    backend.list_remotes()
+    first_pid = daemon.process.pid
+
+    download = backend.cat('remote', 'backup.zip')
+    received = [next(download)]
+    os.utime(rclone_conf, (0, 0))
+
+    # Another thread's call must not kill the daemon that is serving the download
+    other = threading.Thread(target=backend.list_remotes)
+    other.start()
+    other.join()
+    assert daemon.process.pid == first_pid
+
+    received.extend(download)
+    assert b''.join(received) == (remote / 'backup.zip').read_bytes()
+
+    backend.list_remotes()
+    assert daemon.process.pid != first_pid
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+from app.services.backup_schedule_service import RetentionPolicy, parse_backup_name
+
+
+def backup(created, kind='backup'):
+    name = f'job_tracker_{kind}_{created:%Y%m%d_%H%M%S}.zip'
+    return {'name': name, 'path': f'JobTrackerBackups/{name}'}
+
+
+def names(backups):
+    return sorted(b['name'] for b in backups)
+
+
+def select(policy, backups, protect=()):
+    keep, prune = policy.select(backups, protect=protect)
+    assert len(keep) + len(prune) == len(backups)
+    return names(keep), names(prune)
+
+
+def test_parse_backup_name():
+    assert parse_backup_name('job_tracker_backup_20250301_020000.zip') == ('full', datetime(2025, 3, 1, 2))
+    assert parse_backup_name('job_tracker_incremental_20250301_020000.zip') == ('incremental', datetime(2025, 3, 1, 2))
+    assert parse_backup_name('job_tracker_backup_20251301_020000.zip') is None
+    assert parse_backup_name('notes.zip') is None
+
+
+def test_daily_keeps_the_newest_backup_of_each_recent_day():
+    backups = [backup(datetime(2025, 3, day, hour)) for day in range(1, 6) for hour in (2, 14)]
+    keep, prune = select(RetentionPolicy(daily=3, weekly=0, monthly=0), backups)
+    assert keep == names([backup(datetime(2025, 3, day, 14)) for day in (3, 4, 5)])
+    assert len(prune) == 7
+
+
+def test_weekly_keeps_the_newest_backup_of_each_iso_week():
+    # Sunday 9 March closes ISO week 10; Monday 10 March opens week 11
+    backups = [backup(datetime(2025, 3, 1) + timedelta(days=day)) for day in range(16)]
+    keep, _ = select(RetentionPolicy(daily=0, weekly=2, monthly=0), backups)
+    assert keep == names([backup(datetime(2025, 3, 9)), backup(datetime(2025, 3, 16))])
+
+
+def test_monthly_keeps_the_newest_backup_of_each_recent_month():
+    backups = [backup(datetime(2025, month, day)) for month in range(1, 7) for day in (1, 15)]
+    keep, _ = select(RetentionPolicy(daily=0, weekly=0, monthly=3), backups)
+    assert keep == names([backup(datetime(2025, month, 15)) for month in (4, 5, 6)])
+
+
+def test_tiers_combine():
+    backups = [backup(datetime(2025, 1, 1) + timedelta(days=day)) for day in range(90)]
+    keep, _ = select(RetentionPolicy(daily=2, weekly=2, monthly=2), backups)
+    # Dailies 31 and 30 March, week 13 (ending 30 March) and week 14 (31 March), months February and March
+    assert keep == names([backup(datetime(2025, 2, 28)), backup(datetime(2025, 3, 30)), backup(datetime(2025, 3, 31))])
+
+
+def test_newest_backup_is_always_kept():
+    backups = [backup(datetime(2025, 3, day)) for day in range(1, 4)]
+    keep, prune = select(RetentionPolicy(daily=0, weekly=0, monthly=0), backups)
+    assert keep == names([backup(datetime(2025, 3, 3))])
+    assert len(prune) == 2
+
+
+def test_unrecognised_names_are_never_pruned():
+    foreign = [
+        {'name': 'my_backup.zip', 'path': 'JobTrackerBackups/my_backup.zip'},
+        {'name': 'job_tracker_backup_20200101.zip', 'path': 'JobTrackerBackups/job_tracker_backup_20200101.zip'},
+        {'name': 'job_tracker_backup_20201399_000000.zip', 'path': 'JobTrackerBackups/job_tracker_backup_20201399_000000.zip'},
+    ]
+    backups = foreign + [backup(datetime(2025, 3, day)) for day in range(1, 4)]
+    keep, prune = select(RetentionPolicy(daily=1, weekly=0, monthly=0), backups)
+    assert set(names(foreign)) <= set(keep)
+    assert prune == names([backup(datetime(2025, 3, 1)), backup(datetime(2025, 3, 2))])
+
+
+def test_keeping_an_incremental_keeps_its_full_backup_and_earlier_increments():
+    backups = [
+        backup(datetime(2024, 12, 1)),
+        backup(datetime(2025, 1, 1)),
+        backup(datetime(2025, 1, 10), 'incremental'),
+        backup(datetime(2025, 1, 20), 'incremental'),
+        backup(datetime(2025, 2, 1)),
+        backup(datetime(2025, 2, 2), 'incremental'),
+    ]
+    keep, prune = select(RetentionPolicy(daily=0, weekly=0, monthly=2), backups)
+    # January's newest backup is its last increment, which needs the whole January chain
+    assert keep == names(backups[1:])
+    assert prune == names(backups[:1])
+
+    # Only the newest increment is kept by the tiers; it still needs the February full backup
+    keep, _ = select(RetentionPolicy(daily=1, weekly=0, monthly=0), backups)
+    assert keep == names(backups[4:])
+
+
+def test_protected_live_chain_survives_pruning():
+    live_chain = [backup(datetime(2025, 1, 1)), backup(datetime(2025, 1, 2), 'incremental'),
+                  backup(datetime(2025, 1, 3), 'incremental')]
+    backups = [backup(datetime(2024, 12, 1))] + live_chain + [backup(datetime(2025, 1, 5))]
+
+    keep, prune = select(RetentionPolicy(daily=1, weekly=0, monthly=0), backups)
+    assert keep == names(backups[-1:])
+
+    # prune_remote protects the chain the next incremental backup builds on
+    keep, prune = select(RetentionPolicy(daily=1, weekly=0, monthly=0), backups,
+                         protect=[b['path'] for b in live_chain])
+    assert keep == names(live_chain + backups[-1:])
+    assert prune == names(backups[:1])
+
+    # Protecting the newest increment alone is enough: its chain comes with it
+    keep, _ = select(RetentionPolicy(daily=1, weekly=0, monthly=0), backups, protect=[live_chain[-1]['path']])
+    assert keep == names(live_chain + backups[-1:])
@@ -0,0 +1,64 @@
+import sqlite3
+
+from app.models import Job, JobNotes
+from app.services.search_service import SearchService
+
+
+def search_ids(query):
+    return [result['job_id'] for result in SearchService().search(query)['results']]
+
+
+def test_indexes_plain_text_of_html(db, make_jobs):
+    job = make_jobs(1)[0]
+    job.notes.append(JobNotes(content='<p><strong>Recruiter</strong> mentioned Kubernetes</p>'))
+    db.session.commit()
+
+    assert search_ids('kubernetes') == [job.id]
+    assert search_ids('python sql') == [job.id]
+    # Tag names and entities are not indexed as words
+    assert search_ids('strong') == []
+    assert search_ids('amp') == []
+
+    result = SearchService().search('recruiter')['results'][0]
+    assert '<strong>' not in result['snippets']['notes']
+    assert '<mark>Recruiter</mark>' in result['snippets']['notes']
+
+
+def test_edits_reindex(db, make_jobs):
+    job = make_jobs(1)[0]
+    job.description = '<ul><li>Rust and WebAssembly</li></ul>'
+    note = job.notes[0]
+    note.content = '<p>Offer received</p>'
+    db.session.commit()
+
+    assert search_ids('webassembly') == [job.id]
+    assert search_ids('offer') == [job.id]
+    assert search_ids('python') == []
+
+    db.session.delete(note)
+    db.session.commit()
+    assert search_ids('offer') == []
+
+
+def test_other_sqlite_clients_can_write(app, db, make_jobs):
+    """The triggers use no app-registered functions, so plain sqlite3 writes work"""
+    job = make_jobs(1)[0]
+    db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.execute("INSERT INTO job_notes (job_id, content, created_at) "
+                           "VALUES (?, '<p>Called the hiring manager</p>', '2025-06-01 10:00:00')", (job.id,))
+        connection.execute("INSERT INTO jobs (company, title, description, is_draft, posting_status) "
+                           "VALUES ('Initech', 'Analyst', '<p>Spreadsheets</p>', 0, 'Open')")
+        connection.execute("UPDATE job_notes SET content = '<p>Phone screen booked</p>', content_text = NULL "
+                           "WHERE job_id = ? AND content LIKE '%hiring%'", (job.id,))
+        connection.commit()
+    finally:
+        connection.close()
+
+    db.session.expire_all()
+    assert search_ids('phone screen') == [job.id]
+    assert search_ids('hiring') == []
+    assert len(search_ids('spreadsheets')) == 1
+    assert db.session.get(Job, job.id).notes_count == 2
@@ -0,0 +1,122 @@
+"""
+SQLite connection tuning. The benchmark runs several processes (like gunicorn
+workers) that each add notes and read the job list on one app.db, once with
+SQLite's defaults and once with the app's settings:
+
+    python -m pytest -m benchmark -s tests/test_sqlite_concurrency.py
+"""
+import multiprocessing
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import config
+
+# SQLite's own defaults, as the app ran before configure_sqlite_engine. Python's
+# sqlite3 waits up to 5 s for a lock by default.
+SQLITE_DEFAULTS = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_MMAP_SIZE': 0,
+    'SQLITE_CACHE_SIZE': -2000,
+    'SQLITE_TEMP_STORE': 'DEFAULT',
+}
+APP_SETTINGS = {name: getattr(config.Config, name) for name in SQLITE_DEFAULTS}
+
+WORKERS = 4
+WRITES_PER_WORKER = 200
+JOBS = 20
+
+
+def test_pragmas_are_applied_to_every_connection(app, db):
+    expected = {
+        'journal_mode': app.config['SQLITE_JOURNAL_MODE'].lower(),
+        'synchronous': {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3}[app.config['SQLITE_SYNCHRONOUS']],
+        'busy_timeout': app.config['SQLITE_BUSY_TIMEOUT_MS'],
+        'cache_size': app.config['SQLITE_CACHE_SIZE'],
+    }
+    # A second, separately checked-out connection gets the same settings
+    for _ in range(2):
+        with db.engine.connect() as connection:
+            for pragma, value in expected.items():
+                assert connection.execute(text(f'PRAGMA {pragma}')).scalar() == value
+
+
+def run_worker(app_folder, settings, writes, results):
+    """One "gunicorn worker": add a note and read a page of the job list, writes times"""
+    for name, value in settings.items():
+        setattr(config.Config, name, value)
+    config.Config.APP_FOLDER = app_folder
+
+    from app import create_app, db
+    from app.blueprints.main import job_list_query
+    from app.models import JobNotes
+
+    app = create_app('development')
+    latencies, errors = [], 0
+    with app.app_context():
+        for i in range(writes):
+            started = time.perf_counter()
+            try:
+                db.session.add(JobNotes(job_id=i % JOBS + 1, content=f'<p>Benchmark note {i}</p>'))
+                db.session.commit()
+                job_list_query().limit(10).all()
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        db.engine.dispose()
+    results.put((latencies, errors))
+
+
+def run_benchmark(app_folder, settings):
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=run_worker, args=(app_folder, settings, WRITES_PER_WORKER, results))
+               for _ in range(WORKERS)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=600) for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for worker_latencies, _ in outcomes for latency in worker_latencies)
+    return {
+        'seconds': elapsed,
+        'writes_per_second': len(latencies) / elapsed,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'errors': sum(errors for _, errors in outcomes),
+    }
+
+
+@pytest.mark.benchmark
+def test_concurrent_writers(tmp_path, monkeypatch):
+    reports = {}
+    for label, settings in (('sqlite defaults', SQLITE_DEFAULTS), ('app settings', APP_SETTINGS)):
+        app_folder = tmp_path / label.replace(' ', '_')
+        # Create the schema and the jobs to attach notes to before the workers start
+        for name, value in settings.items():
+            monkeypatch.setattr(config.Config, name, value)
+        monkeypatch.setattr(config.Config, 'APP_FOLDER', str(app_folder))
+        from app import create_app, db
+        from app.models import Job
+        app = create_app('development')
+        with app.app_context():
+            db.session.add_all(Job(company='Benchmark', title=f'Writer {i}') for i in range(JOBS))
+            db.session.commit()
+            db.engine.dispose()
+
+        reports[label] = run_benchmark(str(app_folder), settings)
+
+    print(f'\n{WORKERS} processes x {WRITES_PER_WORKER} note inserts + job list reads')
+    for label, report in reports.items():
+        print(f"  {label:16} {report['seconds']:6.2f} s  {report['writes_per_second']:7.1f} writes/s  "
+              f"p95 {report['p95_ms']:6.1f} ms  {report['errors']} lock errors")
+
+    assert reports['app settings']['errors'] == 0
@@ -0,0 +1,65 @@
+import io
+import hashlib
+import os
+import zipfile
+
+import pytest
+
+from app.utils.zip_stream import CompressionPolicy, stream_zip
+
+
+def build(entries, **kwargs):
+    entry_stats = []
+    data = b''.join(stream_zip(entries, entry_stats=entry_stats, **kwargs))
+    return zipfile.ZipFile(io.BytesIO(data)), {stats['name']: stats for stats in entry_stats}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    text = tmp_path / 'notes.txt'
+    text.write_bytes(b''.join(f'line {i}: python, sql, flask\n'.encode() for i in range(20000)))
+    pdf = tmp_path / 'resume.pdf'
+    pdf.write_bytes(bytes(range(256)) * 400)
+    return {'notes.txt': str(text), 'resume.pdf': str(pdf)}
+
+
+def test_already_compressed_files_are_stored(sources):
+    archive, stats = build(sources.items())
+    assert archive.getinfo('resume.pdf').compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo('notes.txt').compress_type == zipfile.ZIP_DEFLATED
+    assert archive.testzip() is None
+    for name, path in sources.items():
+        with open(path, 'rb') as f:
+            content = f.read()
+        assert archive.read(name) == content
+        assert stats[name]['sha256'] == hashlib.sha256(content).hexdigest()
+
+
+@pytest.mark.parametrize('level', [None, 9])
+def test_file_timestamps_and_permissions_are_kept(sources, level):
+    os.utime(sources['notes.txt'], (1700000000, 1700000000))
+    os.chmod(sources['notes.txt'], 0o640)
+    expected = zipfile.ZipInfo.from_file(sources['notes.txt'], 'notes.txt')
+
+    archive, _ = build(sources.items(), policy=CompressionPolicy('deflated', level=level))
+    info = archive.getinfo('notes.txt')
+    assert info.date_time == expected.date_time
+    assert info.external_attr >> 16 & 0o777 == 0o640
+
+
+def test_compression_level_is_applied(sources):
+    fastest, fast_stats = build(sources.items(), policy=CompressionPolicy('deflated', level=1))
+    smallest, small_stats = build(sources.items(), policy=CompressionPolicy('deflated', level=9))
+
+    assert small_stats['notes.txt']['compressed_size'] < fast_stats['notes.txt']['compressed_size']
+    assert smallest.read('notes.txt') == fastest.read('notes.txt')
+    # Stored entries ignore the level
+    assert smallest.getinfo('resume.pdf').compress_type == zipfile.ZIP_STORED
+    assert small_stats['resume.pdf']['compressed_size'] == fast_stats['resume.pdf']['compressed_size']
+
+
+def test_bytes_entries(sources):
+    archive, stats = build([('manifest.json', b'{"backup_version": "1.1"}')],
+                           policy=CompressionPolicy('deflated', level=9))
+    assert archive.read('manifest.json') == b'{"backup_version": "1.1"}'
+    assert stats['manifest.json']['size'] == 25